@@ -1,66 +1,168 @@
 """Command-line interface."""
 import asyncio
+import importlib.util
 import json
 import logging
+import multiprocessing
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from dataclasses import replace
 from typing import Any
+from typing import Awaitable
 from typing import Optional
 
+import aiohttp
 import click
 import click_log
-from returns.result import Failure
-from returns.result import Success
 
+from . import api
+from . import compare
+from . import corpus
+from . import distributed
+from . import features
+from . import geometry
+from . import mock
+from . import monitor
 from . import query
+from . import replay
+from . import results
+from . import scenarios
+from . import warmup
+from . import workload
+from .ramp import ramp
+from .ramp import RampConfig
+from .replay import ReplayConfig
+from .stats import ScenarioStats
+from .workers import QuerySource
 
-# these IDs have self-intersections, so can't be used to query some databases (e.g., ES)
-TNC_EXCLUDED_IDS = [
-    "10026",
-    "10096",
-    "10100",
-    "10123",
-    "10158",
-    "10201",
-    "10266",
-    "10213",
-    "10289",
-    "10321",
-    "10339",
-    "10342",
-    "10354",
-    "10356",
-    "17105",
-    "10378",
-    "10385",
-    "10425",
-    "10598",
-    "10633",
-    "10691",
-    "10700",
-    "17009",
-    "10015",
-    "10032",
-    "10040",
-    "10042",
-    "10046",
-    "10047",
-    "10050",
-    "10051",
-    "10076",
-]
+# query generators that a ramp can cycle through, along with feature-collection
+# for the file given by --feature-collection
+QUERY_GENERATORS = {
+    "step": QuerySource("fc", {"fc_filename": query.STEP, "id_field": "siteid"}),
+    "tnc": QuerySource(
+        "fc", {"fc_filename": query.TNC_ECOREGIONS, "id_field": "ECO_ID_U"}
+    ),
+    "countries": QuerySource(
+        "fc", {"fc_filename": query.COUNTRIES, "id_field": "name"}
+    ),
+    "random": QuerySource("random"),
+}
 
 logger = logging.getLogger(__name__)
 click_log.basic_config(logger)
 
 
-@click.command()
+def parse_rate(
+    ctx: click.Context, param: click.Parameter, value: Optional[str]
+) -> Optional[float]:
+    """Parse a rate like ``50``, ``50/s``, or ``600/m`` into requests per second."""
+    if value is None:
+        return None
+    try:
+        return query.parse_rate(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+
+
+def parse_sortby(
+    ctx: click.Context, param: click.Parameter, value: tuple[str, ...]
+) -> list[dict[str, str]]:
+    """Parse sort keys like ``properties.datetime:desc`` into sortby dicts."""
+    return [query.parse_sort_key(key) for key in value]
+
+
+def parse_scenario_options(
+    ctx: click.Context, param: click.Parameter, value: tuple[str, ...]
+) -> list[tuple[str, str, str]]:
+    """Parse scenario options like ``repeated.count=1000``."""
+    options = []
+    for option in value:
+        target, _, setting = option.partition("=")
+        name, _, field_name = target.rpartition(".")
+        if not name or not setting:
+            raise click.BadParameter(
+                f"{option!r} is not a scenario option like repeated.count=1000"
+            )
+        options.append((name, field_name, setting))
+    return options
+
+
+def require_module(module: str, purpose: str, extra: str = "geo") -> None:
+    """Raise a UsageError if an optional dependency is not installed."""
+    if importlib.util.find_spec(module) is None:
+        raise click.UsageError(
+            f"{purpose} requires {module}, which is installed with the {extra} extra,"
+            f" e.g., pip install 'stac-api-benchmark[{extra}]'"
+        )
+
+
+def warn_without_fast_decoder(response_mode: str) -> None:
+    """Warn if ``count`` mode would decode with the standard library."""
+    if response_mode == "count" and importlib.util.find_spec("orjson") is None:
+        logger.warning(
+            "--response-mode count decodes with json rather than orjson, which is"
+            " installed with the fast extra, e.g., pip install"
+            " 'stac-api-benchmark[fast]'"
+        )
+
+
+def parse_steps(
+    ctx: click.Context, param: click.Parameter, value: Optional[str]
+) -> Optional[list[float]]:
+    """Parse a comma-separated list of ramp steps, either concurrencies or rates."""
+    if value is None:
+        return None
+    if param.name == "ramp_rate":
+        return [parse_rate(ctx, param, step) or 0.0 for step in value.split(",")]
+    try:
+        steps = [float(int(step)) for step in value.split(",")]
+    except ValueError:
+        raise click.BadParameter(
+            f"{value!r} is not a list of concurrencies like 10,20,50"
+        ) from None
+    if any(step < 1 for step in steps):
+        raise click.BadParameter("concurrency must be at least 1")
+    return steps
+
+
+class DefaultGroup(click.Group):
+    """A group that runs the ``run`` command if no other command is named.
+
+    This keeps ``stac-api-benchmark --url ...`` working as it did before there
+    were any other commands.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        """Insert the ``run`` command if the first argument isn't a command.
+
+        Options of the group itself, like ``--version`` and ``--help``, are
+        left for the group.
+        """
+        own_options = {
+            name
+            for param in self.get_params(ctx)
+            for name in (*param.opts, *param.secondary_opts)
+        }
+        if not args or (args[0] not in self.commands and args[0] not in own_options):
+            args = ["run", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup)
 @click.version_option()
+def main() -> None:
+    """STAC API Benchmark."""
+
+
+@main.command(name="run")
 @click.option("--url", required=True, help="The root / Landing Page url for a STAC API")
 @click.option(
     "--collection",
     "collections",
-    required=True,
     multiple=True,
-    help="The collections over which to query (comma-separated)",
+    help="The collections over which to query (comma-separated), required unless"
+    " --replay is given",
 )
 @click.option(
     "--concurrency", default=10, help="The number of concurrent request to run"
@@ -100,8 +202,303 @@ click_log.basic_config(logger)
     help="Maximum duration before each search request is considered to have timed out,"
     " in seconds",
 )
+@click.option(
+    "--pool-size",
+    default=0,
+    help="Maximum number of open connections, or 0 for no limit",
+)
+@click.option(
+    "--pool-size-per-host",
+    default=0,
+    help="Maximum number of open connections to a single host, or 0 for no limit",
+)
+@click.option(
+    "--keepalive-timeout",
+    default=15.0,
+    help="Seconds to keep an idle connection open for reuse",
+)
+@click.option(
+    "--dns-cache-ttl",
+    default=10,
+    help="Seconds to cache resolved DNS entries, or 0 to disable the DNS cache",
+)
+@click.option(
+    "--reuse-connections/--no-reuse-connections",
+    default=True,
+    help="Reuse connections across requests (warm), or open a new connection for"
+    " every request (cold)",
+)
+@click.option(
+    "--check-conformance/--no-check-conformance",
+    default=True,
+    help="Fail before running any scenarios if the API does not advertise the"
+    " conformance classes they require",
+)
+@click.option(
+    "--response-mode",
+    default="parse",
+    show_default=True,
+    type=click.Choice(query.RESPONSE_MODES),
+    help="Parse each response, only count its features and find its next link"
+    " (with orjson, if it's installed), or drain it without parsing, following no"
+    " next links",
+)
+@click.option(
+    "--rate",
+    callback=parse_rate,
+    help="Run the feature collection and random query scenarios open loop, starting"
+    " requests at this rate (e.g., 50/s or 600/m) regardless of latency",
+)
+@click.option(
+    "--poisson",
+    is_flag=True,
+    help="With --rate, use exponentially distributed times between requests",
+)
+@click.option(
+    "--ramp-concurrency",
+    callback=parse_steps,
+    help="Instead of the scenarios, ramp through these concurrencies (e.g., 10,20,50)"
+    " to find the maximum sustainable throughput",
+)
+@click.option(
+    "--ramp-rate",
+    callback=parse_steps,
+    help="Instead of the scenarios, ramp through these open loop rates"
+    " (e.g., 10/s,20/s,50/s) to find the maximum sustainable throughput",
+)
+@click.option(
+    "--ramp-queries",
+    type=click.Choice([*QUERY_GENERATORS, "feature-collection"]),
+    default="random",
+    help="The queries to draw from in each step of the ramp",
+)
+@click.option(
+    "--ramp-step-duration",
+    default=60.0,
+    help="Seconds to hold each step of the ramp",
+)
+@click.option(
+    "--ramp-max-error-rate",
+    default=0.01,
+    help="Stop the ramp after a step with a higher fraction of failed requests",
+)
+@click.option(
+    "--ramp-max-p99",
+    default=5.0,
+    help="Stop the ramp after a step with a higher p99 latency, in seconds",
+)
+@click.option(
+    "--workers",
+    "num_workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Split the queries of the feature collection and random query scenarios"
+    " across this number of processes",
+)
+@click.option(
+    "--shuffle-window",
+    default=10000,
+    type=click.IntRange(min=1),
+    help="The number of generated queries from which the next query is randomly"
+    " chosen, which bounds the memory used to shuffle the queries",
+)
+@click.option(
+    "--agent",
+    "agents",
+    multiple=True,
+    help="Split the queries of the feature collection and random query scenarios"
+    " across agents (see the agent command) at this host:port",
+)
+@click.option(
+    "--agent-timeout",
+    default=3600.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="The seconds to wait for each reply of an --agent, i.e., to be ready and"
+    " then to finish its shard of a scenario",
+)
+@click.option(
+    "--corpus-dir",
+    type=click.Path(file_okay=False),
+    help="The directory of feature collections compiled by the corpus command, by"
+    " default $XDG_CACHE_HOME/stac-api-benchmark",
+)
+@click.option(
+    "--feature-collection",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Also run a scenario with a query for each feature in this GeoJSON,"
+    " GeoJSONL, or GeoParquet file",
+)
+@click.option(
+    "--feature-collection-id-field",
+    default="id",
+    help="The property that identifies each feature in --feature-collection",
+)
+@click.option(
+    "--feature-collection-datetime",
+    help="The datetime interval of the --feature-collection queries",
+)
+@click.option(
+    "--feature-collection-sortby",
+    multiple=True,
+    callback=parse_sortby,
+    help="Supports multiple parameters. A sort key of the --feature-collection"
+    " queries, e.g., properties.datetime:desc",
+)
+@click.option(
+    "--invalid-geometries",
+    type=click.Choice(geometry.INVALID_GEOMETRIES),
+    default="exclude",
+    help="Whether to exclude, repair, or keep self-intersecting geometries in"
+    " feature collections",
+)
+@click.option(
+    "--complexity-queries",
+    type=click.Choice(
+        [*(name for name, s in QUERY_GENERATORS.items() if s.generator == "fc")]
+        + ["feature-collection"]
+    ),
+    help="Also run a scenario that queries each feature of this feature collection"
+    " as it is, simplified, and as its bbox",
+)
+@click.option(
+    "--complexity-tolerance",
+    "complexity_tolerances",
+    multiple=True,
+    type=click.FloatRange(min=0, min_open=True),
+    default=(0.001, 0.01, 0.1),
+    show_default=True,
+    help="Supports multiple parameters. A Douglas-Peucker tolerance, in degrees,"
+    " to simplify the --complexity-queries features to",
+)
+@click.option(
+    "--complexity-max-vertices",
+    multiple=True,
+    type=click.IntRange(min=3),
+    default=(16, 64, 256),
+    show_default=True,
+    help="Supports multiple parameters. A budget of vertices to simplify the"
+    " --complexity-queries features to",
+)
+@click.option(
+    "--scenario",
+    "scenario_patterns",
+    multiple=True,
+    help="Supports multiple parameters. Only run the scenarios whose name or tag"
+    " matches this pattern, e.g., sort_* or quick (see the scenarios command)",
+)
+@click.option(
+    "--skip-scenario",
+    "skip_scenario_patterns",
+    multiple=True,
+    help="Supports multiple parameters. Don't run the scenarios whose name or tag"
+    " matches this pattern",
+)
+@click.option(
+    "--scenarios-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="A TOML or YAML file of scenarios to add to, or replace, the registered"
+    " scenarios",
+)
+@click.option(
+    "--scenario-option",
+    "scenario_options",
+    multiple=True,
+    callback=parse_scenario_options,
+    help="Supports multiple parameters. Set the concurrency, count, or duration of a"
+    " scenario, or another of its params as JSON, e.g., repeated.count=1000 or"
+    " sort_paged.pages=50",
+)
+@click.option(
+    "--workload",
+    "workload_file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Instead of the scenarios, run the weighted mix of queries in this TOML or"
+    " YAML workload file",
+)
+@click.option(
+    "--replay",
+    "replay_log",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Instead of the scenarios, replay the requests in this JSON Lines log,"
+    " which may be gzipped",
+)
+@click.option(
+    "--replay-speed",
+    type=click.FloatRange(min=0, min_open=True),
+    help="Replay requests at their original timing, sped up by this factor (e.g.,"
+    " 1 for the original timing), rather than as fast as possible",
+)
+@click.option(
+    "--replay-url-prefix",
+    default="",
+    help="A path prefix of the logged urls to replace with --url, e.g., /v1",
+)
+@click.option(
+    "--results-db",
+    type=click.Path(dir_okay=False),
+    help="A SQLite database to store the run in, with the result of every request,"
+    " for the compare command",
+)
+@click.option("--label", help="A label for the stored run, e.g., a release")
+@click.option(
+    "--git-sha",
+    envvar=["GITHUB_SHA", "CI_COMMIT_SHA"],
+    help="The git commit of the API under test, to store with the run, by default"
+    " $GITHUB_SHA or $CI_COMMIT_SHA",
+)
+@click.option(
+    "--warmup-requests",
+    default=0,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="Record at least this many requests of each scenario as its warmup,"
+    " separately from the measured requests",
+)
+@click.option(
+    "--warmup-duration",
+    default=0.0,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Record the requests of at least the first seconds of each scenario as its"
+    " warmup",
+)
+@click.option(
+    "--steady-state-window",
+    type=click.FloatRange(min=0, min_open=True),
+    help="After the warmup requests and duration, continue the warmup until the"
+    " throughput and p50 latency of the last 3 windows of this many seconds agree",
+)
+@click.option(
+    "--steady-state-tolerance",
+    default=0.1,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="How much the windows may differ, relative to their mean, and still be"
+    " steady",
+)
+@click.option(
+    "--max-warmup",
+    default=120.0,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="The seconds after which a warmup waiting for a steady state ends anyway",
+)
+@click.option(
+    "--profile",
+    "profiler",
+    type=click.Choice(monitor.PROFILERS),
+    help="Profile the client while each scenario runs, with cProfile or yappi",
+)
+@click.option(
+    "--profile-dir",
+    default=".",
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="The directory to save a pstats profile of each scenario to",
+)
 @click_log.simple_verbosity_option(logger)
-def main(
+def benchmark(
     url: str,
     collections: tuple[str, ...],
     concurrency: int,
@@ -112,141 +509,844 @@ def main(
     max_items: int,
     limit: int,
     timeout: int,
+    pool_size: int,
+    pool_size_per_host: int,
+    keepalive_timeout: float,
+    dns_cache_ttl: int,
+    reuse_connections: bool,
+    check_conformance: bool,
+    response_mode: str,
+    rate: Optional[float],
+    poisson: bool,
+    ramp_concurrency: Optional[list[float]],
+    ramp_rate: Optional[list[float]],
+    ramp_queries: str,
+    ramp_step_duration: float,
+    ramp_max_error_rate: float,
+    ramp_max_p99: float,
+    num_workers: int,
+    shuffle_window: int,
+    agents: tuple[str, ...],
+    agent_timeout: float,
+    corpus_dir: Optional[str],
+    feature_collection: Optional[str],
+    feature_collection_id_field: str,
+    feature_collection_datetime: Optional[str],
+    feature_collection_sortby: list[dict[str, str]],
+    invalid_geometries: str,
+    complexity_queries: Optional[str],
+    complexity_tolerances: tuple[float, ...],
+    complexity_max_vertices: tuple[int, ...],
+    scenario_patterns: tuple[str, ...],
+    skip_scenario_patterns: tuple[str, ...],
+    scenarios_file: Optional[str],
+    scenario_options: list[tuple[str, str, str]],
+    workload_file: Optional[str],
+    replay_log: Optional[str],
+    replay_speed: Optional[float],
+    replay_url_prefix: str,
+    results_db: Optional[str],
+    label: Optional[str],
+    git_sha: Optional[str],
+    warmup_requests: int,
+    warmup_duration: float,
+    steady_state_window: Optional[float],
+    steady_state_tolerance: float,
+    max_warmup: float,
+    profiler: Optional[str],
+    profile_dir: str,
 ) -> None:
-    """STAC API Benchmark."""
-    results = asyncio.run(
-        run(
-            query.BenchmarkConfig(
-                url=url,
-                collections=collections,
-                concurrency=concurrency,
-                seed=seed,
-                queryables=queryables,
-                num_features=num_features,
-                num_random=num_random,
-                max_items=max_items,
-                limit=limit,
-                logger=logger,
-                timeout=timeout,
-            )
-        )
+    """Run the benchmark scenarios against a STAC API."""
+    check_modes(
+        collections,
+        agents,
+        num_workers,
+        ramp_concurrency,
+        ramp_rate,
+        replay_log,
+        workload_file,
     )
+    if profiler == "yappi" and importlib.util.find_spec("yappi") is None:
+        raise click.UsageError(
+            "--profile yappi requires yappi, e.g., pip install yappi"
+        )
+    if ramp_queries == "feature-collection" and feature_collection is None:
+        raise click.UsageError(
+            "--ramp-queries feature-collection requires --feature-collection"
+        )
+    if invalid_geometries == "repair":
+        require_module("shapely", "--invalid-geometries repair")
+    warn_without_fast_decoder(response_mode)
 
-    print(json.dumps(results))
+    fc_source = (
+        None
+        if feature_collection is None
+        else feature_collection_source(
+            feature_collection,
+            feature_collection_id_field,
+            feature_collection_datetime,
+            feature_collection_sortby,
+            corpus_dir,
+        )
+    )
 
+    complexity = None
+    if complexity_queries is not None:
+        if complexity_queries != "feature-collection":
+            base = QUERY_GENERATORS[complexity_queries]
+        elif fc_source is None:
+            raise click.UsageError(
+                "--complexity-queries feature-collection requires --feature-collection"
+            )
+        else:
+            base = fc_source
+        complexity = QuerySource(
+            "complexity",
+            {
+                "fc_filename": base.params["fc_filename"],
+                "id_field": base.params["id_field"],
+                "tolerances": list(complexity_tolerances),
+                "max_vertices": list(complexity_max_vertices),
+            },
+        )
 
-async def run(config: query.BenchmarkConfig) -> dict[str, float]:
-    results: dict[str, float] = {}
-    logger.info("Running STEP")
-    result: Any = await query.search_with_fc(
-        config=config,
-        fc_filename=query.STEP,
-        id_field="siteid",
+    steps = ramp_concurrency or ramp_rate
+    ramp_config = (
+        None
+        if steps is None
+        else RampConfig(
+            steps=steps,
+            by_rate=ramp_rate is not None,
+            step_duration=ramp_step_duration,
+            max_error_rate=ramp_max_error_rate,
+            max_p99=ramp_max_p99,
+        )
     )
-    logger.info(f"STEP Results: total time: {result[1]:.2f}s")
-    results["step"] = result[1]
-
-    logger.info("Running TNC Ecoregions")
-    result = await query.search_with_fc(
-        config=config,
-        fc_filename=query.TNC_ECOREGIONS,
-        id_field="ECO_ID_U",
-        exclude_ids=TNC_EXCLUDED_IDS,
+    config = query.BenchmarkConfig(
+        url=url,
+        collections=collections,
+        concurrency=concurrency,
+        seed=seed,
+        queryables=queryables,
+        num_features=num_features,
+        num_random=num_random,
+        max_items=max_items,
+        limit=limit,
+        logger=logger,
+        timeout=timeout,
+        pool_size=pool_size,
+        pool_size_per_host=pool_size_per_host,
+        keepalive_timeout=keepalive_timeout,
+        dns_cache_ttl=dns_cache_ttl,
+        reuse_connections=reuse_connections,
+        rate=rate,
+        poisson=poisson,
+        workers=num_workers,
+        shuffle_window=shuffle_window,
+        corpus_dir=corpus_dir,
+        invalid_geometries=invalid_geometries,
+        response_mode=response_mode,
+        warmup_requests=warmup_requests,
+        warmup_duration=warmup_duration,
+        steady_state_window=steady_state_window,
+        steady_state_tolerance=steady_state_tolerance,
+        max_warmup=max_warmup,
+        agent_timeout=agent_timeout,
     )
-    logger.info(f"TNC Ecoregions: {result[1]:.2f}s")
-    results["tnc"] = result[1]
-
-    logger.info("Running country political boundaries, in April 2019")
-    result = await query.search_with_fc(
-        config=config,
-        fc_filename=query.COUNTRIES,
-        id_field="name",
-        datetime="2019-04-01T00:00:00Z/2019-05-01T00:00:00Z",
+    store = None
+    if results_db is not None:
+        store = results.ResultsStore(results_db)
+        store.start_run(config, label, git_sha)
+    try:
+        output = asyncio.run(
+            run(
+                config,
+                check_conformance=check_conformance,
+                ramp_config=ramp_config,
+                ramp_queries=ramp_queries,
+                agents=list(agents),
+                feature_collection=fc_source,
+                selected=select_scenarios(
+                    seed,
+                    fc_source,
+                    complexity,
+                    scenario_patterns,
+                    skip_scenario_patterns,
+                    scenarios_file,
+                    scenario_options,
+                ),
+                mix=None if workload_file is None else read_workload(workload_file),
+                replay_config=None
+                if replay_log is None
+                else ReplayConfig(replay_log, replay_speed, replay_url_prefix),
+                store=store,
+                profile_config=None
+                if profiler is None
+                else monitor.ProfileConfig(profiler, profile_dir),
+            )
+        )
+    except (
+        api.ConformanceError,
+        distributed.AgentError,
+        replay.ReplayError,
+        workload.WorkloadError,
+        scenarios.ScenarioError,
+    ) as e:
+        raise click.ClickException(str(e)) from e
+    finally:
+        if store is not None:
+            store.close()
+
+    print(json.dumps(output))
+
+
+def check_modes(
+    collections: tuple[str, ...],
+    agents: tuple[str, ...],
+    num_workers: int,
+    ramp_concurrency: Optional[list[float]],
+    ramp_rate: Optional[list[float]],
+    replay_log: Optional[str],
+    workload_file: Optional[str],
+) -> None:
+    """Check that the options don't ask for conflicting ways of running."""
+    if not collections and replay_log is None:
+        raise click.UsageError("Missing option '--collection'.")
+    if agents and num_workers > 1:
+        raise click.UsageError("--agent and --workers cannot be used together")
+    if ramp_concurrency and ramp_rate:
+        raise click.UsageError(
+            "--ramp-concurrency and --ramp-rate cannot be used together"
+        )
+    modes = [
+        option
+        for option, given in (
+            ("--ramp-*", ramp_concurrency or ramp_rate),
+            ("--replay", replay_log),
+            ("--workload", workload_file),
+        )
+        if given
+    ]
+    if len(modes) > 1:
+        raise click.UsageError(f"{' and '.join(modes)} cannot be used together")
+
+
+def select_scenarios(
+    seed: int,
+    feature_collection: Optional[QuerySource],
+    complexity: Optional[QuerySource],
+    include: tuple[str, ...],
+    exclude: tuple[str, ...],
+    scenarios_file: Optional[str],
+    options: list[tuple[str, str, str]],
+) -> list[scenarios.Scenario]:
+    """The registered scenarios to run, configured by the scenario options."""
+    try:
+        registered = scenarios.registry(
+            scenarios.builtin_scenarios(seed, feature_collection, complexity),
+            scenarios.plugin_scenarios(),
+            scenarios.read_scenarios(scenarios_file) if scenarios_file else [],
+        )
+        return scenarios.configure(
+            scenarios.select(registered, include, exclude), options
+        )
+    except (OSError, scenarios.ScenarioError) as e:
+        raise click.ClickException(str(e)) from e
+
+
+def read_workload(filename: str) -> workload.Workload:
+    """Read a workload file, raising a ClickException if it isn't valid."""
+    if filename.lower().endswith(workload.YAML_SUFFIXES):
+        require_module("yaml", "Reading YAML workloads", "yaml")
+    try:
+        return workload.read_workload(filename)
+    except (OSError, workload.WorkloadError) as e:
+        raise click.ClickException(str(e)) from e
+
+
+def feature_collection_source(
+    filename: str,
+    id_field: str,
+    datetime: Optional[str],
+    sortby: list[dict[str, str]],
+    corpus_dir: Optional[str],
+) -> QuerySource:
+    """The queries of a user-supplied feature collection, compiled up front.
+
+    Compiling the feature collection before the run means that a bad file fails
+    before any requests are made, and that workers load the compiled corpus.
+    """
+    if filename.lower().endswith(features.PARQUET_SUFFIXES):
+        require_module("pyarrow", "Reading GeoParquet")
+    try:
+        corpus.load_corpus(filename, id_field, corpus_dir)
+    except (OSError, ValueError, KeyError) as e:
+        raise click.ClickException(f"could not read {filename}: {e!r}") from e
+    return QuerySource(
+        "fc",
+        {
+            "fc_filename": filename,
+            "id_field": id_field,
+            "datetime": datetime,
+            "sortby": sortby or None,
+        },
     )
-    logger.info(f"Countries, April 2019: {result[1]:.2f}s")
-    results["countries_apr_2019"] = result[1]
-
-    logger.info("Running country political boundaries, cloud cover ascending")
-    result = await query.search_with_fc(
-        config=config,
-        fc_filename=query.COUNTRIES,
-        id_field="name",
-        sortby=[query.es_sortby("properties.eo:cloud_cover", "asc")],  # noqa
+
+
+async def run(
+    config: query.BenchmarkConfig,
+    check_conformance: bool = True,
+    ramp_config: Optional[RampConfig] = None,
+    ramp_queries: str = "random",
+    agents: Optional[list[str]] = None,
+    feature_collection: Optional[QuerySource] = None,
+    selected: Optional[list[scenarios.Scenario]] = None,
+    mix: Optional[workload.Workload] = None,
+    replay_config: Optional[ReplayConfig] = None,
+    store: Optional[results.ResultsStore] = None,
+    profile_config: Optional[monitor.ProfileConfig] = None,
+) -> dict[str, Any]:
+    async with query.create_session(config) as session:
+        if replay_config is not None:
+            logger.info(f"Replaying {replay_config.filename}")
+            logger.info("request,item count,duration (sec)")
+            result = await observed(
+                config,
+                store,
+                "replay",
+                replay.replay(
+                    config,
+                    session,
+                    replay_config,
+                    replay.read_log(replay_config.filename),
+                ),
+                session,
+                profile_config,
+            )
+            logger.info(f"Replay Results: {describe(result)}")
+            return {"replay": result.to_dict()}
+        context = await api.load_context(session, config.url)
+        if mix is not None:
+            if check_conformance:
+                context.require(workload.required_conformance(config, mix))
+            logger.info("Running workload")
+            logger.info("id,item count,duration (sec)")
+            result = await observed(
+                config,
+                store,
+                "workload",
+                workload.run_workload(config, session, context, mix),
+                session,
+                profile_config,
+            )
+            logger.info(f"Workload Results: {describe(result)}")
+            return {"workload": result.to_dict()}
+        if selected is None:
+            selected = scenarios.select(
+                scenarios.builtin_scenarios(config.seed, feature_collection)
+            )
+        if check_conformance:
+            context.require(
+                required_conformance(
+                    config, ramp_config, ramp_queries, feature_collection, selected
+                )
+            )
+        if ramp_config is not None:
+            logger.info(f"Running ramp over {ramp_queries} queries")
+            generators = {**QUERY_GENERATORS}
+            if feature_collection is not None:
+                generators["feature-collection"] = feature_collection
+            source = generators[ramp_queries]
+            queries = workload.repeated(
+                ramp_queries,
+                lambda n: source(replace(config, seed=config.seed + n)),
+            )
+            return {"ramp": await ramp(config, session, context, ramp_config, queries)}
+        if config.workers > 1:
+            with monitor.TrackedExecutor(
+                ProcessPoolExecutor(
+                    max_workers=config.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                ),
+                config.workers,
+            ) as executor:
+                return await run_scenarios(
+                    scenarios.Runtime(config, session, context, executor),
+                    selected,
+                    store,
+                    profile_config,
+                )
+        return await run_scenarios(
+            scenarios.Runtime(config, session, context, None, agents),
+            selected,
+            store,
+            profile_config,
+        )
+
+
+def required_conformance(
+    config: query.BenchmarkConfig,
+    ramp_config: Optional[RampConfig] = None,
+    ramp_queries: str = "random",
+    feature_collection: Optional[QuerySource] = None,
+    selected: Optional[list[scenarios.Scenario]] = None,
+) -> list[str]:
+    """The conformance classes required by the ramp or scenarios of a run."""
+    if ramp_config is not None:
+        required = ["item-search"]
+        if ramp_queries == "random" and config.queryables:
+            required.append("filter")
+        if (
+            ramp_queries == "feature-collection"
+            and feature_collection is not None
+            and feature_collection.params.get("sortby")
+        ):
+            required.append("sort")
+        return required
+
+    return scenarios.required_conformance(
+        config,
+        scenarios.select(scenarios.builtin_scenarios(config.seed, feature_collection))
+        if selected is None
+        else selected,
     )
-    logger.info(f"Countries, cloud cover ascending: {result[1]:.2f}s")
-    results["countries_cloud_cover_asc"] = result[1]
 
-    logger.info(f"Running random queries (seeded with {config.seed})")
-    result = await query.search_with_random_queries(
-        config=config,
+
+async def run_scenarios(
+    runtime: scenarios.Runtime,
+    selected: list[scenarios.Scenario],
+    store: Optional[results.ResultsStore] = None,
+    profile_config: Optional[monitor.ProfileConfig] = None,
+) -> dict[str, Any]:
+    output: dict[str, Any] = {}
+    for scenario in selected:
+        logger.info(f"Running {scenario.title}")
+        result = await observed(
+            scenarios.scenario_config(runtime.config, scenario),
+            store,
+            scenario.name,
+            scenarios.run_scenario(runtime, scenario),
+            runtime.session,
+            profile_config,
+            runtime.executor,
+            scenarios.request_count(runtime.config, scenario),
+        )
+        logger.info(f"{scenario.title}: {describe(result)}")
+        output[scenario.name] = result.to_dict()
+    return output
+
+
+async def observed(
+    config: query.BenchmarkConfig,
+    store: Optional[results.ResultsStore],
+    name: str,
+    co: Awaitable[ScenarioStats],
+    session: Optional[aiohttp.ClientSession] = None,
+    profile_config: Optional[monitor.ProfileConfig] = None,
+    executor: Optional[Executor] = None,
+    requests: Optional[int] = None,
+) -> ScenarioStats:
+    """Await a scenario, monitoring the client and storing the scenario if asked.
+
+    Only the requests after the warmup of the scenario, if it has one, are
+    measured. The measured requests and the statistics are stored if there's a
+    store, and the client is profiled if there's a profile config.
+    """
+    co = monitor.monitored(
+        logger,
+        name,
+        warmup.warmed_up(config, name, co, requests),
+        session,
+        executor,
+        profile_config,
     )
-    logger.info(f"Random Queries (seeded with {config.seed}): {result[1]:.2f}s")
-    results["random_queries"] = result[1]
-
-    repeated_item_times = 10000
-    repeated_item_concurrency = 50
-    logger.info(
-        f"Running repeated item, times={repeated_item_times} "
-        f"concurrency={repeated_item_concurrency}"
+    if store is None:
+        return await co
+    with store.recording(name):
+        result = await co
+    store.save(name, result)
+    return result
+
+
+def describe(stats: ScenarioStats) -> str:
+    p50 = stats.latency.percentile(50) or 0.0
+    p99 = stats.latency.percentile(99) or 0.0
+    return (
+        f"total time: {stats.duration:.2f}s, requests: {stats.count}, "
+        f"errors: {stats.errors}, p50: {p50:.2f}s, p99: {p99:.2f}s"
     )
-    result = await query.request_item_repeatedly(
-        config=config,
-        times=repeated_item_times,
-        concurrency=repeated_item_concurrency,
+
+
+@main.command(name="corpus")
+@click.argument("filename")
+@click.option(
+    "--id-field", required=True, help="The property that identifies each feature"
+)
+@click.option(
+    "--corpus-dir",
+    type=click.Path(file_okay=False),
+    help="The directory to write the corpus to, by default"
+    " $XDG_CACHE_HOME/stac-api-benchmark",
+)
+def compile_corpus(filename: str, id_field: str, corpus_dir: Optional[str]) -> None:
+    """Compile a feature collection for fast loading by later runs.
+
+    FILENAME is a GeoJSON FeatureCollection, GeoJSONL, or GeoParquet file, or the
+    name of one packaged with the benchmark. Runs compile each feature collection on
+    first use anyway, so this only moves that cost out of the first run.
+    """
+    try:
+        compiled, path = corpus.compile_file(filename, id_field, corpus_dir)
+    except (OSError, ValueError, KeyError, ImportError) as e:
+        raise click.ClickException(f"could not compile {filename}: {e!r}") from e
+    click.echo(
+        f"Compiled {len(compiled)} geometries with {int(compiled.vertex_count.sum())}"
+        f" vertices to {path}"
     )
-    logger.info(f"Repeated: {result:.2f}s")
-    results["repeated"] = result
 
-    result = await run_sort(config, "properties.eo:cloud_cover", "desc")
-    results["sort_cloud_cover_desc"] = result
 
-    result = await run_sort(config, "properties.eo:cloud_cover", "asc")
-    results["sort_cloud_cover_asc"] = result
+@main.command(name="scenarios")
+@click.option(
+    "--scenarios-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="A TOML or YAML file of scenarios to add to, or replace, the registered"
+    " scenarios",
+)
+def list_scenarios(scenarios_file: Optional[str]) -> None:
+    """List the scenarios that run can select, in the order that they run.
 
-    result = await run_sort(config, "properties.datetime", "desc")
-    results["sort_datetime_desc"] = result
+    The feature collection and complexity scenarios are only run with their
+    options to run, and opt-in scenarios only when --scenario selects them.
+    """
+    for scenario in select_scenarios(0, None, None, ("*",), (), scenarios_file, []):
+        tags = f" [{', '.join(scenario.tags)}]" if scenario.tags else ""
+        opt_in = " (opt-in)" if scenario.opt_in else ""
+        click.echo(
+            f"{scenario.name} ({scenario.runner}){tags}{opt_in}: {scenario.title}"
+        )
 
-    result = await run_sort(config, "properties.datetime", "asc")
-    results["sort_datetime_asc"] = result
 
-    result = await run_sort(config, "properties.created", "desc")
-    results["sort_created_desc"] = result
+@main.command(name="compare")
+@click.argument("results_db", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--run",
+    "run_ref",
+    help="The id or label of the run to compare, by default the latest run",
+)
+@click.option(
+    "--baseline",
+    "baseline_ref",
+    help="The id or label of the baseline run, by default the run before",
+)
+@click.option(
+    "--percentile",
+    "percentiles",
+    multiple=True,
+    default=compare.DEFAULT_PERCENTILES,
+    show_default=True,
+    type=click.Choice(["min", "mean", "p50", "p90", "p95", "p99", "p99.9", "max"]),
+    help="Supports multiple parameters. The latency percentiles to compare",
+)
+@click.option(
+    "--threshold",
+    default=0.1,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="The relative increase of a percentile that's a regression, e.g., 0.1 for"
+    " 10% slower",
+)
+@click.option(
+    "--alpha",
+    default=0.01,
+    show_default=True,
+    type=click.FloatRange(min=0, max=1),
+    help="The significance level of the test that a run is slower",
+)
+@click.option(
+    "--max-error-rate-increase",
+    default=0.01,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="The increase of the error rate that's a regression, e.g., 0.01 for one"
+    " percentage point",
+)
+def compare_to_baseline(
+    results_db: str,
+    run_ref: Optional[str],
+    baseline_ref: Optional[str],
+    percentiles: tuple[str, ...],
+    threshold: float,
+    alpha: float,
+    max_error_rate_increase: float,
+) -> None:
+    """Compare a stored run against a baseline, exiting with 1 on a regression.
+
+    A scenario regresses if a percentile is more than --threshold slower and the
+    run is significantly slower, or its error rate grows by more than
+    --max-error-rate-increase.
+    """
+    store = results.ResultsStore(results_db)
+    try:
+        current = store.find_run(run_ref)
+        baseline = store.find_run(
+            baseline_ref, before=None if baseline_ref else current.id
+        )
+        comparisons = compare.compare_runs(
+            store,
+            baseline,
+            current,
+            percentiles,
+            threshold,
+            alpha,
+            max_error_rate_increase,
+        )
+    except results.ResultsError as e:
+        raise click.ClickException(str(e)) from e
+    finally:
+        store.close()
+
+    click.echo(f"run {describe_run(current)} against {describe_run(baseline)}")
+    for c in comparisons:
+        deltas = ", ".join(
+            f"{p} {format_seconds(c.baseline[p])} -> {format_seconds(c.current[p])}"
+            f" ({'n/a' if delta is None else f'{delta:+.1%}'})"
+            for p, delta in c.deltas.items()
+        )
+        p_value = "n/a" if c.p_value is None else f"{c.p_value:.3g}"
+        if c.regressions:
+            status = f"REGRESSED: {'; '.join(c.regressions)}"
+        elif c.inconclusive:
+            status = f"INCONCLUSIVE: {'; '.join(c.inconclusive)}"
+        else:
+            status = "ok"
+        click.echo(
+            f"{c.scenario}: {deltas}, errors {c.baseline_error_rate:.1%} ->"
+            f" {c.error_rate:.1%}, p={p_value}: {status}"
+        )
+    if any(c.regressions for c in comparisons):
+        raise click.exceptions.Exit(1)
+
+
+def describe_run(run: results.Run) -> str:
+    label = f" ({run.label})" if run.label else ""
+    return f"{run.id}{label} at {run.started}"
+
+
+def format_seconds(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:.3f}s"
+
 
-    result = await run_sort(config, "properties.created", "asc")
-    results["sort_created_asc"] = result
+def parse_latency(ctx: click.Context, param: click.Parameter, value: str) -> str:
+    """Check that a latency distribution parses, keeping it as given."""
+    try:
+        mock.parse_latency(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from None
+    return value
 
-    return results
 
+def mock_options(f: Any) -> Any:
+    """The options of the mock STAC API, shared by ``mock`` and ``calibrate``."""
+    options = [
+        click.option(
+            "--items",
+            default=10000,
+            show_default=True,
+            type=click.IntRange(min=1),
+            help="The number of synthetic items of each collection",
+        ),
+        click.option(
+            "--max-limit",
+            default=1000,
+            show_default=True,
+            type=click.IntRange(min=1),
+            help="The largest page size the mock returns",
+        ),
+        click.option(
+            "--latency",
+            default="0",
+            show_default=True,
+            callback=parse_latency,
+            help="The delay of each search or item response, in seconds, e.g., 0.01,"
+            " uniform:0.01,0.05, exponential:0.02, or lognormal:0.02,0.5",
+        ),
+        click.option(
+            "--error-rate",
+            default=0.0,
+            show_default=True,
+            type=click.FloatRange(min=0, max=1),
+            help="The fraction of search or item responses that are 500s",
+        ),
+        click.option(
+            "--seed", default=0, help="The seed value for latencies and errors"
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+@main.command(name="mock")
+@click.option("--host", default="127.0.0.1", help="The address to listen on")
+@click.option("--port", default=8080, help="The port to listen on")
+@click.option(
+    "--collection",
+    "collections",
+    multiple=True,
+    default=["mock"],
+    show_default=True,
+    help="Supports multiple parameters. The ids of the collections to serve",
+)
+@mock_options
+def serve_mock(
+    host: str,
+    port: int,
+    collections: tuple[str, ...],
+    items: int,
+    max_limit: int,
+    latency: str,
+    error_rate: float,
+    seed: int,
+) -> None:
+    """Serve a mock STAC API, e.g., to run the benchmark against."""
+    mock_config = mock.MockConfig(
+        collections, items, max_limit, latency, error_rate, seed
+    )
+    click.echo(f"Serving a mock STAC API at http://{host}:{port}", err=True)
+    asyncio.run(mock.serve(mock_config, host, port))
+
+
+@main.command(name="calibrate")
+@click.option(
+    "--concurrency-steps",
+    "steps",
+    default="1,2,4,8,16,32,64,128,256",
+    show_default=True,
+    callback=parse_steps,
+    help="The comma-separated concurrencies to ramp through",
+)
+@click.option(
+    "--step-duration",
+    default=10.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="The seconds to run each step for",
+)
+@click.option(
+    "--requests",
+    "kind",
+    default="search",
+    show_default=True,
+    type=click.Choice(["search", "item"]),
+    help="Whether to make single-page searches or item GETs",
+)
+@click.option(
+    "--limit",
+    default=100,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="The page size of the searches",
+)
+@click.option(
+    "--response-mode",
+    default="parse",
+    show_default=True,
+    type=click.Choice(query.RESPONSE_MODES),
+    help="Parse each response, only count its features and find its next link"
+    " (with orjson, if it's installed), or drain it without parsing, following no"
+    " next links",
+)
+@click.option(
+    "--in-process",
+    is_flag=True,
+    default=False,
+    help="Serve the mock in this process, so it competes with the client",
+)
+@click.option(
+    "--timeout", default=30, show_default=True, help="The timeout of each request"
+)
+@mock_options
+@click_log.simple_verbosity_option(logger)
+def calibrate(
+    steps: list[float],
+    step_duration: float,
+    kind: str,
+    limit: int,
+    response_mode: str,
+    in_process: bool,
+    timeout: int,
+    items: int,
+    max_limit: int,
+    latency: str,
+    error_rate: float,
+    seed: int,
+) -> None:
+    """Measure the throughput ceiling of the client against a mock STAC API.
+
+    A ramp runs through the concurrency steps against a mock, which runs in a
+    process of its own unless --in-process. With no --latency, the knee of the
+    ramp is the most the client can do on this machine, so an API that appears
+    to top out near it may be limited by the client rather than itself.
+    """
+    warn_without_fast_decoder(response_mode)
+    mock_config = mock.MockConfig(
+        ("mock",), items, max_limit, latency, error_rate, seed
+    )
+    ramp_config = RampConfig(
+        steps=steps,
+        by_rate=False,
+        step_duration=step_duration,
+        # injected errors vary from step to step, so allow for twice as many
+        max_error_rate=min(1.0, 2 * error_rate + 0.01),
+        max_p99=float(timeout),
+    )
 
-async def run_sort(
-    config: query.BenchmarkConfig, field: str, direction: str
-) -> list[dict[str, float]]:
-    logger.info(f"Running sort {field} {direction}")
-    results = []
-    for collection in config.collections:
-        result = await query.sorting(
-            config=config,
-            collection=collection,
-            sortby=[query.es_sortby(field, direction)],  # noqa
+    def benchmark_config(url: str) -> query.BenchmarkConfig:
+        return query.BenchmarkConfig(
+            url=url,
+            collections=mock_config.collections,
+            concurrency=int(max(steps)),
+            seed=seed,
+            queryables=(),
+            num_features=None,
+            num_random=0,
+            max_items=limit,
+            limit=limit,
+            logger=logger,
+            timeout=timeout,
+            response_mode=response_mode,
         )
-        match result:
-            case Success(value):
-                logger.info(
-                    f"Results: sort {field} {direction} on {collection} "
-                    f": {value.duration:.2f}s"
-                )
-                results.append(
-                    {
-                        "sort": f"{collection}_{field}_{direction}",
-                        "duration": value.duration,
-                    }
-                )
-            case Failure(value):
-                logger.error(
-                    f"Results: sort {field} {direction} on {collection} "
-                    f": Error: {value.msg}"
-                )
-    return results
+
+    async def calibrate_in_process() -> dict[str, Any]:
+        runner, url = await mock.start(mock_config)
+        try:
+            return await mock.calibrate(
+                benchmark_config(url), mock_config, ramp_config, kind
+            )
+        finally:
+            await runner.cleanup()
+
+    if in_process:
+        result = asyncio.run(calibrate_in_process())
+    else:
+        process, url = mock.start_process(mock_config)
+        try:
+            result = asyncio.run(
+                mock.calibrate(benchmark_config(url), mock_config, ramp_config, kind)
+            )
+        finally:
+            process.terminate()
+            process.join()
+    print(json.dumps({"mock": asdict(mock_config), "ramp": result}))
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", help="The address to listen on")
+@click.option("--port", default=8900, help="The port to listen on")
+@click_log.simple_verbosity_option(logger)
+def agent(host: str, port: int) -> None:
+    """Run scenario shards sent by a coordinator (run --agent)."""
+    asyncio.run(distributed.serve_agent(logger, host, port))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+"""Discovery of the capabilities of the STAC API under test."""
+import re
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import Optional
+
+import aiohttp
+
+# patterns for the conformance classes that the benchmark scenarios depend on,
+# matched against any version of the STAC API or OGC API specifications
+CONFORMANCE_CLASSES = {
+    "item-search": re.compile(r"^https://api\.stacspec\.org/v[^/]+/item-search$"),
+    "sort": re.compile(r"^https://api\.stacspec\.org/v[^/]+/item-search#sort$"),
+    "filter": re.compile(
+        r"^(https://api\.stacspec\.org/v[^/]+/item-search#filter"
+        r"|http://www\.opengis\.net/spec/ogcapi-features-3/[^/]+/conf/filter)$"
+    ),
+}
+
+
+class ConformanceError(Exception):
+    """The STAC API does not conform to a class required by a scenario."""
+
+
+@dataclass(frozen=True)
+class ApiContext:
+    """The landing page and conformance of a STAC API, fetched once per run.
+
+    The landing page must be treated as read-only, as the context is shared by
+    every request in the run.
+    """
+
+    url: str
+    landing_page: Dict[str, Any]
+    conformance: FrozenSet[str]
+    search_href: str
+    search_method: str
+
+    def conforms_to(self, name: str) -> bool:
+        """Whether the API advertises the named conformance class."""
+        pattern = CONFORMANCE_CLASSES[name]
+        return any(pattern.match(uri) for uri in self.conformance)
+
+    def require(self, names: Iterable[str]) -> None:
+        """Raise a ConformanceError if any of the named classes are missing.
+
+        Args:
+            names: keys of :data:`CONFORMANCE_CLASSES`
+
+        Raises:
+            ConformanceError: if the API does not conform to every class
+        """
+        missing = sorted(name for name in set(names) if not self.conforms_to(name))
+        if missing:
+            raise ConformanceError(
+                f"{self.url} does not advertise conformance to: {', '.join(missing)}"
+            )
+
+
+def find_link(links: Iterable[Dict[str, Any]], rel: str) -> Optional[Dict[str, Any]]:
+    return next((link for link in links if link.get("rel") == rel), None)
+
+
+def search_link(landing_page: Dict[str, Any], url: str) -> tuple[str, str]:
+    """Resolve the href and method to use for Item Search, preferring POST."""
+    links = [
+        link for link in landing_page.get("links", []) if link.get("rel") == "search"
+    ]
+    for link in links:
+        if str(link.get("method", "GET")).upper() == "POST":
+            return str(link["href"]), "POST"
+    if links:
+        return str(links[0]["href"]), str(links[0].get("method", "GET")).upper()
+    return f"{url}/search", "POST"
+
+
+async def get_json(session: aiohttp.ClientSession, url: str) -> Any:
+    async with session.get(url) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+async def load_context(session: aiohttp.ClientSession, url: str) -> ApiContext:
+    """Fetch the landing page and conformance classes of a STAC API."""
+    landing_page = await get_json(session, url)
+
+    conformance = landing_page.get("conformsTo")
+    if conformance is None:
+        conformance_link = find_link(landing_page.get("links", []), "conformance")
+        conformance_url = (
+            str(conformance_link["href"]) if conformance_link else f"{url}/conformance"
+        )
+        conformance = (await get_json(session, conformance_url)).get("conformsTo", [])
+
+    search_href, search_method = search_link(landing_page, url)
+    return ApiContext(
+        url=url,
+        landing_page=landing_page,
+        conformance=frozenset(conformance),
+        search_href=search_href,
+        search_method=search_method,
+    )
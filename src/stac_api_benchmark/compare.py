@@ -0,0 +1,162 @@
+"""Comparison of a stored run against a baseline, to detect regressions.
+
+A scenario regresses if one of the compared latency percentiles grows by more
+than a threshold and its latencies are significantly slower than those of the
+baseline, by a one-sided Mann-Whitney U test on the stored requests, or if its
+error rate grows by more than a threshold. Noise alone rarely does both.
+"""
+import math
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .results import ResultsStore
+from .results import Run
+from .stats import ScenarioStats
+
+DEFAULT_PERCENTILES = ("p50", "p99")
+
+
+@dataclass
+class ScenarioComparison:
+    """How a scenario of a run compares against the baseline.
+
+    ``deltas`` are the relative changes of the latency percentiles, e.g., 0.1 for
+    10% slower. ``p_value`` is that of the latencies of the run being no slower
+    than those of the baseline, if both runs stored their requests. Without one,
+    percentiles that grew by more than the threshold are ``inconclusive`` rather
+    than regressions.
+    """
+
+    scenario: str
+    baseline: Dict[str, Optional[float]]
+    current: Dict[str, Optional[float]]
+    deltas: Dict[str, Optional[float]]
+    baseline_error_rate: float
+    error_rate: float
+    p_value: Optional[float] = None
+    regressions: List[str] = field(default_factory=list)
+    inconclusive: List[str] = field(default_factory=list)
+
+
+def error_rate(scenario_stats: ScenarioStats) -> float:
+    """The fraction of requests that failed."""
+    return scenario_stats.errors / scenario_stats.count if scenario_stats.count else 0.0
+
+
+def mann_whitney_p(
+    baseline: NDArray[np.float64], current: NDArray[np.float64]
+) -> Optional[float]:
+    """The one-sided p-value of the current values being no greater.
+
+    The normal approximation of the Mann-Whitney U test is used, with a
+    correction for ties, so there should be at least about 20 of each.
+    """
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return None
+    combined = np.concatenate([current, baseline])
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    # the average rank of each distinct value, from 1
+    ends = np.cumsum(counts)
+    ranks = ((ends - counts + 1 + ends) / 2)[inverse]
+    u = float(ranks[:n1].sum()) - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    ties = float((counts**3 - counts).sum())
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def relative_delta(
+    baseline: Optional[float], current: Optional[float]
+) -> Optional[float]:
+    """The change from the baseline, relative to the baseline."""
+    if baseline is None or current is None or baseline == 0:
+        return None
+    return (current - baseline) / baseline
+
+
+def compare_scenario(
+    scenario: str,
+    baseline: ScenarioStats,
+    current: ScenarioStats,
+    p_value: Optional[float],
+    percentiles: Sequence[str] = DEFAULT_PERCENTILES,
+    threshold: float = 0.1,
+    alpha: float = 0.01,
+    max_error_rate_increase: float = 0.01,
+) -> ScenarioComparison:
+    """Compare the statistics of a scenario against the baseline."""
+    baseline_summary = baseline.latency.summary()
+    current_summary = current.latency.summary()
+    comparison = ScenarioComparison(
+        scenario=scenario,
+        baseline={p: baseline_summary[p] for p in percentiles},
+        current={p: current_summary[p] for p in percentiles},
+        deltas={
+            p: relative_delta(baseline_summary[p], current_summary[p])
+            for p in percentiles
+        },
+        baseline_error_rate=error_rate(baseline),
+        error_rate=error_rate(current),
+        p_value=p_value,
+    )
+    for p, delta in comparison.deltas.items():
+        if delta is None or delta <= threshold:
+            continue
+        if p_value is None:
+            comparison.inconclusive.append(f"{p} +{delta:.1%}")
+        elif p_value < alpha:
+            comparison.regressions.append(f"{p} +{delta:.1%}")
+    increase = comparison.error_rate - comparison.baseline_error_rate
+    if increase > max_error_rate_increase:
+        comparison.regressions.append(f"error rate +{increase:.1%}")
+    return comparison
+
+
+def compare_runs(
+    store: ResultsStore,
+    baseline: Run,
+    current: Run,
+    percentiles: Sequence[str] = DEFAULT_PERCENTILES,
+    threshold: float = 0.1,
+    alpha: float = 0.01,
+    max_error_rate_increase: float = 0.01,
+) -> List[ScenarioComparison]:
+    """Compare the scenarios that both runs ran, in the order the run ran them.
+
+    Without stored requests for a scenario in either run, e.g., because it ran
+    in worker processes, there's no test of significance, so percentile deltas
+    are only reported as inconclusive.
+    """
+    baseline_stats = store.scenario_stats(baseline.id)
+    comparisons = []
+    for scenario, current_stats in store.scenario_stats(current.id).items():
+        if scenario not in baseline_stats:
+            continue
+        p_value = mann_whitney_p(
+            store.latencies(baseline.id, scenario),
+            store.latencies(current.id, scenario),
+        )
+        comparisons.append(
+            compare_scenario(
+                scenario,
+                baseline_stats[scenario],
+                current_stats,
+                p_value,
+                percentiles,
+                threshold,
+                alpha,
+                max_error_rate_increase,
+            )
+        )
+    return comparisons
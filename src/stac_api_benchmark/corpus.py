@@ -0,0 +1,341 @@
+"""Feature collections compiled to a compact binary corpus of query geometries.
+
+Parsing a large GeoJSON file takes seconds, so each feature collection is
+compiled once into a file of flat arrays: the feature ids, the coordinates, the
+offsets of each ring, polygon, and geometry into them, and the bbox, vertex
+count, and area of each geometry. Later runs memory-map the file and build each
+GeoJSON geometry only when its query is generated.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .features import read_features
+from .features import resolve_path
+from .geometry import rings_valid
+
+Array = NDArray[Any]
+
+MAGIC = b"SABCORP1"
+VERSION = 2
+ALIGNMENT = 8
+
+ARRAY_NAMES = (
+    "id_offsets",
+    "id_bytes",
+    "coordinates",
+    "ring_offsets",
+    "polygon_offsets",
+    "geometry_offsets",
+    "multi",
+    "bbox",
+    "vertex_count",
+    "area",
+    "valid",
+)
+
+# compiled corpora, by the filename and id field they were compiled from
+_corpora: Dict[Tuple[str, str], "Corpus"] = {}
+
+
+@dataclass(frozen=True)
+class Corpus:
+    """The geometries of a feature collection, by feature id.
+
+    Rings are slices of ``coordinates``, polygons are slices of the rings, and
+    geometries are slices of the polygons, each delimited by an offsets array
+    one longer than the number of slices. The area of each geometry is planar,
+    in square degrees. A geometry is not valid if any of its rings intersect
+    themselves.
+    """
+
+    id_offsets: Array
+    id_bytes: Array
+    coordinates: Array
+    ring_offsets: Array
+    polygon_offsets: Array
+    geometry_offsets: Array
+    multi: Array
+    bbox: Array
+    vertex_count: Array
+    area: Array
+    valid: Array
+
+    def __len__(self) -> int:
+        """The number of geometries."""
+        return len(self.multi)
+
+    def id(self, index: int) -> str:
+        """The feature id of a geometry."""
+        start, end = self.id_offsets[index : index + 2]
+        return self.id_bytes[start:end].tobytes().decode()
+
+    def vertices(self, index: int) -> Tuple[int, int]:
+        """The start and end of the coordinates of a geometry."""
+        start, end = self.geometry_offsets[index : index + 2]
+        return (
+            int(self.ring_offsets[self.polygon_offsets[start]]),
+            int(self.ring_offsets[self.polygon_offsets[end]]),
+        )
+
+    def geometry(self, index: int, keep: Optional[Array] = None) -> Dict[str, Any]:
+        """A geometry as a GeoJSON Polygon or MultiPolygon.
+
+        Args:
+            index: the index of the geometry
+            keep: a mask of the vertices of the geometry to keep, by default all
+        """
+        polygons = []
+        first = self.vertices(index)[0]
+        start, end = self.geometry_offsets[index : index + 2]
+        for polygon in range(start, end):
+            ring_start, ring_end = self.polygon_offsets[polygon : polygon + 2]
+            offsets = self.ring_offsets[ring_start : ring_end + 1].tolist()
+            rings = []
+            for i in range(len(offsets) - 1):
+                ring = self.coordinates[offsets[i] : offsets[i + 1]]
+                if keep is not None:
+                    ring = ring[keep[offsets[i] - first : offsets[i + 1] - first]]
+                rings.append(ring.tolist())
+            polygons.append(rings)
+        if self.multi[index]:
+            return {"type": "MultiPolygon", "coordinates": polygons}
+        return {"type": "Polygon", "coordinates": polygons[0]}
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Lazily generate the feature id and geometry of each geometry."""
+        for index in range(len(self)):
+            yield self.id(index), self.geometry(index)
+
+
+def ring_area(ring: Array) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))) / 2
+
+
+def compile_corpus(features: Iterable[Tuple[str, Dict[str, Any]]]) -> Corpus:
+    """Compile Polygon and MultiPolygon geometries, by feature id, to a corpus.
+
+    Only the first geometry with each feature id is kept.
+
+    Raises:
+        ValueError: if a geometry is not a Polygon or MultiPolygon
+    """
+    ids: List[bytes] = []
+    rings: List[Array] = []
+    ring_counts: List[int] = []
+    polygon_counts: List[int] = []
+    multi: List[bool] = []
+    bboxes: List[Tuple[float, float, float, float]] = []
+    vertex_counts: List[int] = []
+    areas: List[float] = []
+    valid: List[bool] = []
+    seen = set()
+
+    for search_id, geometry in features:
+        if search_id in seen:
+            continue
+        seen.add(search_id)
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            raise ValueError(
+                f"feature {search_id} has a {geometry['type']} geometry,"
+                " not a Polygon or MultiPolygon"
+            )
+        geometry_rings = [
+            np.asarray(ring, dtype=np.float64)[:, :2]
+            for polygon in polygons
+            for ring in polygon
+        ]
+        points = np.concatenate(geometry_rings)
+
+        ids.append(search_id.encode())
+        rings.extend(geometry_rings)
+        ring_counts.extend(len(polygon) for polygon in polygons)
+        polygon_counts.append(len(polygons))
+        multi.append(geometry["type"] == "MultiPolygon")
+        bboxes.append((*points.min(axis=0), *points.max(axis=0)))
+        vertex_counts.append(len(points))
+        # the first ring of each polygon is its exterior, the rest are holes
+        area = 0.0
+        ring_index = 0
+        for polygon in polygons:
+            area += ring_area(geometry_rings[ring_index])
+            for hole in geometry_rings[ring_index + 1 : ring_index + len(polygon)]:
+                area -= ring_area(hole)
+            ring_index += len(polygon)
+        areas.append(area)
+        valid.append(rings_valid(geometry_rings))
+
+    def offsets(counts: List[int]) -> Array:
+        return np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+
+    return Corpus(
+        id_offsets=offsets([len(i) for i in ids]),
+        id_bytes=np.frombuffer(b"".join(ids), dtype=np.uint8),
+        coordinates=np.concatenate(rings) if rings else np.empty((0, 2)),
+        ring_offsets=offsets([len(ring) for ring in rings]),
+        polygon_offsets=offsets(ring_counts),
+        geometry_offsets=offsets(polygon_counts),
+        multi=np.array(multi, dtype=np.bool_),
+        bbox=np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+        vertex_count=np.array(vertex_counts, dtype=np.int64),
+        area=np.array(areas, dtype=np.float64),
+        valid=np.array(valid, dtype=np.bool_),
+    )
+
+
+def write_corpus(corpus: Corpus, path: Path, source: Dict[str, Any]) -> None:
+    """Write a corpus to a file, replacing any existing file atomically.
+
+    Args:
+        corpus: the corpus to write
+        path: the file to write
+        source: a description of the file the corpus was compiled from, which
+            must match for the corpus to be read back by :func:`read_corpus`
+    """
+    write_arrays({name: getattr(corpus, name) for name in ARRAY_NAMES}, path, source)
+
+
+def read_corpus(path: Path, source: Dict[str, Any]) -> Optional[Corpus]:
+    """Memory-map a corpus file, if it exists and was compiled from the source."""
+    arrays = read_arrays(path, source)
+    return None if arrays is None else Corpus(**arrays)
+
+
+def write_arrays(arrays: Dict[str, Array], path: Path, source: Dict[str, Any]) -> None:
+    """Write named arrays to a file, replacing any existing file atomically."""
+    specs: Dict[str, Any] = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        specs[name] = {
+            "dtype": array.dtype.str,
+            "shape": array.shape,
+            "offset": offset,
+        }
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({"version": VERSION, "source": source, "arrays": specs})
+    # padded so that every array starts aligned to its dtype
+    header_bytes = header.encode()
+    header_bytes += b" " * (-(len(MAGIC) + 8 + len(header_bytes)) % ALIGNMENT)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for array in arrays.values():
+                data = np.ascontiguousarray(array).tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % ALIGNMENT))
+        os.replace(tmp, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def read_arrays(path: Path, source: Dict[str, Any]) -> Optional[Dict[str, Array]]:
+    """Memory-map the arrays in a file, if it exists and is from the source."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != VERSION or header.get("source") != source:
+        return None
+
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    start = len(MAGIC) + 8 + header_length
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        offset = start + spec["offset"]
+        arrays[name] = (
+            data[offset : offset + count * dtype.itemsize]
+            .view(dtype)
+            .reshape(spec["shape"])
+        )
+    return arrays
+
+
+def default_corpus_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "stac-api-benchmark"
+
+
+def corpus_path(path: Path, id_field: str, corpus_dir: Optional[str]) -> Path:
+    """The file that a feature collection is compiled to."""
+    key = hashlib.sha1(f"{path.resolve()}\0{id_field}".encode()).hexdigest()[:12]
+    directory = Path(corpus_dir) if corpus_dir else default_corpus_dir()
+    return directory / f"{path.name}.{key}.corpus"
+
+
+def source_of(path: Path, id_field: str) -> Dict[str, Any]:
+    """A description of a feature collection file that changes when it does."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "id_field": id_field}
+
+
+def compile_file(
+    filename: str, id_field: str, corpus_dir: Optional[str] = None
+) -> Tuple[Corpus, Path]:
+    """Compile a feature collection file and write the corpus to the corpus dir."""
+    path = resolve_path(filename)
+    corpus = compile_corpus(read_features(filename, id_field))
+    output = corpus_path(path, id_field, corpus_dir)
+    write_corpus(corpus, output, source_of(path, id_field))
+    _corpora[(filename, id_field)] = corpus
+    return corpus, output
+
+
+def load_corpus(
+    filename: str, id_field: str, corpus_dir: Optional[str] = None
+) -> Corpus:
+    """Load the corpus of a feature collection, compiling it on first use.
+
+    Corpora are cached in-process by filename and id field, and on disk in the
+    corpus dir until the feature collection file changes.
+
+    Args:
+        filename: a file readable by :func:`features.read_features`
+        id_field: the property of each feature that identifies it
+        corpus_dir: the directory of compiled corpora, by default
+            ``$XDG_CACHE_HOME/stac-api-benchmark``
+    """
+    key = (filename, id_field)
+    if key not in _corpora:
+        path = resolve_path(filename)
+        source = source_of(path, id_field)
+        corpus = read_corpus(corpus_path(path, id_field, corpus_dir), source)
+        if corpus is None:
+            corpus = compile_corpus(read_features(filename, id_field))
+            # a corpus dir that can't be written to only costs compiling again
+            with suppress(OSError):
+                write_corpus(corpus, corpus_path(path, id_field, corpus_dir), source)
+        _corpora[key] = corpus
+    return _corpora[key]
@@ -0,0 +1,215 @@
+"""Coordinator and agents for running scenarios from multiple hosts.
+
+The coordinator and agents exchange newline-delimited JSON messages over TCP.
+For each scenario, the coordinator connects to every agent and sends it the
+:class:`~stac_api_benchmark.query.BenchmarkConfig` for its shard and the
+:class:`~stac_api_benchmark.workers.QuerySource` of the queries. Each agent
+prepares to generate its shard of the queries and replies ``ready``, with the
+time on its clock. Once every agent is ready, the coordinator sends them all
+the same start time, shifted by the offset of each agent's clock from its own,
+and each agent replies with its statistics once it has run its shard.
+"""
+import asyncio
+import json
+import time
+from asyncio import StreamReader
+from asyncio import StreamWriter
+from asyncio import TimeoutError
+from asyncio import wait_for
+from dataclasses import replace
+from logging import Logger
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from . import api
+from . import query
+from .stats import ScenarioStats
+from .warmup import warmed_up
+from .workers import QuerySource
+from .workers import shard
+from .workers import shard_config
+
+# statistics messages, with their histograms, can exceed the default line limit
+MESSAGE_LIMIT = 2**26
+
+# seconds between the start message being sent and the agents starting, so
+# that they all start at the same time
+START_DELAY = 0.5
+
+
+class AgentError(Exception):
+    """An agent failed to run its shard of a scenario."""
+
+
+async def read_message(reader: StreamReader) -> Dict[str, Any]:
+    line = await reader.readline()
+    if not line:
+        raise AgentError("connection closed")
+    message: Dict[str, Any] = json.loads(line)
+    if message.get("type") == "error":
+        raise AgentError(message.get("message"))
+    return message
+
+
+async def expect(
+    reader: StreamReader, agent: str, type: str, timeout: float
+) -> Dict[str, Any]:
+    """Read a message of a type from an agent, waiting up to ``timeout`` seconds.
+
+    Raises:
+        AgentError: naming the agent, if it failed, timed out, or replied with
+            another type
+    """
+    try:
+        message = await wait_for(read_message(reader), timeout)
+    except TimeoutError:
+        raise AgentError(f"{agent}: no {type} message after {timeout:g}s") from None
+    except AgentError as e:
+        raise AgentError(f"{agent}: {e}") from e
+    if message.get("type") != type:
+        raise AgentError(
+            f"{agent}: expected a {type} message, got {message.get('type')!r}"
+        )
+    return message
+
+
+async def clock_offset(reader: StreamReader, agent: str, timeout: float) -> float:
+    """Wait for an agent to be ready, and estimate its clock's offset from ours.
+
+    The estimate is early by the time the reply took to arrive.
+    """
+    message = await expect(reader, agent, "ready", timeout)
+    return float(message["time"]) - time.time()
+
+
+async def write_message(writer: StreamWriter, message: Dict[str, Any]) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Split a ``host:port`` address."""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+async def connect(agent: str, timeout: float) -> Tuple[StreamReader, StreamWriter]:
+    """Connect to an agent, waiting up to ``timeout`` seconds.
+
+    Raises:
+        AgentError: naming the agent, if it can't be reached
+    """
+    try:
+        return await wait_for(
+            asyncio.open_connection(*parse_address(agent), limit=MESSAGE_LIMIT),
+            timeout,
+        )
+    except TimeoutError:
+        raise AgentError(f"{agent}: no connection after {timeout:g}s") from None
+    except OSError as e:
+        raise AgentError(f"{agent}: {e}") from e
+
+
+async def run_agent_shard(
+    logger: Logger, reader: StreamReader, writer: StreamWriter
+) -> None:
+    """Run one shard of a scenario for a coordinator."""
+    message = await read_message(reader)
+    config = query.BenchmarkConfig.from_dict(message["config"], logger)
+    source = QuerySource(**message["source"])
+    logger.info(
+        f"Preparing shard {config.worker_index + 1} of {config.workers} of {source}"
+    )
+    async with query.create_session(config) as session:
+        context = await api.load_context(session, config.url)
+        queries = shard(source(config), config.worker_index, config.workers)
+        await write_message(writer, {"type": "ready", "time": time.time()})
+
+        message = await read_message(reader)
+        await asyncio.sleep(max(message["start_at"] - time.time(), 0))
+        stats = await warmed_up(
+            config,
+            f"shard {config.worker_index + 1}",
+            query.run_queries(config, session, context, queries),
+        )
+    await write_message(writer, {"type": "result", "stats": stats.encode()})
+
+
+async def serve_agent(logger: Logger, host: str, port: int) -> None:
+    """Run shards for coordinators until cancelled."""
+
+    async def handle(reader: StreamReader, writer: StreamWriter) -> None:
+        try:
+            await run_agent_shard(logger, reader, writer)
+        except Exception as e:
+            logger.exception("Failed to run shard")
+            await write_message(writer, {"type": "error", "message": str(e)})
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, limit=MESSAGE_LIMIT)
+    logger.info(f"Agent listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def run_distributed(
+    config: query.BenchmarkConfig, source: QuerySource, agents: List[str]
+) -> ScenarioStats:
+    """Run the queries across the agents and merge their results.
+
+    The queries are divided between the agents in the same way as between worker
+    processes. The duration is that of the slowest agent. Each reply of an agent
+    is waited for up to ``config.agent_timeout`` seconds.
+
+    Raises:
+        AgentError: if an agent can't be reached, fails, times out, or doesn't
+            follow the protocol
+    """
+    config = replace(config, workers=len(agents))
+    timeout = config.agent_timeout
+    connections: List[Tuple[StreamReader, StreamWriter]] = []
+    try:
+        for agent in agents:
+            connections.append(await connect(agent, timeout))
+        for index, (_, writer) in enumerate(connections):
+            await write_message(
+                writer,
+                {
+                    "type": "prepare",
+                    "config": shard_config(config, index).to_dict(),
+                    "source": {"generator": source.generator, "params": source.params},
+                },
+            )
+        offsets = await asyncio.gather(
+            *(
+                clock_offset(reader, agent, timeout)
+                for agent, (reader, _) in zip(agents, connections, strict=True)
+            )
+        )
+        for agent, offset in zip(agents, offsets, strict=True):
+            config.logger.info(f"Clock of agent {agent} is {offset:+.3f}s from ours")
+
+        start_at = time.time() + START_DELAY
+        for offset, (_, writer) in zip(offsets, connections, strict=True):
+            await write_message(
+                writer, {"type": "start", "start_at": start_at + offset}
+            )
+        results = await asyncio.gather(
+            *(
+                expect(reader, agent, "result", timeout)
+                for agent, (reader, _) in zip(agents, connections, strict=True)
+            )
+        )
+    finally:
+        for _, writer in connections:
+            writer.close()
+
+    shards = [ScenarioStats.decode(result["stats"]) for result in results]
+    stats = ScenarioStats()
+    for shard_stats in shards:
+        stats.merge(shard_stats)
+    stats.duration = max(shard_stats.duration for shard_stats in shards)
+    return stats
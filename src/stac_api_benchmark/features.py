@@ -0,0 +1,153 @@
+"""Streaming readers of the features in GeoJSON, GeoJSONL, and GeoParquet files."""
+import importlib.resources
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import TextIO
+from typing import Tuple
+from zipfile import ZipFile
+
+from .geometry import decode_wkb
+
+# files with one GeoJSON Feature per line, rather than a FeatureCollection
+LINE_SUFFIXES = (".geojsonl", ".geojsonseq", ".geojsons", ".ndjson", ".jsonl")
+PARQUET_SUFFIXES = (".parquet", ".geoparquet")
+
+FEATURES_ARRAY = re.compile(r'"features"\s*:\s*\[')
+READ_SIZE = 1 << 20
+
+
+def resolve_path(filename: str) -> Path:
+    """The path of a file, or else of the packaged GeoJSON file of that name."""
+    if os.path.exists(filename):
+        return Path(filename)
+    return Path(str(importlib.resources.files("geojson_files").joinpath(filename)))
+
+
+def feature_id(feature: Dict[str, Any], id_field: str) -> str:
+    """The value of the id field in the properties of a feature, or else of the feature.
+
+    Raises:
+        KeyError: if neither the properties nor the feature have the id field
+    """
+    properties = feature.get("properties") or {}
+    if id_field in properties:
+        return str(properties[id_field])
+    return str(feature[id_field])
+
+
+def iter_feature_collection(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Lazily parse each feature of a GeoJSON FeatureCollection.
+
+    Only the feature being parsed is held in memory, rather than the whole
+    collection, so the file can be much larger than memory.
+
+    Raises:
+        ValueError: if the stream is not a FeatureCollection
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        chunk = stream.read(READ_SIZE)
+        buffer += chunk
+        match = FEATURES_ARRAY.search(buffer)
+        if match:
+            position = match.end()
+            break
+        if not chunk:
+            raise ValueError("not a GeoJSON FeatureCollection")
+        # keep the tail, in case it is the start of the features key
+        buffer = buffer[-64:]
+
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # the feature continues past the end of the buffer
+            if eof:
+                raise
+            chunk = stream.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield feature
+        position = end
+
+
+def iter_feature_lines(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Lazily parse a file of one GeoJSON Feature per line, e.g., GeoJSONL."""
+    for line in stream:
+        # RFC 8142 GeoJSON text sequences start each feature with a record separator
+        line = line.strip().lstrip("\x1e")
+        if line:
+            yield json.loads(line)
+
+
+def iter_geoparquet(path: Path, id_field: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Lazily read the id and geometry of each row of a GeoParquet file.
+
+    Raises:
+        ImportError: if pyarrow is not installed
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "reading GeoParquet requires pyarrow, which is installed with the geo"
+            " extra, e.g., pip install 'stac-api-benchmark[geo]'"
+        ) from e
+
+    parquet = pq.ParquetFile(path)
+    geo = json.loads((parquet.schema_arrow.metadata or {}).get(b"geo", b"{}"))
+    column = geo.get("primary_column", "geometry")
+    for batch in parquet.iter_batches(columns=[id_field, column]):
+        ids = batch.column(id_field).to_pylist()
+        geometries = batch.column(column).to_pylist()
+        for search_id, wkb in zip(ids, geometries, strict=True):
+            if wkb is not None:
+                yield str(search_id), decode_wkb(wkb)
+
+
+def read_features(filename: str, id_field: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Lazily read the id and geometry of each feature with a geometry in a file.
+
+    Args:
+        filename: a GeoJSON FeatureCollection, GeoJSONL, or GeoParquet file, or
+            the name of a file packaged with the benchmark. GeoJSON files may
+            be zipped.
+        id_field: the property that identifies each feature
+    """
+    path = resolve_path(filename)
+    name = path.name.lower()
+    if name.endswith(PARQUET_SUFFIXES):
+        yield from iter_geoparquet(path, id_field)
+        return
+
+    with open(path, "rb") as f:
+        if name.endswith(".zip"):
+            zf = ZipFile(f)
+            member = zf.infolist()[0]
+            name = member.filename.lower()
+            binary = zf.open(member)
+        else:
+            binary = f
+        with io.TextIOWrapper(binary, encoding="utf-8") as stream:
+            features = (
+                iter_feature_lines(stream)
+                if name.endswith(LINE_SUFFIXES)
+                else iter_feature_collection(stream)
+            )
+            for feature in features:
+                if feature.get("geometry") is not None:
+                    yield feature_id(feature, id_field), feature["geometry"]
@@ -0,0 +1,204 @@
+"""Validity checks, repair, and WKB decoding of query polygons."""
+import struct
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+# how to handle a self-intersecting geometry in a feature collection
+INVALID_GEOMETRIES = ("exclude", "repair", "keep")
+
+# the number of segments whose candidate crossings are tested at once
+SEGMENT_CHUNK_SIZE = 4096
+
+WKB_POLYGON = 3
+WKB_MULTIPOLYGON = 6
+
+
+def ring_self_intersects(ring: NDArray[np.float64]) -> bool:
+    """Whether any two non-adjacent segments of a closed ring cross.
+
+    Candidate pairs of segments are found by sweeping over the segments sorted
+    by their minimum x, then tested for a proper crossing all at once.
+    """
+    # drop repeated points, which make zero length segments
+    keep = np.ones(len(ring), dtype=np.bool_)
+    keep[1:] = np.any(ring[1:] != ring[:-1], axis=1)
+    ring = ring[keep]
+    n = len(ring) - 1
+    if n < 4:
+        return False
+    starts, ends = ring[:-1], ring[1:]
+    min_x = np.minimum(starts[:, 0], ends[:, 0])
+    max_x = np.maximum(starts[:, 0], ends[:, 0])
+    min_y = np.minimum(starts[:, 1], ends[:, 1])
+    max_y = np.maximum(starts[:, 1], ends[:, 1])
+
+    order = np.argsort(min_x, kind="stable")
+    sorted_min_x = min_x[order]
+    # the segments in order[i + 1 : stops[i]] overlap segment order[i] in x
+    stops = np.searchsorted(sorted_min_x, max_x[order], side="right")
+
+    for chunk in range(0, n, SEGMENT_CHUNK_SIZE):
+        positions = np.arange(chunk, min(chunk + SEGMENT_CHUNK_SIZE, n))
+        counts = np.maximum(stops[positions] - positions - 1, 0)
+        if not counts.sum():
+            continue
+        first = np.repeat(positions, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        i = order[first]
+        j = order[first + 1 + offsets]
+
+        # adjacent segments share an end, including the first and last
+        apart = np.abs(i - j)
+        candidates = (
+            (apart != 1)
+            & (apart != n - 1)
+            & (min_y[i] <= max_y[j])
+            & (min_y[j] <= max_y[i])
+        )
+        i, j = i[candidates], j[candidates]
+        if len(i) and np.any(segments_cross(starts[i], ends[i], starts[j], ends[j])):
+            return True
+    return False
+
+
+def segments_cross(
+    a: NDArray[np.float64],
+    b: NDArray[np.float64],
+    c: NDArray[np.float64],
+    d: NDArray[np.float64],
+) -> NDArray[np.bool_]:
+    """Whether each segment ab crosses the segment cd at a single interior point."""
+
+    def orientation(
+        p: NDArray[np.float64], q: NDArray[np.float64], r: NDArray[np.float64]
+    ) -> NDArray[np.float64]:
+        return np.sign(  # type: ignore[no-any-return]
+            (q[:, 0] - p[:, 0]) * (r[:, 1] - p[:, 1])
+            - (q[:, 1] - p[:, 1]) * (r[:, 0] - p[:, 0])
+        )
+
+    d1 = orientation(a, b, c)
+    d2 = orientation(a, b, d)
+    d3 = orientation(c, d, a)
+    d4 = orientation(c, d, b)
+    return (d1 * d2 < 0) & (d3 * d4 < 0)
+
+
+def rings_valid(rings: Sequence[NDArray[np.float64]]) -> bool:
+    """Whether none of the rings of a geometry intersect themselves."""
+    return not any(ring_self_intersects(ring) for ring in rings)
+
+
+def geometry_rings(geometry: Dict[str, Any]) -> List[NDArray[np.float64]]:
+    """The rings of a GeoJSON Polygon or MultiPolygon, as arrays."""
+    polygons = (
+        [geometry["coordinates"]]
+        if geometry["type"] == "Polygon"
+        else geometry["coordinates"]
+    )
+    return [
+        np.asarray(ring, dtype=np.float64)[:, :2]
+        for polygon in polygons
+        for ring in polygon
+    ]
+
+
+def geometry_valid(geometry: Dict[str, Any]) -> bool:
+    """Whether none of the rings of a GeoJSON Polygon or MultiPolygon intersect."""
+    return rings_valid(geometry_rings(geometry))
+
+
+def repair(geometry: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a Polygon or MultiPolygon valid, keeping only its polygonal parts.
+
+    Raises:
+        ImportError: if shapely is not installed
+    """
+    try:
+        from shapely.geometry import mapping
+        from shapely.geometry import MultiPolygon
+        from shapely.geometry import shape
+        from shapely.validation import make_valid
+    except ImportError as e:  # pragma: no cover
+        raise ImportError(
+            "repairing geometries requires shapely, which is installed with the"
+            " geo extra, e.g., pip install 'stac-api-benchmark[geo]'"
+        ) from e
+
+    valid = make_valid(shape(geometry))
+    parts = getattr(valid, "geoms", [valid])
+    polygons = [
+        polygon
+        for part in parts
+        for polygon in getattr(part, "geoms", [part])
+        if polygon.geom_type == "Polygon" and not polygon.is_empty
+    ]
+    if len(polygons) == 1:
+        return dict(mapping(polygons[0]))
+    return dict(mapping(MultiPolygon(polygons)))
+
+
+def decode_wkb(wkb: bytes) -> Dict[str, Any]:
+    """Decode a WKB Polygon or MultiPolygon, 2D or with Z or M, to GeoJSON.
+
+    Raises:
+        ValueError: if the WKB is not a Polygon or MultiPolygon
+    """
+    geometry, _ = _decode_wkb(memoryview(wkb), 0)
+    return geometry
+
+
+def _decode_wkb(wkb: memoryview, offset: int) -> Tuple[Dict[str, Any], int]:
+    byte_order = "<" if wkb[offset] == 1 else ">"
+    (code,) = struct.unpack_from(f"{byte_order}I", wkb, offset + 1)
+    offset += 5
+    # ISO WKB adds 1000 for Z, 2000 for M, and 3000 for ZM; EWKB sets high bits
+    dimensions = 2
+    if code & 0x80000000:
+        dimensions += 1
+    if code & 0x40000000:
+        dimensions += 1
+    if code & 0x20000000:
+        offset += 4  # SRID
+    code &= 0x0FFFFFFF
+    dimensions += (0, 1, 1, 2)[code // 1000]
+    code %= 1000
+
+    if code == WKB_POLYGON:
+        rings, offset = _decode_rings(wkb, offset, byte_order, dimensions)
+        return {"type": "Polygon", "coordinates": rings}, offset
+    if code == WKB_MULTIPOLYGON:
+        (count,) = struct.unpack_from(f"{byte_order}I", wkb, offset)
+        offset += 4
+        polygons = []
+        for _ in range(count):
+            polygon, offset = _decode_wkb(wkb, offset)
+            polygons.append(polygon["coordinates"])
+        return {"type": "MultiPolygon", "coordinates": polygons}, offset
+    raise ValueError(f"WKB geometry type {code} is not a Polygon or MultiPolygon")
+
+
+def _decode_rings(
+    wkb: memoryview, offset: int, byte_order: str, dimensions: int
+) -> Tuple[List[Any], int]:
+    (count,) = struct.unpack_from(f"{byte_order}I", wkb, offset)
+    offset += 4
+    rings = []
+    dtype = np.dtype(f"{byte_order}f8")
+    for _ in range(count):
+        (points,) = struct.unpack_from(f"{byte_order}I", wkb, offset)
+        offset += 4
+        coordinates = np.frombuffer(
+            wkb, dtype=dtype, count=points * dimensions, offset=offset
+        ).reshape(points, dimensions)
+        rings.append(coordinates[:, :2].tolist())
+        offset += points * dimensions * 8
+    return rings, offset
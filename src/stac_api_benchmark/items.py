@@ -0,0 +1,155 @@
+"""Item GETs over a pool of items, with the popularity skew of real traffic.
+
+A pool of item self links is harvested from each collection with a paginated
+search, and cached on disk so that later runs request the same items. The
+items are then requested with keys drawn from a distribution: ``uniform``,
+``zipf`` with a tunable skew, or ``hotset``, where a small hot set of items
+gets most of the requests. Each request is grouped by whether it's the first
+access of its item, which a cache misses, or a repeat access, which it can hit.
+"""
+import hashlib
+import json
+from bisect import bisect
+from contextlib import suppress
+from itertools import accumulate
+from pathlib import Path
+from random import Random
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import aiohttp
+
+from . import query
+from .api import ApiContext
+from .corpus import default_corpus_dir
+
+DISTRIBUTIONS = ("uniform", "zipf", "hotset")
+
+DEFAULT_POOL_SIZE = 1000
+DEFAULT_REQUESTS = 10000
+
+
+def key_weights(
+    distribution: str,
+    size: int,
+    skew: float = 1.0,
+    hot_fraction: float = 0.1,
+    hot_weight: float = 0.9,
+) -> List[float]:
+    """The relative popularity of each of ``size`` keys, most popular first.
+
+    Args:
+        distribution: ``uniform``, ``zipf``, or ``hotset``
+        size: the number of keys
+        skew: the exponent of a Zipf distribution, where the key of rank k has
+            weight 1 / k ** skew
+        hot_fraction: the fraction of the keys in the hot set
+        hot_weight: the fraction of the requests for keys in the hot set
+
+    Raises:
+        ValueError: if the distribution or its parameters aren't valid
+    """
+    if distribution == "uniform":
+        return [1.0] * size
+    if distribution == "zipf":
+        if skew < 0:
+            raise ValueError("the skew of a zipf distribution can't be negative")
+        return [1 / rank**skew for rank in range(1, size + 1)]
+    if distribution == "hotset":
+        if not 0 < hot_fraction <= 1 or not 0 <= hot_weight <= 1:
+            raise ValueError("hot_fraction and hot_weight must be between 0 and 1")
+        hot = hot_count(size, hot_fraction)
+        if hot == size:
+            return [1.0] * size
+        return [hot_weight / hot] * hot + [(1 - hot_weight) / (size - hot)] * (
+            size - hot
+        )
+    raise ValueError(
+        f"distribution {distribution!r} is not one of {', '.join(DISTRIBUTIONS)}"
+    )
+
+
+def hot_count(size: int, hot_fraction: float) -> int:
+    """The number of keys in the hot set."""
+    return max(1, round(size * hot_fraction))
+
+
+def pool_path(
+    url: str, collection: str, size: int, cache_dir: Optional[str] = None
+) -> Path:
+    """The file that a pool of item links is cached in."""
+    key = hashlib.sha1(f"{url}\0{collection}\0{size}".encode()).hexdigest()[:12]
+    directory = Path(cache_dir) if cache_dir else default_corpus_dir()
+    return directory / f"items.{key}.json"
+
+
+async def load_pool(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    collection: str,
+    size: int,
+    refresh: bool = False,
+) -> List[str]:
+    """Load the self links of up to ``size`` items in a collection.
+
+    The links are harvested on first use, or with ``refresh``, and cached in
+    the corpus dir by the API url, collection, and size.
+    """
+    path = pool_path(config.url, collection, size, config.corpus_dir)
+    if not refresh:
+        with suppress(OSError, ValueError):
+            hrefs: List[str] = json.loads(path.read_text())
+            return hrefs
+    hrefs = await query.item_hrefs(session, context, collection, size)
+    # a cache dir that can't be written to only costs harvesting again
+    with suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(hrefs))
+    return hrefs
+
+
+def item_requests(
+    config: query.BenchmarkConfig,
+    pools: Dict[str, List[str]],
+    count: int,
+    distribution: str = "zipf",
+    **params: Any,
+) -> Iterator[query.ItemRequest]:
+    """Lazily generate ``count`` requests for items drawn from the pools.
+
+    The items of every collection are ranked in a random order, seeded by the
+    run, and drawn by the weight of their rank. Each request is grouped under
+    ``access:first`` or ``access:repeat``, and for a hot set, under
+    ``set:hot`` or ``set:cold``.
+
+    Raises:
+        ValueError: if there are no items, or the distribution or its
+            parameters aren't valid
+    """
+    keys: List[Tuple[str, str]] = [
+        (collection, href) for collection, hrefs in pools.items() for href in hrefs
+    ]
+    if not keys:
+        raise ValueError("there are no items to request")
+    cum_weights = list(accumulate(key_weights(distribution, len(keys), **params)))
+    hot = hot_count(len(keys), params.get("hot_fraction", 0.1))
+    rng = Random(config.seed)
+    rng.shuffle(keys)
+
+    def requests() -> Iterator[query.ItemRequest]:
+        seen = set()
+        for i in range(count):
+            rank = bisect(cum_weights, rng.random() * cum_weights[-1])
+            collection, href = keys[rank]
+            groups = ["access:repeat" if rank in seen else "access:first"]
+            if distribution == "hotset":
+                groups.append("set:hot" if rank < hot else "set:cold")
+            seen.add(rank)
+            yield query.ItemRequest(f"item-{i}", collection, href, tuple(groups))
+
+    return requests()
@@ -0,0 +1,416 @@
+"""An in-process stand-in for a STAC API, for calibration and self-testing.
+
+The mock serves a landing page, conformance, collections, items, and Item
+Search by GET or POST, paginated with ``next`` links. Every collection has the
+same number of synthetic items, which are generated from their index on
+request rather than stored. Searches match every item of their collections:
+the mock doesn't evaluate geometries, datetimes, filters, or sorts, as only
+the cost of the client is of interest.
+
+Responses can be delayed by a latency distribution, and can fail at random,
+so that the benchmark's own measurements can be checked against known values.
+"""
+import asyncio
+import math
+import multiprocessing
+import socket
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from itertools import cycle
+from multiprocessing.process import BaseProcess
+from random import Random
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from aiohttp import web
+
+from .api import load_context
+from .query import BenchmarkConfig
+from .query import create_session
+from .query import item_hrefs
+from .query import ItemRequest
+from .query import Request
+from .query import SearchQuery
+from .ramp import ramp
+from .ramp import RampConfig
+
+CONFORMANCE = (
+    "https://api.stacspec.org/v1.0.0/core",
+    "https://api.stacspec.org/v1.0.0/collections",
+    "https://api.stacspec.org/v1.0.0/ogcapi-features",
+    "https://api.stacspec.org/v1.0.0/item-search",
+    "https://api.stacspec.org/v1.0.0/item-search#sort",
+    "https://api.stacspec.org/v1.0.0/item-search#filter",
+)
+
+# the datetime of the first item of each collection; each later item is an hour later
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+Latency = Callable[[Random], float]
+
+# the number of parameters of each latency distribution
+LATENCY_PARAMS = {"constant": 1, "uniform": 2, "exponential": 1, "lognormal": 2}
+
+
+@dataclass
+class MockConfig:
+    """Config of the mock STAC API.
+
+    ``latency`` is a distribution like ``exponential:0.05``, as parsed by
+    :func:`parse_latency`, of the delay before each search or item response,
+    and ``error_rate`` is the fraction of those that respond with a 500.
+    Searches return at most ``max_limit`` items per page.
+    """
+
+    collections: Tuple[str, ...] = ("mock",)
+    items: int = 10000
+    max_limit: int = 1000
+    latency: str = "0"
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+def parse_latency(spec: str) -> Latency:
+    """Parse a latency distribution, in seconds.
+
+    The distributions are ``constant:S`` (or just ``S``), ``uniform:LOW,HIGH``,
+    ``exponential:MEAN``, and ``lognormal:MEDIAN,SIGMA``.
+
+    Raises:
+        ValueError: if the distribution isn't one of those
+    """
+    name, _, args = spec.rpartition(":")
+    name = name or "constant"
+    try:
+        params = [float(arg) for arg in args.split(",")]
+    except ValueError:
+        params = []
+    if LATENCY_PARAMS.get(name) != len(params) or any(p < 0 for p in params):
+        raise ValueError(
+            f"{spec!r} is not a latency distribution like 0.01, uniform:0.01,0.05,"
+            " exponential:0.02, or lognormal:0.02,0.5"
+        )
+    if name == "constant":
+        (seconds,) = params
+        return lambda rng: seconds
+    if name == "uniform":
+        low, high = params
+        return lambda rng: rng.uniform(low, high)
+    if name == "exponential":
+        (mean,) = params
+        return lambda rng: rng.expovariate(1 / mean) if mean else 0.0
+    median, sigma = params
+    return lambda rng: median * math.exp(rng.gauss(0, sigma))
+
+
+def make_item(base: str, collection: str, index: int) -> Dict[str, Any]:
+    """The synthetic item at an index of a collection."""
+    rng = Random(f"{collection}:{index}")
+    lon, lat = rng.uniform(-179, 178), rng.uniform(-89, 88)
+    item_id = f"{collection}-{index}"
+    return {
+        "type": "Feature",
+        "stac_version": "1.0.0",
+        "id": item_id,
+        "collection": collection,
+        "bbox": [lon, lat, lon + 1, lat + 1],
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [
+                [
+                    [lon, lat],
+                    [lon + 1, lat],
+                    [lon + 1, lat + 1],
+                    [lon, lat + 1],
+                    [lon, lat],
+                ]
+            ],
+        },
+        "properties": {
+            "datetime": (EPOCH + timedelta(hours=index))
+            .isoformat()
+            .replace("+00:00", "Z"),
+            "created": EPOCH.isoformat().replace("+00:00", "Z"),
+            "eo:cloud_cover": rng.randrange(101),
+        },
+        "assets": {},
+        "links": [
+            {"rel": "self", "href": f"{base}/collections/{collection}/items/{item_id}"},
+            {"rel": "collection", "href": f"{base}/collections/{collection}"},
+        ],
+    }
+
+
+def search_parameters(
+    request: web.Request, body: Optional[Dict[str, Any]]
+) -> Tuple[List[str], int, int]:
+    """The collections, limit, and offset of a search, by GET or POST."""
+    if body is not None:
+        collections = body.get("collections")
+        limit, token = body.get("limit", 10), body.get("token", 0)
+    else:
+        collections = request.query.get("collections", "").split(",")
+        limit = request.query.get("limit", 10)
+        token = request.query.get("token", 0)
+    try:
+        return list(filter(None, collections or [])), int(limit), int(token)
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text="limit and token must be integers") from None
+
+
+class MockApi:
+    """The request handlers of a mock STAC API."""
+
+    def __init__(self, mock_config: MockConfig) -> None:
+        """Check the config, and seed the latencies and errors."""
+        self.config = mock_config
+        self.latency = parse_latency(mock_config.latency)
+        self.rng = Random(mock_config.seed)
+
+    def app(self) -> web.Application:
+        """The aiohttp application, routed to the handlers."""
+        app = web.Application()
+        app.router.add_get("/", self.landing_page)
+        app.router.add_get("/conformance", self.conformance)
+        app.router.add_get("/collections", self.collections)
+        app.router.add_get("/collections/{collection}", self.collection)
+        app.router.add_get("/collections/{collection}/items/{item}", self.item)
+        app.router.add_get("/search", self.search)
+        app.router.add_post("/search", self.search)
+        return app
+
+    async def delay(self) -> None:
+        """Wait for a latency drawn from the distribution, and maybe fail."""
+        seconds = self.latency(self.rng)
+        if seconds:
+            await asyncio.sleep(seconds)
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            raise web.HTTPInternalServerError(text="injected error")
+
+    async def landing_page(self, request: web.Request) -> web.Response:
+        """The landing page, with search links for GET and POST."""
+        base = root(request)
+        return web.json_response(
+            {
+                "type": "Catalog",
+                "stac_version": "1.0.0",
+                "id": "mock",
+                "description": "A mock STAC API",
+                "conformsTo": list(CONFORMANCE),
+                "links": [
+                    {"rel": "self", "href": f"{base}/"},
+                    {"rel": "conformance", "href": f"{base}/conformance"},
+                    {"rel": "data", "href": f"{base}/collections"},
+                    {"rel": "search", "href": f"{base}/search", "method": "GET"},
+                    {"rel": "search", "href": f"{base}/search", "method": "POST"},
+                ],
+            }
+        )
+
+    async def conformance(self, request: web.Request) -> web.Response:
+        """The conformance classes."""
+        return web.json_response({"conformsTo": list(CONFORMANCE)})
+
+    def collection_document(self, base: str, collection: str) -> Dict[str, Any]:
+        """A collection."""
+        return {
+            "type": "Collection",
+            "stac_version": "1.0.0",
+            "id": collection,
+            "description": f"{self.config.items} synthetic items",
+            "license": "proprietary",
+            "extent": {
+                "spatial": {"bbox": [[-180, -90, 180, 90]]},
+                "temporal": {"interval": [[EPOCH.isoformat(), None]]},
+            },
+            "links": [
+                {"rel": "self", "href": f"{base}/collections/{collection}"},
+                {"rel": "items", "href": f"{base}/collections/{collection}/items"},
+            ],
+        }
+
+    async def collections(self, request: web.Request) -> web.Response:
+        """Every collection."""
+        base = root(request)
+        return web.json_response(
+            {
+                "collections": [
+                    self.collection_document(base, c) for c in self.config.collections
+                ],
+                "links": [],
+            }
+        )
+
+    async def collection(self, request: web.Request) -> web.Response:
+        """A collection by id."""
+        collection = request.match_info["collection"]
+        if collection not in self.config.collections:
+            raise web.HTTPNotFound()
+        return web.json_response(self.collection_document(root(request), collection))
+
+    async def item(self, request: web.Request) -> web.Response:
+        """An item by id, e.g., ``mock-0``, after a delay."""
+        await self.delay()
+        collection = request.match_info["collection"]
+        prefix, _, index = request.match_info["item"].rpartition("-")
+        if (
+            collection not in self.config.collections
+            or prefix != collection
+            or not index.isdigit()
+            or int(index) >= self.config.items
+        ):
+            raise web.HTTPNotFound()
+        return web.json_response(make_item(root(request), collection, int(index)))
+
+    async def search(self, request: web.Request) -> web.Response:
+        """A page of every item of the searched collections, after a delay.
+
+        The offset of the page is the ``token`` of the ``next`` link.
+        """
+        await self.delay()
+        body = await request.json() if request.method == "POST" else None
+        requested, limit, token = search_parameters(request, body)
+        searched = [
+            c
+            for c in requested or self.config.collections
+            if c in self.config.collections
+        ]
+        limit = max(1, min(limit, self.config.max_limit))
+        matched = len(searched) * self.config.items
+        base = root(request)
+        features = [
+            make_item(base, searched[i // self.config.items], i % self.config.items)
+            for i in range(token, min(token + limit, matched))
+        ]
+        links = []
+        if token + limit < matched:
+            links.append(next_link(request, body is not None, token + limit))
+        return web.json_response(
+            {
+                "type": "FeatureCollection",
+                "features": features,
+                "links": links,
+                "numberMatched": matched,
+                "numberReturned": len(features),
+            }
+        )
+
+
+def root(request: web.Request) -> str:
+    """The url of the mock, as requested."""
+    return str(request.url.origin())
+
+
+def next_link(request: web.Request, post: bool, token: int) -> Dict[str, Any]:
+    """The link to the next page of a search, by the method of the search."""
+    if post:
+        return {
+            "rel": "next",
+            "href": f"{root(request)}/search",
+            "method": "POST",
+            "body": {"token": token},
+            "merge": True,
+        }
+    return {
+        "rel": "next",
+        "href": str(request.url.update_query(token=token)),
+        "method": "GET",
+    }
+
+
+async def start(
+    mock_config: MockConfig, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[web.AppRunner, str]:
+    """Start serving the mock, on a free port by default.
+
+    Returns:
+        the runner, to clean up when done, and the url of the mock
+    """
+    runner = web.AppRunner(MockApi(mock_config).app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}"
+
+
+async def serve(mock_config: MockConfig, host: str, port: int) -> None:
+    """Serve the mock until cancelled."""
+    runner, _ = await start(mock_config, host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def serve_forever(mock_config: MockConfig, host: str, port: int) -> None:
+    """Serve the mock in a new event loop, e.g., in another process."""
+    asyncio.run(serve(mock_config, host, port))
+
+
+def start_process(
+    mock_config: MockConfig, host: str = "127.0.0.1", timeout: float = 30.0
+) -> Tuple[BaseProcess, str]:
+    """Start serving the mock in a process of its own, on a free port.
+
+    A mock in another process doesn't compete with the client for its event
+    loop, so the client's throughput can be measured on its own.
+
+    Returns:
+        the process, to terminate when done, and the url of the mock
+
+    Raises:
+        TimeoutError: if the mock isn't serving within the timeout
+    """
+    with socket.socket() as s:
+        s.bind((host, 0))
+        port = s.getsockname()[1]
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve_forever, args=(mock_config, host, port), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with suppress(OSError), socket.create_connection((host, port), timeout=1):
+            return process, f"http://{host}:{port}"
+        time.sleep(0.05)
+    process.terminate()
+    raise TimeoutError(f"the mock STAC API didn't start within {timeout}s")
+
+
+async def calibrate(
+    config: BenchmarkConfig,
+    mock_config: MockConfig,
+    ramp_config: RampConfig,
+    kind: str = "search",
+) -> Dict[str, Any]:
+    """Ramp through the concurrencies of the ramp against a mock at ``config.url``.
+
+    The requests are single-page searches of ``config.limit`` items, or GETs of
+    items, of the first collection of the mock. Against a mock without latency,
+    the throughput of the knee of the ramp is the ceiling of the client.
+    """
+    collection = mock_config.collections[0]
+    async with create_session(config) as session:
+        context = await load_context(session, config.url)
+        requests: List[Request]
+        if kind == "item":
+            hrefs = await item_hrefs(session, context, collection, 1000)
+            requests = [
+                ItemRequest(f"item-{i}", collection, href)
+                for i, href in enumerate(hrefs)
+            ]
+        else:
+            requests = [
+                SearchQuery(f"search-{i}", collection, max_items=config.limit)
+                for i in range(1000)
+            ]
+        return await ramp(config, session, context, ramp_config, cycle(requests))
@@ -0,0 +1,320 @@
+"""Self-instrumentation of the client, to tell its own limits from the API's.
+
+While a scenario runs, the load on the client is sampled in the background: how
+late the event loop wakes up (its lag), the CPU use and resident memory of the
+process, the number of requests of its session in flight, until their bodies
+have been read, and the depth of the queue of the worker executor, if any. A
+latency measured while the loop lagged includes time the request spent waiting
+for the client rather than for the API.
+
+Only this process is sampled, so the CPU use of worker processes isn't
+included, but the queue of shards waiting for them is.
+"""
+import asyncio
+import cProfile
+import importlib
+import os
+from asyncio import CancelledError
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextlib import suppress
+from dataclasses import dataclass
+from dataclasses import field
+from logging import Logger
+from threading import Lock
+from time import perf_counter
+from time import process_time
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import ParamSpec
+from typing import TypeVar
+from weakref import WeakKeyDictionary
+
+import aiohttp
+
+from .stats import Histogram
+from .stats import ScenarioStats
+
+# seconds between samples
+DEFAULT_INTERVAL = 0.1
+
+# beyond a p99 loop lag of this many seconds, or a mean CPU use of this fraction
+# of a core, the client is likely a bottleneck
+MAX_LOOP_LAG = 0.01
+MAX_CPU = 0.9
+
+PROFILERS = ("cprofile", "yappi")
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class InFlight:
+    """The number of requests of a session in flight."""
+
+    def __init__(self) -> None:
+        """Start with none in flight."""
+        self.count = 0
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Count a request as in flight in this context."""
+        self.count += 1
+        try:
+            yield
+        finally:
+            self.count -= 1
+
+
+# the requests in flight of each session, attached by query.create_session
+sessions: "WeakKeyDictionary[aiohttp.ClientSession, InFlight]" = WeakKeyDictionary()
+
+
+def in_flight(session: aiohttp.ClientSession) -> InFlight:
+    """The requests in flight of a session, attaching a count if it has none."""
+    return sessions.setdefault(session, InFlight())
+
+
+class TrackedExecutor(Executor):
+    """An executor that counts the tasks submitted to another until they finish.
+
+    Tasks beyond one per worker are waiting for a worker.
+    """
+
+    def __init__(self, executor: Executor, workers: int) -> None:
+        """Track the tasks of an executor of a number of workers."""
+        self.executor = executor
+        self.workers = workers
+        self.unfinished = 0
+        # done callbacks run in the executor's threads
+        self.lock = Lock()
+
+    def submit(
+        self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+    ) -> "Future[T]":
+        """Submit a task to the executor, counting it until it finishes."""
+        with self.lock:
+            self.unfinished += 1
+        future = self.executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self.finished)
+        return future
+
+    def finished(self, future: "Future[Any]") -> None:
+        """Stop counting a task that finished."""
+        with self.lock:
+            self.unfinished -= 1
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Shut down the executor."""
+        self.executor.shutdown(wait, cancel_futures=cancel_futures)
+
+    def queue_depth(self) -> int:
+        """The number of tasks waiting for a worker."""
+        with self.lock:
+            return max(self.unfinished - self.workers, 0)
+
+
+def queue_depth(executor: Optional[Executor]) -> Optional[int]:
+    """The number of tasks waiting for a worker of an executor, if it's tracked."""
+    return executor.queue_depth() if isinstance(executor, TrackedExecutor) else None
+
+
+def rss() -> Optional[int]:
+    """The resident memory of this process in bytes, where ``/proc`` has it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@dataclass
+class ClientLoad:
+    """Samples of the load on the client."""
+
+    loop_lag: Histogram = field(default_factory=Histogram)
+    samples: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    max_cpu: float = 0.0
+    total_in_flight: int = 0
+    max_in_flight: int = 0
+    max_queue_depth: Optional[int] = None
+    max_rss: Optional[int] = None
+
+    def sample(
+        self,
+        lag: float,
+        wall_time: float,
+        cpu_time: float,
+        requests: int,
+        depth: Optional[int],
+        memory: Optional[int],
+    ) -> None:
+        """Record a sample taken ``wall_time`` seconds after the last one."""
+        self.loop_lag.record(lag)
+        self.samples += 1
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+        self.max_cpu = max(self.max_cpu, cpu_time / wall_time)
+        self.total_in_flight += requests
+        self.max_in_flight = max(self.max_in_flight, requests)
+        if depth is not None:
+            self.max_queue_depth = max(self.max_queue_depth or 0, depth)
+        if memory is not None:
+            self.max_rss = max(self.max_rss or 0, memory)
+
+    def mean_cpu(self) -> Optional[float]:
+        """The CPU time of the process as a fraction of the wall time sampled."""
+        return self.cpu_time / self.wall_time if self.wall_time else None
+
+    def warnings(self) -> List[str]:
+        """Why the client was likely a bottleneck, if it was."""
+        warnings = []
+        p99 = self.loop_lag.percentile(99)
+        if p99 is not None and p99 > MAX_LOOP_LAG:
+            warnings.append(
+                f"event loop lag p99 {p99 * 1000:.1f}ms > {MAX_LOOP_LAG * 1000:g}ms,"
+                " so latencies include time queued in the client"
+            )
+        cpu = self.mean_cpu()
+        if cpu is not None and cpu > MAX_CPU:
+            warnings.append(
+                f"client CPU use {cpu:.0%} > {MAX_CPU:.0%}, so the client may limit"
+                " throughput"
+            )
+        return warnings
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A JSON-serializable summary, with any warnings."""
+        result: Dict[str, Any] = {
+            "samples": self.samples,
+            "loop_lag": self.loop_lag.summary(),
+            "cpu": {"mean": self.mean_cpu(), "max": self.max_cpu},
+            "in_flight": {
+                "mean": self.total_in_flight / self.samples if self.samples else None,
+                "max": self.max_in_flight,
+            },
+            "rss_bytes": self.max_rss,
+        }
+        if self.max_queue_depth is not None:
+            result["executor_queue"] = {"max": self.max_queue_depth}
+        result["warnings"] = self.warnings()
+        return result
+
+
+@asynccontextmanager
+async def monitoring(
+    session: Optional[aiohttp.ClientSession] = None,
+    executor: Optional[Executor] = None,
+    interval: float = DEFAULT_INTERVAL,
+) -> AsyncIterator[ClientLoad]:
+    """Sample the load on the client every ``interval`` seconds in this context.
+
+    The requests in flight are those of ``session``, if given, and the queue is
+    that of ``executor``, if it's a :class:`TrackedExecutor`.
+    """
+    load = ClientLoad()
+    requests = InFlight() if session is None else in_flight(session)
+
+    async def sample() -> None:
+        wall, cpu = perf_counter(), process_time()
+        while True:
+            await asyncio.sleep(interval)
+            now, cpu_now = perf_counter(), process_time()
+            load.sample(
+                lag=max(now - wall - interval, 0.0),
+                wall_time=now - wall,
+                cpu_time=cpu_now - cpu,
+                requests=requests.count,
+                depth=queue_depth(executor),
+                memory=rss(),
+            )
+            wall, cpu = now, cpu_now
+
+    task = asyncio.create_task(sample())
+    try:
+        yield load
+    finally:
+        task.cancel()
+        with suppress(CancelledError):
+            await task
+
+
+@dataclass
+class ProfileConfig:
+    """Config for profiling the client while each scenario runs.
+
+    The profile of each scenario is saved in pstats format to
+    ``<directory>/<scenario>.<profiler>.prof``.
+    """
+
+    profiler: str
+    directory: str
+
+    def filename(self, name: str) -> str:
+        """The file the profile of a scenario is saved to."""
+        return os.path.join(self.directory, f"{name}.{self.profiler}.prof")
+
+
+@contextmanager
+def profiling(profile_config: Optional[ProfileConfig], name: str) -> Iterator[None]:
+    """Profile the client in this context, if there's a profile config.
+
+    cProfile only profiles the thread of the event loop. yappi, if it's
+    installed, profiles every thread by CPU time.
+    """
+    if profile_config is None:
+        yield
+        return
+    os.makedirs(profile_config.directory, exist_ok=True)
+    filename = profile_config.filename(name)
+    if profile_config.profiler == "yappi":
+        yappi = importlib.import_module("yappi")
+        yappi.set_clock_type("cpu")
+        yappi.start()
+        try:
+            yield
+        finally:
+            yappi.stop()
+            yappi.get_func_stats().save(filename, type="pstat")
+            yappi.clear_stats()
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(filename)
+
+
+async def monitored(
+    logger: Logger,
+    name: str,
+    co: Awaitable[ScenarioStats],
+    session: Optional[aiohttp.ClientSession] = None,
+    executor: Optional[Executor] = None,
+    profile_config: Optional[ProfileConfig] = None,
+) -> ScenarioStats:
+    """Await a scenario, reporting the load on the client with its statistics.
+
+    A warning is logged if the client was likely a bottleneck.
+    """
+    with profiling(profile_config, name):
+        async with monitoring(session, executor) as load:
+            result = await co
+    result.client = load.to_dict()
+    for warning in result.client["warnings"]:
+        logger.warning(f"{name}: {warning}")
+    if profile_config is not None:
+        logger.info(f"{name}: profile saved to {profile_config.filename(name)}")
+    return result
@@ -1,39 +1,64 @@
 """Utilities for constructing search queries."""
 import asyncio
-import importlib.resources
+import importlib
 import json
 import traceback
 from asyncio import Semaphore
 from asyncio import TimeoutError
 from asyncio import wait_for
 from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
 from datetime import timezone as tz
 from logging import Logger
-from random import shuffle
+from random import Random
 from time import perf_counter
 from typing import Any
+from typing import Awaitable
+from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Set
 from typing import Tuple
 from typing import Union
-from zipfile import ZipFile
 
 import aiohttp
+import numpy as np
 from faker import Faker
-from pystac import Item
-from pystac_client import Client
-from pystac_client.exceptions import APIError
 from returns.result import Failure
 from returns.result import Result
 from returns.result import Success
 
-from .random_geojson import generate_random_polygon
+from . import monitor
+from .api import ApiContext
+from .corpus import load_corpus
+from .geometry import geometry_rings
+from .geometry import geometry_valid
+from .geometry import repair
+from .random_geojson import generate_random_polygons
+from .simplify import bbox_polygon
+from .simplify import budget_mask
+from .simplify import load_importance
+from .simplify import tolerance_mask
+from .stats import ScenarioStats
 
 STEP = "step_september152014_70rndsel_igbpcl.geojson"
 TNC_ECOREGIONS = "tnc_terr_ecoregions.geojson.zip"
 COUNTRIES = "countries.geojson"
 
+# the number of random polygons generated at once
+RANDOM_POLYGON_BATCH_SIZE = 10000
+
+RATE_UNITS = {"s": 1.0, "m": 60.0, "min": 60.0, "h": 3600.0}
+
+# how much of each response is parsed: all of it, just enough to count the
+# features and find the next link, or none of it
+RESPONSE_MODES = ("parse", "count", "drain")
+
 sequential_sem = Semaphore(1)
 
 
@@ -52,6 +77,70 @@ class BenchmarkConfig:
     limit: int
     logger: Logger
     timeout: int
+    pool_size: int = 0
+    pool_size_per_host: int = 0
+    keepalive_timeout: float = 15.0
+    dns_cache_ttl: int = 10
+    reuse_connections: bool = True
+    rate: Optional[float] = None
+    poisson: bool = False
+    workers: int = 1
+    worker_index: int = 0
+    shuffle_window: int = 10000
+    corpus_dir: Optional[str] = None
+    invalid_geometries: str = "exclude"
+    # seconds after which no more queries are started, if any
+    duration: Optional[float] = None
+    # how much of each response is parsed, one of RESPONSE_MODES
+    response_mode: str = "parse"
+    # the warmup of each scenario, see warmup.Warmup
+    warmup_requests: int = 0
+    warmup_duration: float = 0.0
+    steady_state_window: Optional[float] = None
+    steady_state_tolerance: float = 0.1
+    max_warmup: float = 120.0
+    # seconds to wait for each reply of an agent, see distributed.run_distributed
+    agent_timeout: float = 3600.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The config as JSON, without the logger."""
+        return {
+            f.name: getattr(self, f.name) for f in fields(self) if f.name != "logger"
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], logger: Logger) -> "BenchmarkConfig":
+        """A config from the JSON produced by :meth:`to_dict`."""
+        return cls(
+            **{
+                **d,
+                "collections": tuple(d["collections"]),
+                "queryables": tuple(d["queryables"]),
+                "logger": logger,
+            }
+        )
+
+
+def fastest_loads() -> Callable[[bytes], Any]:
+    """The fastest JSON decoder installed: orjson, if it is, or else json."""
+    try:
+        loads: Callable[[bytes], Any] = importlib.import_module("orjson").loads
+    except ImportError:
+        return json.loads
+    return loads
+
+
+fast_loads = fastest_loads()
+
+
+@dataclass
+class PageTiming:
+    """Timing of the request for a single page of results."""
+
+    ttfb: float
+    latency: float
+    bytes: int
+    items: int
 
 
 @dataclass
@@ -60,6 +149,14 @@ class RunSuccess:
 
     duration: float
     count: int
+    ttfb: Optional[float] = None
+    bytes: int = 0
+    pages: List[PageTiming] = field(default_factory=list)
+    # the size of the body on the wire, if it was measured before decoding
+    wire_bytes: Optional[int] = None
+    not_modified: bool = False
+    # the HTTP status of the (last) response
+    status: int = 200
 
 
 @dataclass
@@ -68,75 +165,386 @@ class RunFailure:
 
     duration: float
     msg: str
+    # the HTTP status of an error response, if the request failed with one
+    status: Optional[int] = None
 
 
 RunResult = Result[RunSuccess, RunFailure]
 
 
-def load_geometries(filename: str, id_field: str) -> Dict[str, Dict[str, Any]]:
-    """Load a list of GeoJSON Geometry objects from a file."""
-    return geometries_from(load_geojson(filename), id_field)
-
+def create_session(
+    config: BenchmarkConfig, auto_decompress: bool = True
+) -> aiohttp.ClientSession:
+    """Create the HTTP session shared by every request in a benchmark run.
 
-def load_geojson(filename: str) -> Any:
-    if filename.endswith(".zip"):
-        with importlib.resources.path("geojson_files", filename) as f:
-            with ZipFile(f) as zf:
-                with zf.open(zf.infolist()[0]) as fo:
-                    return json.loads(fo.read())
+    A ``pool_size`` or ``pool_size_per_host`` of 0 leaves the number of
+    connections unbounded, so that only the scenario concurrency limits the
+    requests in flight. A ``dns_cache_ttl`` of 0 disables DNS caching. When
+    ``reuse_connections`` is false, every request opens a new connection.
+    Without ``auto_decompress``, response bodies are read as sent. The session
+    has a count of its requests in flight attached, for :mod:`.monitor`.
+    """
+    connector_args: Dict[str, Any] = {}
+    if config.reuse_connections:
+        connector_args["keepalive_timeout"] = config.keepalive_timeout
     else:
-        return json.loads(importlib.resources.read_text("geojson_files", filename))
-
+        connector_args["force_close"] = True
 
-def geometries_from(
-    geojson: Dict[str, Any], id_field: str
-) -> Dict[str, Dict[str, Any]]:
-    return {str(f["properties"][id_field]): f["geometry"] for f in geojson["features"]}
+    connector = aiohttp.TCPConnector(
+        limit=config.pool_size,
+        limit_per_host=config.pool_size_per_host,
+        use_dns_cache=config.dns_cache_ttl > 0,
+        ttl_dns_cache=config.dns_cache_ttl,
+        **connector_args,
+    )
+    session = aiohttp.ClientSession(
+        connector=connector, auto_decompress=auto_decompress
+    )
+    monitor.in_flight(session)
+    return session
 
 
-def get_link_by_rel(item: Item, rel: str) -> str:
-    return str(next(filter(lambda x: x.rel == rel, item.links)).href)
+def get_link_by_rel(item: Dict[str, Any], rel: str) -> str:
+    return str(next(filter(lambda x: x["rel"] == rel, item["links"]))["href"])
 
 
-async def get_item_by_url(url: str, sem: Semaphore, timeout: int = 10) -> None:
+async def get_item_by_url(
+    session: aiohttp.ClientSession, url: str, sem: Semaphore, timeout: int = 10
+) -> RunResult:
     async with sem:
-        async with aiohttp.ClientSession() as session:
-            _ = await (await session.get(url, timeout=timeout)).text()
+        t_start = perf_counter()
+        try:
+            with monitor.in_flight(session).request():
+                async with session.get(
+                    url, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    ttfb = perf_counter() - t_start
+                    content = await response.read()
+            if response.status != 200:
+                return Failure(
+                    RunFailure(
+                        perf_counter() - t_start,
+                        f"{url}: {response.status}",
+                        response.status,
+                    )
+                )
+            return Success(
+                RunSuccess(
+                    duration=perf_counter() - t_start,
+                    count=1,
+                    ttfb=ttfb,
+                    bytes=len(content),
+                )
+            )
+        except Exception as e:
+            return Failure(RunFailure(perf_counter() - t_start, f"{url}: {e}"))
+
+
+async def recorded(
+    stats: ScenarioStats, collection: str, co: Awaitable[RunResult]
+) -> None:
+    """Record the result of a request in the scenario statistics."""
+    stats.record_for(collection, await co)
 
 
 async def request_item_repeatedly(
-    config: BenchmarkConfig, times: int, concurrency: int
-) -> float:
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    times: int,
+    concurrency: int,
+) -> ScenarioStats:
     sem = Semaphore(concurrency)
-    catalog = Client.open(config.url)
+    stats = ScenarioStats()
 
     cos = []
     for collection in config.collections:
-        item = next(catalog.search(collections=[collection], max_items=1).get_items())
+        item = await first_item(session, context, collection)
         item_url = get_link_by_rel(item, "self")
-        cos.extend([get_item_by_url(item_url, sem) for _ in range(0, times)])
+        cos.extend(
+            [
+                recorded(stats, collection, get_item_by_url(session, item_url, sem))
+                for _ in range(0, times)
+            ]
+        )
 
     t_start = perf_counter()
     pending = [asyncio.get_running_loop().create_task(co) for co in cos]
     await asyncio.gather(*pending, return_exceptions=True)
-    return perf_counter() - t_start
+    stats.duration = perf_counter() - t_start
+    return stats
 
 
 async def search_with_query_that_has_no_results(
-    url: str, collection: str, sem: Semaphore
+    session: aiohttp.ClientSession, url: str, collection: str, sem: Semaphore
 ) -> None:
     async with sem:
-        async with aiohttp.ClientSession() as session:
-            res = await session.get(
-                url=f"{url}/search",
-                params={"collections": collection, "bbox": "-179,85,-178,89"},
-                timeout=10,
+        async with session.get(
+            url=f"{url}/search",
+            params={"collections": collection, "bbox": "-179,85,-178,89"},
+            timeout=aiohttp.ClientTimeout(total=10),
+        ) as response:
+            await response.read()
+
+
+class APIError(Exception):
+    """A STAC API responded to a request with an error status."""
+
+    def __init__(self, msg: str, status: Optional[int] = None) -> None:
+        """An error, with the HTTP status of its response, if it had one."""
+        super().__init__(msg, status)
+        self.msg = msg
+        self.status = status
+
+    def __str__(self) -> str:
+        """The message of the error."""
+        return self.msg
+
+
+def search_body(
+    collection: str,
+    limit: int,
+    intersects: Optional[Dict[str, Any]] = None,
+    sortby: Optional[List[Dict[str, str]]] = None,
+    datetime: Optional[str] = None,
+    filter_lang: Optional[str] = None,
+    cql2_filter: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Build the JSON body of an Item Search POST request."""
+    body: Dict[str, Any] = {"collections": [collection], "limit": limit}
+    if intersects is not None:
+        body["intersects"] = intersects
+    if sortby is not None:
+        body["sortby"] = sortby
+    if datetime is not None:
+        body["datetime"] = datetime
+    if cql2_filter is not None:
+        body["filter"] = cql2_filter
+        if filter_lang is not None:
+            body["filter-lang"] = filter_lang
+    return body
+
+
+def next_request(
+    page: Dict[str, Any], previous: Tuple[str, str, Optional[Dict[str, Any]]]
+) -> Optional[Tuple[str, str, Optional[Dict[str, Any]]]]:
+    """Determine the method, href, and body of the request for the next page.
+
+    The ``method``, ``body``, and ``merge`` attributes of the ``next`` link are
+    handled as described by the STAC API - Item Search specification.
+    """
+    link = next(
+        (link for link in page.get("links", []) if link.get("rel") == "next"), None
+    )
+    if link is None:
+        return None
+
+    method = str(link.get("method", "GET")).upper()
+    if method != "POST":
+        return method, str(link["href"]), None
+
+    body = link.get("body", {})
+    if link.get("merge", False) and previous[2] is not None:
+        body = {**previous[2], **body}
+    return method, str(link["href"]), body
+
+
+def search_params(body: Dict[str, Any]) -> Dict[str, str]:
+    """Encode an Item Search body as GET query parameters."""
+    params = {}
+    for key, value in body.items():
+        if key == "collections":
+            params[key] = ",".join(value)
+        elif key == "sortby":
+            params[key] = ",".join(
+                f"{'-' if s['direction'] == 'desc' else '+'}{s['field']}" for s in value
             )
-            await res.text()
+        elif isinstance(value, (dict, list)):
+            params[key] = json.dumps(value)
+        else:
+            params[key] = str(value)
+    return params
+
+
+def count_page(content: bytes) -> Tuple[Dict[str, Any], int]:
+    """Decode a page only to count its features and keep its ``next`` link.
+
+    The decoded features are released as soon as they're counted.
+    """
+    page = fast_loads(content)
+    links = [link for link in page.get("links", []) if link.get("rel") == "next"]
+    return {"links": links}, len(page.get("features", []))
+
+
+async def drain(response: aiohttp.ClientResponse) -> int:
+    """Read a response body as it arrives without keeping it, returning its size."""
+    size = 0
+    async for chunk in response.content.iter_any():
+        size += len(chunk)
+    return size
+
+
+async def fetch_page(
+    session: aiohttp.ClientSession,
+    method: str,
+    href: str,
+    body: Optional[Dict[str, Any]],
+    mode: str = "parse",
+) -> Tuple[Dict[str, Any], PageTiming]:
+    """Request a single page of search results.
+
+    A GET request with a body, i.e., the first page of a search against an API
+    that only supports GET, sends the body as query parameters. The latency of
+    the page is measured until the body has been read, excluding JSON decoding.
+
+    The ``mode`` is one of :data:`RESPONSE_MODES`. With ``count``, only the
+    ``next`` link of the page is returned. With ``drain``, the body isn't parsed
+    at all, so an empty page with no items is returned.
+    """
+    if method == "POST":
+        request_args: Dict[str, Any] = {"json": body}
+    else:
+        request_args = {"params": search_params(body) if body else None}
+    t_start = perf_counter()
+    with monitor.in_flight(session).request():
+        async with session.request(method, href, **request_args) as response:
+            ttfb = perf_counter() - t_start
+            if mode == "drain" and response.status == 200:
+                size = await drain(response)
+                return {}, PageTiming(ttfb, perf_counter() - t_start, size, 0)
+            content = await response.read()
+            latency = perf_counter() - t_start
+            status = response.status
+    if status != 200:
+        raise APIError(f"{status}: {content.decode(errors='replace')}", status)
+    if mode == "count":
+        page, items = count_page(content)
+    else:
+        page = json.loads(content)
+        items = len(page.get("features", []))
+    return page, PageTiming(
+        ttfb=ttfb,
+        latency=latency,
+        bytes=len(content),
+        items=items,
+    )
+
+
+async def paginate(
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    body: Dict[str, Any],
+    max_items: int,
+    mode: str = "parse",
+) -> Tuple[int, List[PageTiming]]:
+    """Search and follow ``next`` links, reading pages by the response mode.
+
+    Without parsing, in ``drain`` mode, there's no ``next`` link to follow, so
+    only the first page is requested.
+
+    Returns:
+        the number of items, up to ``max_items``, and the timing of each page
+    """
+    count = 0
+    pages = []
+    request: Optional[Tuple[str, str, Optional[Dict[str, Any]]]] = (
+        context.search_method,
+        context.search_href,
+        body,
+    )
+    while request is not None:
+        page, timing = await fetch_page(session, *request, mode)
+        pages.append(timing)
+        count += timing.items
+        if count >= max_items:
+            return max_items, pages
+        if not timing.items:
+            break
+        request = next_request(page, request)
+    return count, pages
+
+
+async def first_item(
+    session: aiohttp.ClientSession, context: ApiContext, collection: str
+) -> Dict[str, Any]:
+    page, _ = await fetch_page(
+        session,
+        context.search_method,
+        context.search_href,
+        search_body(collection=collection, limit=1),
+    )
+    if not page.get("features"):
+        raise APIError(f"No items found in collection {collection}")
+    item: Dict[str, Any] = page["features"][0]
+    return item
+
+
+async def item_hrefs(
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    collection: str,
+    count: int,
+    limit: int = 250,
+) -> List[str]:
+    """The self links of up to ``count`` items in a collection.
+
+    The search is paginated, ``limit`` items to a page, until there are
+    ``count`` items or no more pages.
+
+    Raises:
+        APIError: if the collection has no items
+    """
+    hrefs: List[str] = []
+    request: Optional[Tuple[str, str, Optional[Dict[str, Any]]]] = (
+        context.search_method,
+        context.search_href,
+        search_body(collection=collection, limit=min(count, limit)),
+    )
+    while request is not None and len(hrefs) < count:
+        page, timing = await fetch_page(session, *request)
+        hrefs.extend(get_link_by_rel(item, "self") for item in page.get("features", []))
+        if not timing.items:
+            break
+        request = next_request(page, request)
+    if not hrefs:
+        raise APIError(f"No items found in collection {collection}")
+    return hrefs[:count]
+
+
+@dataclass
+class SearchQuery:
+    """The parameters of a single search request."""
+
+    search_id: str
+    collection: str
+    intersects: Optional[Dict[str, Any]] = None
+    sortby: Optional[List[Dict[str, str]]] = None
+    datetime: Optional[str] = None
+    filter_lang: Optional[str] = None
+    cql2_filter: Optional[Dict[str, Any]] = None
+    # the groups to record the result in, in addition to the collection
+    groups: Tuple[str, ...] = ()
+    # the items to paginate through, if not config.max_items
+    max_items: Optional[int] = None
+
+
+@dataclass
+class ItemRequest:
+    """A single request for an item by its url."""
+
+    search_id: str
+    collection: str
+    href: str
+    groups: Tuple[str, ...] = ()
+
+
+Request = Union[SearchQuery, ItemRequest]
 
 
 async def search(
     config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
     collection: str,
     intersects: Optional[Dict[str, Any]],
     search_id: str,
@@ -147,83 +555,271 @@ async def search(
     cql2_filter: Optional[Dict[str, Any]] = None,
 ) -> RunResult:
     async with sem:
-        config.logger.debug(
-            f"{search_id} => "
-            f"collections = [{collection}], intersects = {intersects}, "
-            f"limit = {config.limit}, max_items = {config.max_items}, "
-            f"sortby = {sortby}, datetime = {datetime}, "
-            f"filter = {json.dumps(cql2_filter) if cql2_filter else ''}"
+        return await run_search(
+            config=config,
+            session=session,
+            context=context,
+            query=SearchQuery(
+                search_id=search_id,
+                collection=collection,
+                intersects=intersects,
+                sortby=sortby,
+                datetime=datetime,
+                filter_lang=filter_lang,
+                cql2_filter=cql2_filter,
+            ),
+            t_start=perf_counter(),
         )
-        t_start = perf_counter()
-        try:
-            count = await wait_for(
-                asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: len(
-                        Client.open(config.url).search(
-                            collections=[collection],
-                            intersects=intersects,
-                            limit=config.limit,
-                            max_items=config.max_items,
-                            sortby=sortby,
-                            datetime=datetime,
-                            filter_lang=filter_lang,
-                            filter=cql2_filter,
-                        )  # get_all_items_as_dict returns dict instead
-                        # of unmarshalled STAC objects
-                        .get_all_items_as_dict()["features"]
-                    ),
-                ),
-                timeout=config.timeout,
+
+
+async def run_search(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    query: SearchQuery,
+    t_start: float,
+) -> RunResult:
+    """Run a search, measuring its duration from ``t_start``."""
+    search_id = query.search_id
+    max_items = query.max_items or config.max_items
+    config.logger.debug(
+        f"{search_id} => "
+        f"collections = [{query.collection}], intersects = {query.intersects}, "
+        f"limit = {config.limit}, max_items = {max_items}, "
+        f"sortby = {query.sortby}, datetime = {query.datetime}, "
+        f"filter = {json.dumps(query.cql2_filter) if query.cql2_filter else ''}"
+    )
+    body = search_body(
+        collection=query.collection,
+        limit=min(config.limit, max_items),
+        intersects=query.intersects,
+        sortby=query.sortby,
+        datetime=query.datetime,
+        filter_lang=query.filter_lang,
+        cql2_filter=query.cql2_filter,
+    )
+    try:
+        count, pages = await wait_for(
+            paginate(session, context, body, max_items, config.response_mode),
+            timeout=config.timeout,
+        )
+        time = perf_counter() - t_start
+        config.logger.info(f"{search_id},{count},{time:.2f}")
+        return Success(
+            RunSuccess(
+                duration=time,
+                count=count,
+                ttfb=pages[0].ttfb,
+                bytes=sum(page.bytes for page in pages),
+                pages=pages,
             )
-            time = perf_counter() - t_start
-            config.logger.info(f"{search_id},{count},{time:.2f}")
-            return Success(RunSuccess(time, count))
-        except APIError as e:
-            time = perf_counter() - t_start
-            msg = f"{search_id}: APIError: {e}"
-            config.logger.error(msg)
-            return Failure(RunFailure(time, msg))
-        except TimeoutError as e:
-            time = perf_counter() - t_start
-            msg = f"{search_id}: TimeoutError ({config.timeout}s): {e}"
-            config.logger.error(msg)
-            return Failure(RunFailure(time, msg))
-        except Exception as e:
-            time = perf_counter() - t_start
-            msg = f"{search_id}: Exception: {e}"
-            config.logger.error(msg)
-            config.logger.error(traceback.format_exc())
-            return Failure(RunFailure(time, msg))
+        )
+    except APIError as e:
+        time = perf_counter() - t_start
+        msg = f"{search_id}: APIError: {e}"
+        config.logger.error(msg)
+        return Failure(RunFailure(time, msg, e.status))
+    except TimeoutError as e:
+        time = perf_counter() - t_start
+        msg = f"{search_id}: TimeoutError ({config.timeout}s): {e}"
+        config.logger.error(msg)
+        return Failure(RunFailure(time, msg))
+    except Exception as e:
+        time = perf_counter() - t_start
+        msg = f"{search_id}: Exception: {e}"
+        config.logger.error(msg)
+        config.logger.error(traceback.format_exc())
+        return Failure(RunFailure(time, msg))
 
 
-async def search_with_random_queries(
+async def get_item(
     config: BenchmarkConfig,
-) -> Tuple[List[Union[Tuple[int, float], Exception]], float]:
+    session: aiohttp.ClientSession,
+    request: ItemRequest,
+    t_start: float,
+) -> RunResult:
+    """Get an item, measuring its duration from ``t_start``."""
+    status: Optional[int] = None
+    try:
+        _, timing = await wait_for(
+            fetch_page(session, "GET", request.href, None, config.response_mode),
+            timeout=config.timeout,
+        )
+        time = perf_counter() - t_start
+        config.logger.info(f"{request.search_id},1,{time:.2f}")
+        return Success(
+            RunSuccess(duration=time, count=1, ttfb=timing.ttfb, bytes=timing.bytes)
+        )
+    except APIError as e:
+        msg = f"{request.search_id}: APIError: {e}"
+        status = e.status
+    except TimeoutError as e:
+        msg = f"{request.search_id}: TimeoutError ({config.timeout}s): {e}"
+    except Exception as e:
+        msg = f"{request.search_id}: Exception: {e}"
+    config.logger.error(msg)
+    return Failure(RunFailure(perf_counter() - t_start, msg, status))
+
+
+async def run_request(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    request: Request,
+    t_start: float,
+) -> RunResult:
+    """Run a search or get an item, measuring its duration from ``t_start``."""
+    if isinstance(request, ItemRequest):
+        return await get_item(config, session, request, t_start)
+    return await run_search(config, session, context, request, t_start)
+
+
+async def run_closed_loop(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    queries: Iterable[Request],
+    stats: ScenarioStats,
+    concurrency: int,
+    deadline: Optional[float] = None,
+) -> None:
+    """Run the queries with a pool of ``concurrency`` workers.
+
+    Each worker takes the next query as soon as its previous one completes, until
+    the queries are exhausted or, if given, the ``perf_counter`` deadline passes.
+    """
+    iterator = iter(queries)
+
+    async def worker() -> None:
+        for query in iterator:
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            result = await run_request(config, session, context, query, perf_counter())
+            stats.record_for(query.collection, result, query.groups, query.search_id)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open_loop(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    queries: Iterable[Request],
+    stats: ScenarioStats,
+    rate: float,
+    deadline: Optional[float] = None,
+) -> None:
+    """Start the queries at ``rate`` per second, regardless of latency.
+
+    Latency is measured from the time each query was scheduled to start, so any
+    time spent waiting for one of the ``config.concurrency`` request slots, or
+    for a busy event loop, is included rather than hidden (i.e., coordinated
+    omission). With ``config.poisson``, the time between queries is
+    exponentially distributed, otherwise it is constant. No queries are
+    scheduled after the ``perf_counter`` deadline, if given.
+    """
     sem = Semaphore(config.concurrency)
-    Faker.seed(config.seed)
+    # each worker process has its own arrival process
+    rng = Random(f"{config.seed}:{config.worker_index}")
+    loop = asyncio.get_running_loop()
+
+    async def run_one(query: Request, scheduled: float) -> None:
+        async with sem:
+            stats.record_lag(perf_counter() - scheduled)
+            result = await run_request(config, session, context, query, scheduled)
+        stats.record_for(query.collection, result, query.groups, query.search_id)
+
+    # only the tasks in flight are kept, so memory use doesn't grow with the queries
+    pending: Set["asyncio.Task[None]"] = set()
+    scheduled = perf_counter()
+    for query in queries:
+        if deadline is not None and scheduled >= deadline:
+            break
+        delay = scheduled - perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = loop.create_task(run_one(query, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        scheduled += rng.expovariate(rate) if config.poisson else 1 / rate
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_queries(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    queries: Iterable[Request],
+) -> ScenarioStats:
+    """Run the queries open loop if ``config.rate`` is set, otherwise closed loop.
+
+    With ``config.duration``, no more queries are started after that many
+    seconds, even if there are queries left.
+    """
+    stats = ScenarioStats()
+    t_start = perf_counter()
+    deadline = None if config.duration is None else t_start + config.duration
+    if config.rate:
+        await run_open_loop(
+            config, session, context, queries, stats, config.rate, deadline
+        )
+    else:
+        await run_closed_loop(
+            config, session, context, queries, stats, config.concurrency, deadline
+        )
+    stats.duration = perf_counter() - t_start
+    return stats
+
+
+def windowed_shuffle(
+    items: Iterable[SearchQuery], window: int, seed: int
+) -> Iterator[SearchQuery]:
+    """Lazily shuffle items by yielding a random one of the next ``window`` items.
+
+    Memory use is bounded by the window, rather than by the number of items.
+    """
+    rng = Random(seed)
+    buffer: List[SearchQuery] = []
+    for item in items:
+        if len(buffer) < window:
+            buffer.append(item)
+            continue
+        index = rng.randrange(window)
+        yield buffer[index]
+        buffer[index] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def random_queries(config: BenchmarkConfig) -> Iterator[SearchQuery]:
+    """Lazily generate random polygon, datetime, and filter queries."""
+    return windowed_shuffle(_random_queries(config), config.shuffle_window, config.seed)
+
+
+def random_geometries(config: BenchmarkConfig) -> Iterator[Dict[str, Any]]:
+    """Lazily generate a random polygon for each random query.
+
+    Polygons are generated in batches, each drawn from its own stream spawned
+    from the run seed, so that the shapes are reproducible but differ from query
+    to query.
+    """
+    total = config.num_random * len(config.collections)
+    seeds = np.random.SeedSequence(config.seed)
+    for start in range(0, total, RANDOM_POLYGON_BATCH_SIZE):
+        rng = np.random.default_rng(seeds.spawn(1)[0])
+        count = min(RANDOM_POLYGON_BATCH_SIZE, total - start)
+        yield from generate_random_polygons(count, rng, ave_radius=5.0)
+
+
+def _random_queries(config: BenchmarkConfig) -> Iterator[SearchQuery]:
     fake = Faker()
+    fake.seed_instance(config.seed)
+    geometries = random_geometries(config)
 
-    cos = []
-    for collection in config.collections:
-        for i in range(config.num_random):
-            geometry = generate_random_polygon(
-                num_vertices=fake.random_int(min=4, max=10),
-                seed=config.seed,
-                ave_radius=5.0,
-                center_lon=fake.random_int(min=-180, max=180),
-                center_lat=fake.random_int(min=-90, max=90),
-            )
-            interval_duration = fake.random_int(min=1, max=90)
-            start_datetime = fake.date_time_between(start_date="-5y", tzinfo=tz.utc)
-            end_datetime = fake.date_time_between(
-                start_date=start_datetime,
-                end_date=f"+{interval_duration}d",
-                tzinfo=tz.utc,
-            )
-            datetime_interval = (
-                f"{start_datetime.isoformat()}/{end_datetime.isoformat()}"
-            )
+    for i in range(config.num_random):
+        for collection in config.collections:
+            geometry = next(geometries)
+            datetime_interval = random_datetime_interval(fake)
 
             clauses = [
                 {
@@ -245,89 +841,257 @@ async def search_with_random_queries(
                 else None
             )
 
-            cos.append(
-                search(
-                    config=config,
-                    collection=collection,
-                    intersects=geometry,
-                    search_id=f"{i}",
-                    sem=sem,
-                    datetime=datetime_interval,
-                    filter_lang="cql2-json",
-                    cql2_filter=cql2_filter,
-                )
+            yield SearchQuery(
+                search_id=f"{i}",
+                collection=collection,
+                intersects=geometry,
+                datetime=datetime_interval,
+                filter_lang="cql2-json",
+                cql2_filter=cql2_filter,
             )
 
-    t_start = perf_counter()
 
-    shuffle(cos)
+def random_datetime_interval(fake: Faker) -> str:
+    """A random interval of 1 to 90 days, starting in the last 5 years."""
+    interval_duration = fake.random_int(min=1, max=90)
+    start_datetime = fake.date_time_between(start_date="-5y", tzinfo=tz.utc)
+    end_datetime = fake.date_time_between(
+        start_date=start_datetime,
+        end_date=f"+{interval_duration}d",
+        tzinfo=tz.utc,
+    )
+    return f"{start_datetime.isoformat()}/{end_datetime.isoformat()}"
 
-    pending = [asyncio.get_running_loop().create_task(co) for co in cos]
 
-    results = await asyncio.gather(*pending, return_exceptions=True)
+def sorted_queries(
+    config: BenchmarkConfig,
+    sortby: List[Any],
+    pages: int = 10,
+    intersects: bool = True,
+    datetime: bool = True,
+) -> Iterator[SearchQuery]:
+    """Lazily generate sorted searches that paginate ``pages`` pages deep.
 
-    time = perf_counter() - t_start
-    return results, time  # noqa
+    Like the random queries, there are ``config.num_random`` queries for each
+    collection, each with a random polygon and datetime interval unless turned
+    off, so that every query sorts and pages through a different set of items.
 
+    Args:
+        config: the benchmark config
+        sortby: the sort keys, as sortby dicts or as keys like
+            ``properties.datetime:desc``
+        pages: the number of pages of ``config.limit`` items to paginate through
+        intersects: whether to filter by a random polygon
+        datetime: whether to filter by a random datetime interval
+    """
+    keys = [parse_sort_key(key) if isinstance(key, str) else key for key in sortby]
+    fake = Faker()
+    fake.seed_instance(config.seed)
+    geometries = random_geometries(config) if intersects else None
+    for i in range(config.num_random):
+        for collection in config.collections:
+            yield SearchQuery(
+                search_id=f"sorted-{i}",
+                collection=collection,
+                intersects=None if geometries is None else next(geometries),
+                datetime=random_datetime_interval(fake) if datetime else None,
+                sortby=keys,
+                max_items=pages * config.limit,
+            )
 
-async def search_with_fc(
+
+async def search_with_random_queries(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+) -> ScenarioStats:
+    return await run_queries(config, session, context, random_queries(config))
+
+
+def fc_queries(
     config: BenchmarkConfig,
     fc_filename: str,
     id_field: str,
     datetime: Optional[str] = None,
     sortby: Optional[List[Dict[str, str]]] = None,
     exclude_ids: Optional[List[str]] = None,
-) -> Tuple[List[RunResult], float]:
-    config.logger.info("id,item count,duration (sec)")
+) -> Iterator[SearchQuery]:
+    """Lazily generate a query for each feature in a FeatureCollection.
 
-    intersectses = load_geometries(fc_filename, id_field)
-    sem = Semaphore(config.concurrency)
-    id_to_geometries = [
-        (search_id, intersects) for (search_id, intersects) in intersectses.items()
-    ]
+    Self-intersecting geometries, which some databases (e.g., Elasticsearch)
+    reject, are excluded, repaired, or kept as they are according to
+    ``config.invalid_geometries``.
+    """
+    corpus = load_corpus(fc_filename, id_field, config.corpus_dir)
+    count = len(corpus)
     if config.num_features is not None:
-        id_to_geometries = id_to_geometries[: config.num_features]
-
-    cos = [
-        search(
-            collection=collection,
-            intersects=intersects,
-            search_id=search_id,
-            config=config,
-            sem=sem,
-            datetime=datetime,
-            sortby=sortby,
+        count = min(count, config.num_features)
+    excluded = set(exclude_ids or ())
+    invalid = int(count - corpus.valid[:count].sum())
+    if invalid:
+        config.logger.info(
+            f"{invalid} of {count} geometries in {fc_filename} self-intersect,"
+            f" handling them with {config.invalid_geometries}"
         )
-        for (search_id, intersects) in id_to_geometries
-        for collection in config.collections
-        if exclude_ids is None or search_id not in exclude_ids
-    ]
 
-    shuffle(cos)
+    def queries() -> Iterator[SearchQuery]:
+        for index in range(count):
+            search_id = corpus.id(index)
+            if search_id in excluded:
+                continue
+            intersects = handle_invalid(
+                config, corpus.geometry(index), bool(corpus.valid[index])
+            )
+            if intersects is None:
+                continue
+            for collection in config.collections:
+                yield SearchQuery(
+                    search_id=search_id,
+                    collection=collection,
+                    intersects=intersects,
+                    datetime=datetime,
+                    sortby=sortby,
+                )
+
+    return windowed_shuffle(queries(), config.shuffle_window, config.seed)
 
-    t_start = perf_counter()
-    pending = [asyncio.get_running_loop().create_task(co) for co in cos]
-    results = await asyncio.gather(*pending, return_exceptions=True)
 
-    time = perf_counter() - t_start
+def handle_invalid(
+    config: BenchmarkConfig, intersects: Dict[str, Any], valid: bool
+) -> Optional[Dict[str, Any]]:
+    """The geometry to query with, or None if it is invalid and excluded."""
+    if valid or config.invalid_geometries == "keep":
+        return intersects
+    if config.invalid_geometries == "repair":
+        return repair(intersects)
+    return None
 
-    return results, time  # noqa
+
+def complexity_queries(
+    config: BenchmarkConfig,
+    fc_filename: str,
+    id_field: str,
+    tolerances: Sequence[float] = (),
+    max_vertices: Sequence[int] = (),
+) -> Iterator[SearchQuery]:
+    """Lazily generate queries for each feature at several levels of complexity.
+
+    Each feature is queried as it is, simplified to each tolerance (in degrees)
+    and to each budget of vertices, and as its bbox. Results are grouped by
+    level, and by the vertex count and size of the query geometry, each rounded
+    up to a power of two.
+    """
+    corpus = load_corpus(fc_filename, id_field, config.corpus_dir)
+    importance = load_importance(fc_filename, id_field, config.corpus_dir)
+    count = len(corpus)
+    if config.num_features is not None:
+        count = min(count, config.num_features)
+
+    def levels(index: int) -> Iterator[Tuple[str, Dict[str, Any], bool]]:
+        start, end = corpus.vertices(index)
+        yield "original", corpus.geometry(index), bool(corpus.valid[index])
+        for tolerance in tolerances:
+            mask = tolerance_mask(importance[start:end], tolerance)
+            simplified = corpus.geometry(index, mask)
+            # simplification can make a valid geometry intersect itself
+            yield f"tolerance={tolerance:g}", simplified, geometry_valid(simplified)
+        for budget in max_vertices:
+            mask = budget_mask(importance[start:end], budget)
+            simplified = corpus.geometry(index, mask)
+            yield f"max_vertices={budget}", simplified, geometry_valid(simplified)
+        yield "bbox", bbox_polygon(corpus.bbox[index]), True
+
+    def queries() -> Iterator[SearchQuery]:
+        for index in range(count):
+            search_id = corpus.id(index)
+            for level, geometry, valid in levels(index):
+                intersects = handle_invalid(config, geometry, valid)
+                if intersects is None:
+                    continue
+                vertices = sum(len(ring) for ring in geometry_rings(intersects))
+                size = len(json.dumps(intersects))
+                groups = (
+                    f"level:{level}",
+                    f"vertices:<={power_of_two(vertices)}",
+                    f"intersects_bytes:<={power_of_two(size)}",
+                )
+                for collection in config.collections:
+                    yield SearchQuery(
+                        search_id=f"{search_id}@{level}",
+                        collection=collection,
+                        intersects=intersects,
+                        groups=groups,
+                    )
+
+    return windowed_shuffle(queries(), config.shuffle_window, config.seed)
+
+
+def power_of_two(n: int) -> int:
+    """The smallest power of two that is at least n."""
+    return 1 << max(n - 1, 0).bit_length()
+
+
+async def search_with_fc(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    fc_filename: str,
+    id_field: str,
+    datetime: Optional[str] = None,
+    sortby: Optional[List[Dict[str, str]]] = None,
+    exclude_ids: Optional[List[str]] = None,
+) -> ScenarioStats:
+    config.logger.info("id,item count,duration (sec)")
+    queries = fc_queries(config, fc_filename, id_field, datetime, sortby, exclude_ids)
+    return await run_queries(config, session, context, queries)
 
 
 async def sorting(
     config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
     collection: str,
     sortby: List[Dict[str, str]],
+    sem: Semaphore = sequential_sem,
 ) -> RunResult:
     return await search(
         config=config,
+        session=session,
+        context=context,
         collection=collection,
         intersects=None,
         search_id="1",
-        sem=sequential_sem,
+        sem=sem,
         sortby=sortby,
     )
 
 
 def es_sortby(field: str, direction: str) -> dict[str, str]:
     return {"field": field, "direction": direction}
+
+
+def parse_sort_key(key: str) -> dict[str, str]:
+    """Parse a sort key like ``properties.datetime:desc`` into a sortby dict."""
+    field, _, direction = key.rpartition(":")
+    # the field itself may have a colon, e.g., properties.eo:cloud_cover
+    if direction not in ("asc", "desc"):
+        field, direction = key, "asc"
+    return es_sortby(field, direction)
+
+
+def parse_rate(value: str) -> float:
+    """Parse a rate like ``50``, ``50/s``, or ``600/m`` into requests per second.
+
+    Raises:
+        ValueError: if the value isn't a positive rate
+    """
+    count, _, unit = value.partition("/")
+    try:
+        rate = float(count) / RATE_UNITS[unit or "s"]
+    except (ValueError, KeyError):
+        raise ValueError(
+            f"{value!r} is not a rate like 50/s, 600/m, or 1000/h"
+        ) from None
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    return rate
@@ -0,0 +1,115 @@
+"""Stepped load ramp to find the maximum sustainable throughput of an API."""
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+import aiohttp
+
+from .api import ApiContext
+from .monitor import monitoring
+from .query import BenchmarkConfig
+from .query import Request
+from .query import run_closed_loop
+from .query import run_open_loop
+from .stats import ScenarioStats
+
+
+@dataclass
+class RampConfig:
+    """Config for a ramp through increasing concurrency or arrival rate.
+
+    Each step in ``steps`` is a concurrency, or a rate in requests per second if
+    ``by_rate`` is set. The ramp stops at the first step whose error rate exceeds
+    ``max_error_rate`` or whose p99 latency exceeds ``max_p99`` seconds.
+    """
+
+    steps: List[float]
+    by_rate: bool
+    step_duration: float
+    max_error_rate: float
+    max_p99: float
+
+
+def exceeded(ramp_config: RampConfig, stats: ScenarioStats) -> Optional[str]:
+    """The threshold a step crossed, if any."""
+    if not stats.count:
+        return "no requests completed"
+    error_rate = stats.errors / stats.count
+    if error_rate > ramp_config.max_error_rate:
+        return f"error rate {error_rate:.3f} > {ramp_config.max_error_rate}"
+    p99 = stats.latency.percentile(99)
+    if p99 is None or p99 > ramp_config.max_p99:
+        return f"p99 {p99}s > {ramp_config.max_p99}s"
+    return None
+
+
+async def ramp(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    ramp_config: RampConfig,
+    queries: Iterable[Request],
+) -> Dict[str, Any]:
+    """Run each step of the ramp for a fixed duration, drawing from the queries.
+
+    The queries are drawn lazily, and shouldn't run out, e.g., a ``cycle`` of a
+    list or the ``repeated`` rounds of a generator. The load on the client is
+    reported with the statistics of each step.
+
+    Returns:
+        the statistics of each step, and the knee: the step within the thresholds
+        with the highest throughput
+    """
+    load_name = "rate" if ramp_config.by_rate else "concurrency"
+    source = iter(queries)
+    steps = []
+    knee: Optional[Dict[str, Any]] = None
+    for load in ramp_config.steps:
+        config.logger.info(f"Running ramp step {load_name}={load:g}")
+        stats = ScenarioStats()
+        t_start = perf_counter()
+        deadline = t_start + ramp_config.step_duration
+        async with monitoring(session) as client_load:
+            if ramp_config.by_rate:
+                await run_open_loop(
+                    config, session, context, source, stats, load, deadline
+                )
+            else:
+                await run_closed_loop(
+                    config, session, context, source, stats, int(load), deadline
+                )
+        stats.duration = perf_counter() - t_start
+        stats.client = client_load.to_dict()
+        for warning in stats.client["warnings"]:
+            config.logger.warning(f"Ramp step {load_name}={load:g}: {warning}")
+
+        step = {load_name: load, **stats.to_dict()}
+        steps.append(step)
+        reason = exceeded(ramp_config, stats)
+        config.logger.info(
+            f"Ramp step {load_name}={load:g}: "
+            f"{step['requests_per_second']:.2f} requests/s, "
+            f"p99: {stats.latency.percentile(99)}s, errors: {stats.errors}"
+        )
+        if reason is not None:
+            config.logger.info(f"Stopping ramp at {load_name}={load:g}: {reason}")
+            step["exceeded"] = reason
+            break
+        if knee is None or step["requests_per_second"] > knee["requests_per_second"]:
+            knee = step
+
+    return {
+        "steps": steps,
+        "knee": None
+        if knee is None
+        else {
+            load_name: knee[load_name],
+            "requests_per_second": knee["requests_per_second"],
+            "items_per_second": knee["items_per_second"],
+            "p99": knee["latency"]["p99"],
+        },
+    }
@@ -1,73 +1,70 @@
 """Module for generating random GeoJSON shapes."""
 import math
-from random import Random
-from typing import Optional
+from typing import Any
+from typing import Dict
+from typing import List
 from typing import Tuple
 
-from geojson import Polygon
+import numpy as np
 
 
 # derived from
 # https://github.com/jazzband/geojson/blob/master/geojson/utils.py (BSD-3-Clause)
-def generate_random_polygon(
-    num_vertices: int = 5,
+def generate_random_polygons(
+    count: int,
+    rng: np.random.Generator,
+    min_vertices: int = 4,
+    max_vertices: int = 10,
     bbox: Tuple[float, float, float, float] = (-180.0, -90.0, 180.0, 90.0),
-    seed: Optional[int] = None,
     ave_radius: float = 5.0,
-    center_lon: float = 0.0,
-    center_lat: float = 0.0,
-) -> Polygon:
-    r = Random(seed)
+) -> List[Dict[str, Any]]:
+    """Generate a batch of random star-shaped polygons as GeoJSON dicts.
 
-    lon_min = bbox[0]
-    lon_max = bbox[2]
+    Every polygon has its own number of vertices, center, and shape, all drawn
+    from ``rng`` at once, so a batch of polygons costs little more than one.
 
-    lat_min = bbox[1]
-    lat_max = bbox[3]
+    Args:
+        count: the number of polygons
+        rng: the generator to draw from
+        min_vertices: the fewest vertices in a polygon
+        max_vertices: the most vertices in a polygon
+        bbox: the bounding box that the polygons are scaled and clipped to
+        ave_radius: the mean distance of the vertices from the center, in degrees
 
-    def clip(x: float, _min: float, _max: float) -> float:
-        if _min > _max:
-            return x
-        elif x < _min:
-            return _min
-        elif x > _max:
-            return _max
-        else:
-            return x
+    Returns:
+        GeoJSON Polygon geometries
+    """
+    lon_min, lat_min, lon_max, lat_max = bbox
 
-    def create_polygon() -> Polygon:
-        irregularity = clip(0.1, 0, 1) * 2 * math.pi / num_vertices
-        spikeyness = clip(0.5, 0, 1) * ave_radius
+    num_vertices = rng.integers(min_vertices, max_vertices, size=count, endpoint=True)
+    centers = rng.integers((-180, -90), (180, 90), size=(count, 2), endpoint=True)
+    present = np.arange(max_vertices) < num_vertices[:, np.newaxis]
 
-        angle_steps = []
-        lower = (2 * math.pi / num_vertices) - irregularity
-        upper = (2 * math.pi / num_vertices) + irregularity
-        _sum = 0.0
-        for _ in range(num_vertices):
-            tmp = r.uniform(lower, upper)
-            angle_steps.append(tmp)
-            _sum = _sum + tmp
+    # each angle step is within 10% of an even division of the circle, then all
+    # of them are scaled to sum to exactly one full turn
+    steps = rng.uniform(0.9, 1.1, size=(count, max_vertices)) * present
+    steps *= 2 * math.pi / steps.sum(axis=1, keepdims=True)
+    angles = rng.uniform(0, 2 * math.pi, size=(count, 1)) + np.cumsum(steps, axis=1)
+    angles -= steps
 
-        k = _sum / (2 * math.pi)
-        for i in range(num_vertices):
-            angle_steps[i] = angle_steps[i] / k
+    radii = np.clip(
+        rng.normal(ave_radius, 0.5 * ave_radius, size=(count, max_vertices)),
+        0,
+        2 * ave_radius,
+    )
+    lons = centers[:, 0:1] + radii * np.cos(angles)
+    lats = centers[:, 1:2] + radii * np.sin(angles)
+    lons = (lons + 180.0) * (abs(lon_min - lon_max) / 360.0) + lon_min
+    lats = (lats + 90.0) * (abs(lat_min - lat_max) / 180.0) + lat_min
+    if lon_min <= lon_max:
+        np.clip(lons, lon_min, lon_max, out=lons)
+    if lat_min <= lat_max:
+        np.clip(lats, lat_min, lat_max, out=lats)
 
-        points = []
-        angle = r.uniform(0, 2 * math.pi)
-
-        for i in range(num_vertices):
-            r_i = clip(r.gauss(ave_radius, spikeyness), 0, 2 * ave_radius)
-            x = center_lon + r_i * math.cos(angle)
-            y = center_lat + r_i * math.sin(angle)
-            x = (x + 180.0) * (abs(lon_min - lon_max) / 360.0) + lon_min
-            y = (y + 90.0) * (abs(lat_min - lat_max) / 180.0) + lat_min
-            x = clip(x, lon_min, lon_max)
-            y = clip(y, lat_min, lat_max)
-            points.append((x, y))
-            angle = angle + angle_steps[i]
-
-        first_val = points[0]
-        points.append(first_val)
-        return Polygon([points])
-
-    return create_polygon()
+    points = np.stack((lons, lats), axis=2).tolist()
+    polygons = []
+    for vertices, n in zip(points, num_vertices.tolist(), strict=True):
+        ring = vertices[:n]
+        ring.append(ring[0])
+        polygons.append({"type": "Polygon", "coordinates": [ring]})
+    return polygons
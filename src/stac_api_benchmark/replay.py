@@ -0,0 +1,333 @@
+"""Replay of recorded STAC API requests, e.g., from production access logs."""
+import asyncio
+import gzip
+import json
+import traceback
+from asyncio import Semaphore
+from asyncio import TimeoutError
+from asyncio import wait_for
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone as tz
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Coroutine
+from typing import Dict
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+import aiohttp
+from returns.result import Failure
+from returns.result import Success
+
+from .query import APIError
+from .query import BenchmarkConfig
+from .query import fetch_page
+from .query import RunFailure
+from .query import RunResult
+from .query import RunSuccess
+from .stats import ScenarioStats
+
+
+class ReplayError(Exception):
+    """A request log can't be replayed."""
+
+
+@dataclass
+class ReplayConfig:
+    """Config for replaying a request log.
+
+    Without a ``speed``, requests are replayed as fast as possible. With a
+    speed, requests are replayed at their original timing sped up by that
+    factor, so that 1 is the original timing. ``url_prefix`` is the path prefix
+    of the logged urls that is replaced by the url of the API under test.
+    """
+
+    filename: str
+    speed: Optional[float] = None
+    url_prefix: str = ""
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    """A recorded request.
+
+    ``url`` is absolute, or a path relative to the root of the API. The
+    ``timestamp`` is in seconds, and is only needed to replay at the original
+    timing.
+    """
+
+    method: str
+    url: str
+    body: Optional[Dict[str, Any]] = None
+    timestamp: Optional[float] = None
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Parse seconds since the epoch, or an ISO 8601 datetime, into seconds."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=tz.utc)
+    return parsed.timestamp()
+
+
+def check_intersects(value: Any) -> None:
+    """Check that an intersects parameter is a JSON object, or encodes one.
+
+    Raises:
+        ValueError: if it isn't
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = None
+    if not isinstance(value, dict):
+        raise ValueError("its intersects isn't a JSON object")
+
+
+def parse_entry(line: str) -> LogEntry:
+    """Parse a line of a request log.
+
+    Raises:
+        ValueError: if the line isn't a JSON object with a url, its body isn't a
+            JSON object, its intersects isn't a JSON object, or its timestamp
+            isn't a number or an ISO 8601 datetime
+    """
+    record = json.loads(line)
+    if not isinstance(record, dict) or "url" not in record:
+        raise ValueError("not a JSON object with a url")
+    url = str(record["url"])
+    body = record.get("body")
+    if body is not None and not isinstance(body, dict):
+        raise ValueError("its body isn't a JSON object")
+    parameters = {**dict(parse_qsl(urlsplit(url).query)), **(body or {})}
+    if "intersects" in parameters:
+        check_intersects(parameters["intersects"])
+    return LogEntry(
+        method=str(record.get("method", "GET")).upper(),
+        url=url,
+        body=body,
+        timestamp=parse_timestamp(record.get("timestamp")),
+    )
+
+
+def read_log(filename: str) -> Iterator[LogEntry]:
+    """Lazily read the entries of a JSON Lines request log, which may be gzipped.
+
+    Raises:
+        ReplayError: if a line isn't a request log entry
+    """
+    f: IO[str]
+    with (
+        gzip.open(filename, "rt", encoding="utf-8")
+        if filename.endswith(".gz")
+        else open(filename, encoding="utf-8")
+    ) as f:
+        for number, line in enumerate(f, start=1):
+            if line.strip():
+                try:
+                    yield parse_entry(line)
+                except ValueError as e:
+                    raise ReplayError(f"{filename}, line {number}: {e}") from e
+
+
+def rebase(url: str, api_url: str, prefix: str = "") -> str:
+    """The recorded url against the API under test.
+
+    The path and query of the recorded url, less the prefix, are appended to
+    the url of the API under test.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if prefix and path.startswith(prefix):
+        path = path[len(prefix) :]
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{api_url.rstrip('/')}/{path.lstrip('/')}{query}"
+
+
+def endpoint(path: str) -> str:
+    """The kind of STAC API endpoint that a path is to."""
+    parts = path.rstrip("/").split("/")
+    if parts[-1] == "search":
+        return "search"
+    if len(parts) >= 4 and parts[-4] == "collections" and parts[-2] == "items":
+        return "item"
+    if len(parts) >= 3 and parts[-3] == "collections" and parts[-1] == "items":
+        return "items"
+    if len(parts) >= 2 and parts[-2] == "collections":
+        return "collection"
+    if parts[-1] in ("collections", "conformance", "queryables"):
+        return parts[-1]
+    return "other"
+
+
+def describe_entry(entry: LogEntry) -> Tuple[str, str, str]:
+    """The endpoint, query shape, and collection of a recorded request.
+
+    The shape of a query is its endpoint and the names of its parameters, with
+    the type of any intersects geometry, e.g.,
+    ``search[collections,intersects:Polygon,limit]``. The entry is expected to
+    have been checked by ``parse_entry``.
+    """
+    parts = urlsplit(entry.url)
+    kind = endpoint(parts.path)
+    parameters: Dict[str, Any] = dict(parse_qsl(parts.query))
+    if entry.body:
+        parameters.update(entry.body)
+
+    names = []
+    for name in sorted(parameters):
+        value = parameters[name]
+        if name == "intersects" and isinstance(value, dict):
+            names.append(f"intersects:{value.get('type')}")
+        elif name == "intersects" and isinstance(value, str):
+            names.append(f"intersects:{json.loads(value).get('type')}")
+        else:
+            names.append(name)
+
+    collections = parameters.get("collections")
+    if isinstance(collections, list):
+        collection = ",".join(map(str, collections))
+    elif collections is not None:
+        collection = str(collections)
+    elif "/collections/" in parts.path:
+        collection = parts.path.split("/collections/")[1].split("/")[0]
+    else:
+        collection = ""
+    return f"{entry.method} {kind}", f"{kind}[{','.join(names)}]", collection
+
+
+async def replay_entry(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    entry: LogEntry,
+    url: str,
+    t_start: float,
+) -> RunResult:
+    """Make a recorded request, measuring its duration from ``t_start``."""
+    try:
+        _, timing = await wait_for(
+            fetch_page(session, entry.method, url, entry.body, config.response_mode),
+            timeout=config.timeout,
+        )
+        time = perf_counter() - t_start
+        config.logger.info(f"{entry.method} {url},{timing.items},{time:.2f}")
+        return Success(
+            RunSuccess(
+                duration=time,
+                count=timing.items,
+                ttfb=timing.ttfb,
+                bytes=timing.bytes,
+            )
+        )
+    except APIError as e:
+        msg = f"{entry.method} {url}: APIError: {e}"
+        config.logger.error(msg)
+        return Failure(RunFailure(perf_counter() - t_start, msg, e.status))
+    except TimeoutError as e:
+        msg = f"{entry.method} {url}: TimeoutError ({config.timeout}s): {e}"
+        config.logger.error(msg)
+        return Failure(RunFailure(perf_counter() - t_start, msg))
+    except Exception as e:
+        msg = f"{entry.method} {url}: Exception: {e}"
+        config.logger.error(msg)
+        config.logger.error(traceback.format_exc())
+        return Failure(RunFailure(perf_counter() - t_start, msg))
+
+
+async def run_timed(
+    entries: Iterable[LogEntry],
+    speed: float,
+    t_start: float,
+    run: Callable[[LogEntry, float], Coroutine[Any, Any, None]],
+) -> None:
+    """Run each entry at its original offset from the first, divided by the speed.
+
+    If an entry can't be run, the entries already started are cancelled.
+
+    Raises:
+        ReplayError: if an entry has no timestamp
+    """
+    loop = asyncio.get_running_loop()
+    pending: Set["asyncio.Task[None]"] = set()
+    first: Optional[float] = None
+    try:
+        for entry in entries:
+            if entry.timestamp is None:
+                raise ReplayError(f"{entry.method} {entry.url} has no timestamp")
+            first = entry.timestamp if first is None else first
+            scheduled = t_start + (entry.timestamp - first) / speed
+            delay = scheduled - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = loop.create_task(run(entry, scheduled))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    except BaseException:
+        for started in pending:
+            started.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def replay(
+    config: BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    replay_config: ReplayConfig,
+    entries: Iterable[LogEntry],
+) -> ScenarioStats:
+    """Replay recorded requests against ``config.url``.
+
+    Without a speed, requests are replayed as fast as possible by
+    ``config.concurrency`` workers. With a speed, each request starts at its
+    original offset from the first, divided by the speed, with at most
+    ``config.concurrency`` in flight. Timed replay is open loop: latency is
+    measured from the time each request was scheduled to start.
+
+    Results are grouped by endpoint (``endpoint:POST search``) and by query
+    shape (``shape:search[collections,limit]``).
+
+    Raises:
+        ReplayError: if a speed is given and a log entry has no timestamp
+    """
+    stats = ScenarioStats()
+    iterator = iter(entries)
+
+    async def run_one(entry: LogEntry, t_start: float) -> None:
+        url = rebase(entry.url, config.url, replay_config.url_prefix)
+        result = await replay_entry(config, session, entry, url, t_start)
+        kind, shape, collection = describe_entry(entry)
+        stats.record_for(
+            collection, result, (f"endpoint:{kind}", f"shape:{shape}"), entry.url
+        )
+
+    async def worker() -> None:
+        for entry in iterator:
+            await run_one(entry, perf_counter())
+
+    sem = Semaphore(config.concurrency)
+
+    async def run_scheduled(entry: LogEntry, scheduled: float) -> None:
+        async with sem:
+            stats.record_lag(perf_counter() - scheduled)
+            await run_one(entry, scheduled)
+
+    speed = replay_config.speed
+    t_start = perf_counter()
+    if speed is None:
+        await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+    else:
+        await run_timed(iterator, speed, t_start, run_scheduled)
+    stats.duration = perf_counter() - t_start
+    return stats
@@ -0,0 +1,240 @@
+"""A SQLite store of benchmark runs, for comparing a run against a baseline.
+
+Each run is stored with its metadata, the statistics of each scenario, and the
+result of every request, written in batches as the requests complete. Requests
+made by worker processes or agents are only stored in the statistics of their
+scenarios.
+"""
+import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from returns.result import Failure
+from returns.result import Success
+
+from . import stats
+from .query import BenchmarkConfig
+from .query import RunResult
+from .stats import ScenarioStats
+
+# the number of request results buffered before they are written
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    label TEXT,
+    git_sha TEXT,
+    url TEXT NOT NULL,
+    version TEXT,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    scenario TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    PRIMARY KEY (run_id, scenario)
+);
+CREATE TABLE IF NOT EXISTS requests (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    scenario TEXT NOT NULL,
+    request_id TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    latency REAL NOT NULL,
+    ttfb REAL,
+    items INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    status INTEGER,
+    error TEXT,
+    ok INTEGER GENERATED ALWAYS AS (status IS NOT NULL AND status < 400) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS requests_by_scenario ON requests (run_id, scenario);
+"""
+
+
+class ResultsError(Exception):
+    """A run can't be found in the results store."""
+
+
+@dataclass
+class Run:
+    """The metadata of a stored run."""
+
+    id: int
+    started: str
+    label: Optional[str]
+    git_sha: Optional[str]
+    url: str
+    version: Optional[str]
+
+
+def package_version() -> Optional[str]:
+    """The installed version of the benchmark, if it's installed."""
+    try:
+        return version("stac-api-benchmark")
+    except PackageNotFoundError:  # pragma: no cover
+        return None
+
+
+class ResultsStore:
+    """A SQLite database of runs, written to by one run at a time."""
+
+    def __init__(self, filename: str) -> None:
+        """Open the database, creating it if it doesn't exist."""
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        self.run_id: Optional[int] = None
+        self._buffer: List[Tuple[Any, ...]] = []
+
+    def close(self) -> None:
+        """Write any buffered requests and close the database."""
+        self.flush()
+        self.connection.close()
+
+    def start_run(
+        self,
+        config: BenchmarkConfig,
+        label: Optional[str] = None,
+        git_sha: Optional[str] = None,
+    ) -> int:
+        """Store the metadata of a new run, which the results are stored in."""
+        self.connection.execute(
+            "INSERT INTO runs (started, label, git_sha, url, version, config)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                label,
+                git_sha,
+                config.url,
+                package_version(),
+                json.dumps(config.to_dict()),
+            ),
+        )
+        self.connection.commit()
+        (run_id,) = self.connection.execute("SELECT last_insert_rowid()").fetchone()
+        self.run_id = run_id
+        return int(run_id)
+
+    def record(
+        self, scenario: str, request_id: str, collection: str, result: RunResult
+    ) -> None:
+        """Buffer the result of a request, writing the buffer when it's full."""
+        match result:
+            case Success(value):
+                row = (
+                    value.duration,
+                    value.ttfb,
+                    value.count,
+                    value.bytes,
+                    value.status,
+                    None,
+                )
+            case Failure(value):
+                row = (value.duration, None, 0, 0, value.status, value.msg)
+        self._buffer.append((self.run_id, scenario, request_id, collection, *row))
+        if len(self._buffer) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered requests."""
+        if self._buffer:
+            self.connection.executemany(
+                "INSERT INTO requests (run_id, scenario, request_id, collection,"
+                " latency, ttfb, items, bytes, status, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._buffer,
+            )
+            self.connection.commit()
+            self._buffer.clear()
+
+    @contextmanager
+    def recording(self, scenario: str) -> Iterator[None]:
+        """Store the requests of a scenario recorded in this context."""
+        token = stats.recorder.set(
+            lambda request_id, collection, result: self.record(
+                scenario, request_id, collection, result
+            )
+        )
+        try:
+            yield
+        finally:
+            stats.recorder.reset(token)
+            self.flush()
+
+    def save(self, scenario: str, scenario_stats: ScenarioStats) -> None:
+        """Store the statistics of a scenario of the current run."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO scenarios (run_id, scenario, stats)"
+            " VALUES (?, ?, ?)",
+            (self.run_id, scenario, json.dumps(scenario_stats.encode())),
+        )
+        self.connection.commit()
+
+    def runs(self) -> List[Run]:
+        """The stored runs, oldest first."""
+        return [
+            Run(*row)
+            for row in self.connection.execute(
+                "SELECT id, started, label, git_sha, url, version FROM runs"
+                " ORDER BY id"
+            )
+        ]
+
+    def find_run(self, ref: Optional[str] = None, before: Optional[int] = None) -> Run:
+        """Find a run by its id or label, or else the latest run.
+
+        A label refers to the latest run with that label. With ``before``, only
+        runs older than that run are found.
+
+        Raises:
+            ResultsError: if there's no such run
+        """
+        candidates = [run for run in self.runs() if before is None or run.id < before]
+        if ref is not None:
+            candidates = [
+                run for run in candidates if str(run.id) == ref or run.label == ref
+            ]
+        if not candidates:
+            raise ResultsError(
+                f"no run {ref!r} is stored" if ref is not None else "no run is stored"
+            )
+        return candidates[-1]
+
+    def scenario_stats(self, run_id: int) -> Dict[str, ScenarioStats]:
+        """The statistics of each scenario of a run, in the order they ran."""
+        return {
+            scenario: ScenarioStats.decode(json.loads(encoded))
+            for scenario, encoded in self.connection.execute(
+                "SELECT scenario, stats FROM scenarios WHERE run_id = ?"
+                " ORDER BY rowid",
+                (run_id,),
+            )
+        }
+
+    def latencies(self, run_id: int, scenario: str) -> NDArray[np.float64]:
+        """The latencies of the successful requests of a scenario of a run."""
+        return np.array(
+            [
+                latency
+                for (latency,) in self.connection.execute(
+                    "SELECT latency FROM requests"
+                    " WHERE run_id = ? AND scenario = ? AND ok",
+                    (run_id, scenario),
+                )
+            ],
+            dtype=np.float64,
+        )
@@ -0,0 +1,556 @@
+"""The registry of benchmark scenarios, and the runners that run them.
+
+Each scenario is declared, rather than coded: it names a runner, e.g.,
+``queries`` for the queries of a generator, and gives the runner its
+parameters, along with an optional concurrency, count, and duration.
+
+Plugins add scenarios with an entry point in the ``stac_api_benchmark.scenarios``
+group, which loads a scenario, a list of scenarios, or a function returning
+either, and add runners with an entry point in the ``stac_api_benchmark.runners``
+group, named for the runner. A scenarios file adds scenarios too.
+"""
+import asyncio
+import json
+from asyncio import Semaphore
+from concurrent.futures import Executor
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from dataclasses import replace
+from fnmatch import fnmatchcase
+from importlib.metadata import entry_points
+from time import perf_counter
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import aiohttp
+from returns.result import Failure
+from returns.result import Success
+
+from . import distributed
+from . import items
+from . import query
+from . import transfer
+from . import workers
+from .api import ApiContext
+from .stats import ScenarioStats
+from .workers import QuerySource
+from .workload import load_document
+from .workload import WorkloadError
+
+SCENARIO_ENTRY_POINTS = "stac_api_benchmark.scenarios"
+RUNNER_ENTRY_POINTS = "stac_api_benchmark.runners"
+
+# the fields of a scenario that can be set from the command line
+OPTION_FIELDS = {"concurrency": int, "count": int, "duration": float}
+
+
+class ScenarioError(Exception):
+    """A scenario can't be found, or isn't valid."""
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A named benchmark scenario.
+
+    The ``runner`` runs the scenario with its ``params``. A ``concurrency``,
+    ``count`` of requests, or ``duration`` in seconds, if given, take precedence
+    over those of the run. ``conformance`` is any conformance classes the
+    scenario requires beyond those implied by its runner and params, and
+    ``tags`` select groups of scenarios, e.g., ``quick``. An ``opt_in``
+    scenario only runs when a pattern selects it.
+    """
+
+    name: str
+    runner: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    description: str = ""
+    concurrency: Optional[int] = None
+    count: Optional[int] = None
+    duration: Optional[float] = None
+    tags: Tuple[str, ...] = ()
+    conformance: Tuple[str, ...] = ()
+    opt_in: bool = False
+
+    @property
+    def title(self) -> str:
+        """The description of the scenario, or else its name."""
+        return self.description or self.name
+
+
+@dataclass
+class Runtime:
+    """What scenarios run with: the config, session, and API, and any workers."""
+
+    config: query.BenchmarkConfig
+    session: aiohttp.ClientSession
+    context: ApiContext
+    executor: Optional[Executor] = None
+    agents: Optional[List[str]] = None
+
+
+ScenarioRunner = Callable[[Runtime, Scenario], Awaitable[ScenarioStats]]
+
+
+def scenario_config(
+    config: query.BenchmarkConfig, scenario: Scenario
+) -> query.BenchmarkConfig:
+    """The config of a run, with the concurrency and duration of a scenario."""
+    return replace(
+        config,
+        concurrency=scenario.concurrency or config.concurrency,
+        duration=scenario.duration or config.duration,
+    )
+
+
+async def run_generator(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    generator: QuerySource,
+    executor: Optional[Executor] = None,
+    agents: Optional[List[str]] = None,
+) -> ScenarioStats:
+    """Run the generated queries, across agents or worker processes if given."""
+    config.logger.info("id,item count,duration (sec)")
+    if agents:
+        return await distributed.run_distributed(config, generator, agents)
+    if executor is not None:
+        return await workers.run_sharded(config, context, generator, executor)
+    return await query.run_queries(config, session, context, generator(config))
+
+
+async def run_queries(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Run the queries of the ``generator`` param, with the other params."""
+    params = dict(scenario.params)
+    source = QuerySource(params.pop("generator"), params)
+    if scenario.count is not None:
+        source = QuerySource(
+            "limited", {"source": asdict(source), "count": scenario.count}
+        )
+    return await run_generator(
+        scenario_config(runtime.config, scenario),
+        runtime.session,
+        runtime.context,
+        source,
+        runtime.executor,
+        runtime.agents,
+    )
+
+
+async def run_repeated_item(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Request the first item of each collection ``count`` times."""
+    return await query.request_item_repeatedly(
+        config=runtime.config,
+        session=runtime.session,
+        context=runtime.context,
+        times=scenario.count or 1,
+        concurrency=scenario.concurrency or runtime.config.concurrency,
+    )
+
+
+async def run_item_cache(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Request ``count`` items from a pool, with keys drawn from a distribution.
+
+    The ``pool`` param is the number of items of each collection, harvested on
+    first use and cached on disk unless ``refresh`` is set, and the rest of the
+    params are those of :func:`items.item_requests`.
+
+    Raises:
+        ScenarioError: if the distribution or its parameters aren't valid
+    """
+    config = scenario_config(runtime.config, scenario)
+    params = dict(scenario.params)
+    size = params.pop("pool", items.DEFAULT_POOL_SIZE)
+    refresh = params.pop("refresh", False)
+    pools = {
+        collection: await items.load_pool(
+            config, runtime.session, runtime.context, collection, size, refresh
+        )
+        for collection in config.collections
+    }
+    try:
+        requests = items.item_requests(
+            config, pools, scenario.count or items.DEFAULT_REQUESTS, **params
+        )
+    except (TypeError, ValueError) as e:
+        raise ScenarioError(f"scenario {scenario.name}: {e}") from e
+    config.logger.info("id,item count,duration (sec)")
+    return await query.run_queries(config, runtime.session, runtime.context, requests)
+
+
+async def run_transfer(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Request items and a search page with each encoding, and conditionally."""
+    params = dict(scenario.params)
+    if "encodings" in params:
+        params["encodings"] = tuple(params["encodings"])
+    return await transfer.run_transfer(
+        scenario_config(runtime.config, scenario),
+        runtime.session,
+        runtime.context,
+        **params,
+    )
+
+
+async def run_sort(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Search each collection once, sorted by the ``sortby`` param's keys.
+
+    The searches of the collections run with at most the scenario's
+    concurrency, or the run's, in flight.
+    """
+    config = scenario_config(runtime.config, scenario)
+    keys = " ".join(scenario.params["sortby"])
+    sortby = [query.parse_sort_key(key) for key in scenario.params["sortby"]]
+    sem = Semaphore(config.concurrency)
+    stats = ScenarioStats()
+
+    async def sort(collection: str) -> None:
+        result = await query.sorting(
+            config=config,
+            session=runtime.session,
+            context=runtime.context,
+            collection=collection,
+            sortby=sortby,
+            sem=sem,
+        )
+        stats.record_for(collection, result, request_id=f"sort {keys}")
+        match result:
+            case Success(value):
+                config.logger.info(
+                    f"Results: sort {keys} on {collection} : {value.duration:.2f}s"
+                )
+            case Failure(value):
+                config.logger.error(
+                    f"Results: sort {keys} on {collection} : Error: {value.msg}"
+                )
+
+    t_start = perf_counter()
+    await asyncio.gather(*(sort(collection) for collection in config.collections))
+    stats.duration = perf_counter() - t_start
+    return stats
+
+
+RUNNERS: Dict[str, ScenarioRunner] = {
+    "queries": run_queries,
+    "repeated_item": run_repeated_item,
+    "item_cache": run_item_cache,
+    "transfer": run_transfer,
+    "sort": run_sort,
+}
+
+
+def fc_scenario(
+    name: str, description: str, fc_filename: str, id_field: str, **params: Any
+) -> Scenario:
+    return Scenario(
+        name,
+        "queries",
+        {"generator": "fc", "fc_filename": fc_filename, "id_field": id_field, **params},
+        description=description,
+        tags=("fc",),
+    )
+
+
+def sort_scenario(field_name: str, label: str, direction: str) -> Scenario:
+    return Scenario(
+        f"sort_{label}_{direction}",
+        "sort",
+        {"sortby": [f"{field_name}:{direction}"]},
+        description=f"sort {field_name} {direction}",
+        tags=("quick", "sort"),
+    )
+
+
+def builtin_scenarios(
+    seed: int = 0,
+    feature_collection: Optional[QuerySource] = None,
+    complexity: Optional[QuerySource] = None,
+) -> List[Scenario]:
+    """The scenarios of the benchmark, in the order that they run.
+
+    The feature collection and complexity scenarios are only included if their
+    sources are given.
+    """
+    scenarios = [
+        fc_scenario("step", "STEP", query.STEP, "siteid"),
+        fc_scenario("tnc", "TNC Ecoregions", query.TNC_ECOREGIONS, "ECO_ID_U"),
+        replace(
+            fc_scenario(
+                "countries_apr_2019",
+                "Countries, April 2019",
+                query.COUNTRIES,
+                "name",
+                datetime="2019-04-01T00:00:00Z/2019-05-01T00:00:00Z",
+            ),
+            tags=("fc", "quick"),
+        ),
+        replace(
+            fc_scenario(
+                "countries_cloud_cover_asc",
+                "Countries, cloud cover ascending",
+                query.COUNTRIES,
+                "name",
+                sortby=[query.es_sortby("properties.eo:cloud_cover", "asc")],
+            ),
+            tags=("fc", "quick"),
+        ),
+    ]
+    if feature_collection is not None:
+        filename = feature_collection.params["fc_filename"]
+        scenarios.append(
+            Scenario(
+                "feature_collection",
+                "queries",
+                {"generator": "fc", **feature_collection.params},
+                description=f"Feature collection {filename}",
+                tags=("fc",),
+            )
+        )
+    if complexity is not None:
+        filename = complexity.params["fc_filename"]
+        scenarios.append(
+            Scenario(
+                "complexity",
+                "queries",
+                {"generator": "complexity", **complexity.params},
+                description=f"Complexity sweep over {filename}",
+            )
+        )
+    return scenarios + [
+        Scenario(
+            "random_queries",
+            "queries",
+            {"generator": "random"},
+            description=f"Random Queries (seeded with {seed})",
+            tags=("random",),
+        ),
+        Scenario(
+            "sort_paged",
+            "queries",
+            {
+                "generator": "sorted",
+                "sortby": ["properties.datetime:desc", "id:asc"],
+                "pages": 10,
+            },
+            description="Sorted queries, paginated 10 pages deep",
+            count=100,
+            tags=("sort",),
+        ),
+        Scenario(
+            "repeated",
+            "repeated_item",
+            description="Repeated item",
+            concurrency=50,
+            count=10000,
+        ),
+        Scenario(
+            "item_cache",
+            "item_cache",
+            {"distribution": "zipf", "skew": 1.0, "pool": 1000},
+            description="Items of a pool, Zipf distributed",
+            count=10000,
+            tags=("item",),
+            opt_in=True,
+        ),
+        Scenario(
+            "transfer",
+            "transfer",
+            {"pool": 10, "limit": 500, "repeats": 10},
+            description="Conditional requests and encodings",
+            tags=("item", "http"),
+            opt_in=True,
+        ),
+        sort_scenario("properties.eo:cloud_cover", "cloud_cover", "desc"),
+        sort_scenario("properties.eo:cloud_cover", "cloud_cover", "asc"),
+        sort_scenario("properties.datetime", "datetime", "desc"),
+        sort_scenario("properties.datetime", "datetime", "asc"),
+        sort_scenario("properties.created", "created", "desc"),
+        sort_scenario("properties.created", "created", "asc"),
+    ]
+
+
+def plugin_scenarios() -> List[Scenario]:
+    """The scenarios added by installed plugins."""
+    scenarios: List[Scenario] = []
+    for entry_point in entry_points(group=SCENARIO_ENTRY_POINTS):
+        loaded = entry_point.load()
+        if callable(loaded):
+            loaded = loaded()
+        scenarios.extend([loaded] if isinstance(loaded, Scenario) else loaded)
+    return scenarios
+
+
+def runners() -> Dict[str, ScenarioRunner]:
+    """The built-in runners, and those added by installed plugins."""
+    return {
+        **RUNNERS,
+        **{
+            entry_point.name: entry_point.load()
+            for entry_point in entry_points(group=RUNNER_ENTRY_POINTS)
+        },
+    }
+
+
+def registry(*sources: Iterable[Scenario]) -> List[Scenario]:
+    """The scenarios of each source, in order.
+
+    A scenario replaces an earlier scenario of the same name, in its place, so
+    that a scenarios file can change a built-in scenario.
+    """
+    by_name: Dict[str, Scenario] = {}
+    for source in sources:
+        for scenario in source:
+            by_name[scenario.name] = scenario
+    return list(by_name.values())
+
+
+def read_scenarios(filename: str) -> List[Scenario]:
+    """Read the ``scenarios`` list of a TOML or YAML file.
+
+    Raises:
+        ScenarioError: if the file doesn't declare valid scenarios
+    """
+    try:
+        document = load_document(filename)
+    except WorkloadError as e:
+        raise ScenarioError(f"{filename}: {e}") from e
+    declared = document.get("scenarios") if isinstance(document, dict) else None
+    if not isinstance(declared, list):
+        raise ScenarioError(f"{filename}: expected a list of scenarios")
+    names = {f.name for f in fields(Scenario)}
+    scenarios = []
+    for d in declared:
+        if not isinstance(d, dict) or "name" not in d or "runner" not in d:
+            raise ScenarioError(f"{filename}: each scenario needs a name and runner")
+        unknown = set(d) - names
+        if unknown:
+            raise ScenarioError(
+                f"{filename}: unknown scenario fields {', '.join(sorted(unknown))}"
+            )
+        scenarios.append(
+            Scenario(
+                **{
+                    **d,
+                    "tags": tuple(d.get("tags", ())),
+                    "conformance": tuple(d.get("conformance", ())),
+                }
+            )
+        )
+    return scenarios
+
+
+def select(
+    scenarios: Sequence[Scenario],
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+) -> List[Scenario]:
+    """The scenarios matching any include pattern, if given, and no exclude pattern.
+
+    Patterns are shell-style, e.g., ``sort_*``, and match a scenario's name or
+    any of its tags. Without include patterns, the scenarios that aren't opt-in
+    are included.
+
+    Raises:
+        ScenarioError: if a pattern matches no scenario
+    """
+
+    def matches(scenario: Scenario, pattern: str) -> bool:
+        return any(
+            fnmatchcase(label, pattern) for label in (scenario.name, *scenario.tags)
+        )
+
+    for pattern in (*include, *exclude):
+        if not any(matches(scenario, pattern) for scenario in scenarios):
+            raise ScenarioError(f"no scenario matches {pattern!r}")
+    return [
+        scenario
+        for scenario in scenarios
+        if (
+            any(matches(scenario, p) for p in include)
+            if include
+            else not scenario.opt_in
+        )
+        and not any(matches(scenario, p) for p in exclude)
+    ]
+
+
+def configure(
+    scenarios: Sequence[Scenario], options: Iterable[Tuple[str, str, str]]
+) -> List[Scenario]:
+    """Set the concurrency, count, or duration of scenarios, or a param, by name.
+
+    Param values are parsed as JSON if they can be, e.g., ``20`` or
+    ``["properties.datetime:desc"]``, and are otherwise strings.
+
+    Raises:
+        ScenarioError: if a scenario doesn't exist, or a concurrency, count, or
+            duration isn't a positive number
+    """
+    by_name = {scenario.name: scenario for scenario in scenarios}
+    for name, field_name, value in options:
+        if name not in by_name:
+            raise ScenarioError(f"no scenario is named {name!r}")
+        if field_name not in OPTION_FIELDS:
+            try:
+                param = json.loads(value)
+            except ValueError:
+                param = value
+            params = {**by_name[name].params, field_name: param}
+            by_name[name] = replace(by_name[name], params=params)
+            continue
+        try:
+            number = OPTION_FIELDS[field_name](value)
+        except ValueError:
+            number = 0
+        if number <= 0:
+            raise ScenarioError(f"{name}.{field_name} must be a positive number")
+        by_name[name] = replace(by_name[name], **{field_name: number})
+    return [by_name[scenario.name] for scenario in scenarios]
+
+
+def request_count(config: query.BenchmarkConfig, scenario: Scenario) -> Optional[int]:
+    """The number of requests of a scenario, or a lower bound, if it's known.
+
+    A sort scenario searches each collection once, and other scenarios make at
+    least their ``count`` of requests, if they have one.
+    """
+    if scenario.runner == "sort":
+        return len(config.collections)
+    return scenario.count
+
+
+def required_conformance(
+    config: query.BenchmarkConfig, scenarios: Iterable[Scenario]
+) -> List[str]:
+    """The conformance classes required by the scenarios."""
+    required = ["item-search"]
+    for scenario in scenarios:
+        needed = list(scenario.conformance)
+        if scenario.runner == "sort" or scenario.params.get("sortby"):
+            needed.append("sort")
+        if config.queryables and scenario.params.get("generator") == "random":
+            needed.append("filter")
+        required.extend(c for c in needed if c not in required)
+    return required
+
+
+async def run_scenario(runtime: Runtime, scenario: Scenario) -> ScenarioStats:
+    """Run a scenario with its runner.
+
+    Raises:
+        ScenarioError: if there's no runner of that name
+    """
+    available = runners()
+    if scenario.runner not in available:
+        raise ScenarioError(
+            f"scenario {scenario.name} has an unknown runner {scenario.runner!r}"
+        )
+    return await available[scenario.runner](runtime, scenario)
@@ -0,0 +1,126 @@
+"""Simplification of the geometries of a corpus, for complexity sweeps.
+
+Every vertex is ranked once by Douglas-Peucker: its importance is the largest
+tolerance at which the algorithm would keep it. Simplifying to a tolerance, or
+to a budget of vertices, is then only a comparison against that ranking, so the
+ranking is computed once per corpus and cached alongside it.
+"""
+from contextlib import suppress
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from .corpus import Array
+from .corpus import Corpus
+from .corpus import corpus_path
+from .corpus import load_corpus
+from .corpus import read_arrays
+from .corpus import source_of
+from .corpus import write_arrays
+from .features import resolve_path
+
+# vertex importances, by the filename and id field of their corpus
+_importances: Dict[Tuple[str, str], Array] = {}
+
+
+def ring_importance(ring: Array) -> Array:
+    """The Douglas-Peucker importance of each vertex of a closed ring.
+
+    The ends of the ring, and the two vertices that Douglas-Peucker would keep
+    first, have infinite importance, so that every simplification of the ring
+    is still at least a triangle.
+    """
+    importance = np.zeros(len(ring))
+    importance[[0, -1]] = np.inf
+    stack = [(0, len(ring) - 1, np.inf)]
+    while stack:
+        first, last, ceiling = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = ring[first], ring[last]
+        points = ring[first + 1 : last]
+        dx, dy = b - a
+        px, py = (points - a).T
+        # the distance from the segment ab, which is a point at the ends of a ring
+        squared_length = dx * dx + dy * dy
+        t = np.clip((px * dx + py * dy) / squared_length, 0, 1) if squared_length else 0
+        distances = np.hypot(px - t * dx, py - t * dy)
+        farthest = int(np.argmax(distances))
+        # clamped so that no vertex outranks the vertices that it splits between
+        importance[first + 1 + farthest] = min(distances[farthest], ceiling)
+        split = first + 1 + farthest
+        stack.append((first, split, importance[split]))
+        stack.append((split, last, importance[split]))
+
+    interior = importance[1:-1]
+    interior[np.argsort(interior)[-2:]] = np.inf
+    return importance
+
+
+def vertex_importance(corpus: Corpus) -> Array:
+    """The importance of every vertex in a corpus, aligned with its coordinates."""
+    importance = np.empty(len(corpus.coordinates))
+    offsets = corpus.ring_offsets.tolist()
+    for start, end in zip(offsets[:-1], offsets[1:], strict=True):
+        importance[start:end] = ring_importance(corpus.coordinates[start:end])
+    return importance
+
+
+def load_importance(
+    filename: str, id_field: str, corpus_dir: Optional[str] = None
+) -> Array:
+    """Load the vertex importances of a corpus, computing them on first use.
+
+    Importances are cached in-process, and on disk next to the corpus.
+    """
+    key = (filename, id_field)
+    if key not in _importances:
+        path = resolve_path(filename)
+        source = source_of(path, id_field)
+        importance_path = corpus_path(path, id_field, corpus_dir).with_suffix(
+            ".importance"
+        )
+        arrays = read_arrays(importance_path, source)
+        if arrays is None:
+            arrays = {
+                "importance": vertex_importance(
+                    load_corpus(filename, id_field, corpus_dir)
+                )
+            }
+            with suppress(OSError):
+                write_arrays(arrays, importance_path, source)
+        _importances[key] = arrays["importance"]
+    return _importances[key]
+
+
+def tolerance_mask(importance: Array, tolerance: float) -> Array:
+    """The vertices that Douglas-Peucker keeps at a tolerance, in degrees."""
+    return importance > tolerance
+
+
+def budget_mask(importance: Array, max_vertices: int) -> Array:
+    """The most important vertices, up to a budget.
+
+    A geometry keeps more vertices than the budget only if it has more rings
+    than would fit in the budget as triangles.
+    """
+    if len(importance) <= max_vertices:
+        return np.ones(len(importance), dtype=np.bool_)
+    threshold = np.partition(importance, -max_vertices - 1)[-max_vertices - 1]
+    return (importance > threshold) | np.isinf(  # type: ignore[no-any-return]
+        importance
+    )
+
+
+def bbox_polygon(bbox: Array) -> Dict[str, Any]:
+    """A bbox as a GeoJSON Polygon."""
+    west, south, east, north = bbox.tolist()
+    return {
+        "type": "Polygon",
+        "coordinates": [
+            [[west, south], [east, south], [east, north], [west, north], [west, south]]
+        ],
+    }
@@ -0,0 +1,400 @@
+"""Latency histograms and per-scenario statistics."""
+import math
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+from typing import Protocol
+from typing import TYPE_CHECKING
+
+from returns.result import Failure
+from returns.result import Success
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .query import RunResult
+
+# Values are recorded as integer microseconds in log-linear buckets, in the
+# style of HdrHistogram: each power of two is split into 2 ** (SUB_BUCKET_BITS
+# - 1) linear sub-buckets, so every value is kept to within ~0.1%.
+SUB_BUCKET_BITS = 11
+SUB_BUCKET_MASK = (1 << SUB_BUCKET_BITS) - 1
+
+PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+
+# an open loop request that starts more than this many seconds after it was
+# scheduled to is counted as behind schedule
+BEHIND_SCHEDULE_TOLERANCE = 0.01
+
+# called with the id, collection, and result of each request recorded by a
+# scenario, e.g., to store it (see results.ResultsStore.recording)
+Recorder = Callable[[str, str, "RunResult"], None]
+recorder: ContextVar[Optional[Recorder]] = ContextVar("recorder", default=None)
+
+
+class Classifier(Protocol):
+    """Tells the requests of a scenario that are measured from those of its warmup.
+
+    See warmup.Warmup.
+    """
+
+    def __call__(self, result: "RunResult") -> bool:
+        """Whether the request of a result is measured."""
+
+    def starts_measured(self, start: float) -> bool:
+        """Whether a request starting at ``start`` will be measured."""
+
+
+# classifies each request recorded by a scenario, if it has a warmup
+measuring: ContextVar[Optional[Classifier]] = ContextVar("measuring", default=None)
+
+
+def natural_key(label: str) -> tuple[Any, ...]:
+    """A sort key that orders the numbers in labels by value, e.g., 256 before 1024."""
+    return tuple(
+        int(part) if part.isdigit() else part for part in re.split(r"(\d+)", label)
+    )
+
+
+def bucket_index(value: int) -> int:
+    shift = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_midpoint(index: int) -> float:
+    shift = index >> SUB_BUCKET_BITS
+    lowest = (index & SUB_BUCKET_MASK) << shift
+    return lowest + ((1 << shift) - 1) / 2
+
+
+@dataclass
+class Histogram:
+    """A mergeable latency histogram with bounded relative error.
+
+    Only the count of values in each bucket is kept, so memory use does not grow
+    with the number of values recorded. Values are in seconds.
+    """
+
+    counts: Dict[int, int] = field(default_factory=dict)
+    count: int = 0
+    total: float = 0.0
+    min: float = math.inf
+    max: float = 0.0
+
+    def record(self, value: float) -> None:
+        """Record a value."""
+        index = bucket_index(max(round(value * 1_000_000), 0))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the values recorded by another histogram."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> Optional[float]:
+        """The mean of the recorded values."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """The value below which the given percentage of values fall."""
+        if not self.count:
+            return None
+        # rounded so that float error doesn't push the rank up, e.g., 99.9% of 10000
+        rank = max(math.ceil(round(percentile / 100 * self.count, 6)), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                value = bucket_midpoint(index) / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def encode(self) -> Dict[str, Any]:
+        """The complete state of the histogram as JSON."""
+        return {
+            "counts": self.counts,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+        }
+
+    @classmethod
+    def decode(cls, d: Dict[str, Any]) -> "Histogram":
+        """A histogram from the JSON produced by :meth:`encode`."""
+        return cls(
+            counts={int(index): count for index, count in d["counts"].items()},
+            count=d["count"],
+            total=d["total"],
+            min=math.inf if d["min"] is None else d["min"],
+            max=d["max"],
+        )
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """The min, mean, percentiles, and max of the recorded values."""
+        result: Dict[str, Optional[float]] = {
+            "min": self.min if self.count else None,
+            "mean": self.mean(),
+        }
+        for p in PERCENTILES:
+            result[f"p{p:g}"] = self.percentile(p)
+        result["max"] = self.max if self.count else None
+        return result
+
+
+@dataclass
+class RequestStats:
+    """Counts and latencies of the requests made for one scenario or collection.
+
+    Latencies are those of successful requests only; failures are counted in
+    ``errors``. ``bytes`` is the size of the decoded response bodies, and
+    ``wire_bytes``, if measured, their size as sent.
+    """
+
+    latency: Histogram = field(default_factory=Histogram)
+    ttfb: Histogram = field(default_factory=Histogram)
+    errors: int = 0
+    items: int = 0
+    bytes: int = 0
+    pages: Dict[int, Histogram] = field(default_factory=dict)
+    wire_bytes: Optional[int] = None
+    not_modified: int = 0
+
+    @property
+    def count(self) -> int:
+        """The number of requests, including failures."""
+        return self.latency.count + self.errors
+
+    def record(self, result: "RunResult") -> None:
+        """Record the result of a request."""
+        match result:
+            case Success(value):
+                self.latency.record(value.duration)
+                if value.ttfb is not None:
+                    self.ttfb.record(value.ttfb)
+                self.items += value.count
+                self.bytes += value.bytes
+                if value.wire_bytes is not None:
+                    self.wire_bytes = (self.wire_bytes or 0) + value.wire_bytes
+                self.not_modified += value.not_modified
+                for index, page in enumerate(value.pages, start=1):
+                    self.pages.setdefault(index, Histogram()).record(page.latency)
+            case Failure(_):
+                self.errors += 1
+
+    def merge(self, other: "RequestStats") -> None:
+        """Add the requests recorded by another instance."""
+        self.latency.merge(other.latency)
+        self.ttfb.merge(other.ttfb)
+        self.errors += other.errors
+        self.items += other.items
+        self.bytes += other.bytes
+        for index, histogram in other.pages.items():
+            self.pages.setdefault(index, Histogram()).merge(histogram)
+        if other.wire_bytes is not None:
+            self.wire_bytes = (self.wire_bytes or 0) + other.wire_bytes
+        self.not_modified += other.not_modified
+
+    def encode(self) -> Dict[str, Any]:
+        """The complete state of the statistics as JSON, to be merged elsewhere."""
+        return {
+            "latency": self.latency.encode(),
+            "ttfb": self.ttfb.encode(),
+            "errors": self.errors,
+            "items": self.items,
+            "bytes": self.bytes,
+            "pages": {index: h.encode() for index, h in self.pages.items()},
+            "wire_bytes": self.wire_bytes,
+            "not_modified": self.not_modified,
+        }
+
+    @classmethod
+    def _decode_fields(cls, d: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "latency": Histogram.decode(d["latency"]),
+            "ttfb": Histogram.decode(d["ttfb"]),
+            "errors": d["errors"],
+            "items": d["items"],
+            "bytes": d["bytes"],
+            "pages": {int(i): Histogram.decode(h) for i, h in d["pages"].items()},
+            "wire_bytes": d["wire_bytes"],
+            "not_modified": d["not_modified"],
+        }
+
+    @classmethod
+    def decode(cls, d: Dict[str, Any]) -> "RequestStats":
+        """Statistics from the JSON produced by :meth:`encode`."""
+        return cls(**cls._decode_fields(d))
+
+    def to_dict(self, duration: Optional[float] = None) -> Dict[str, Any]:
+        """A JSON-serializable summary, with throughput if a duration is given."""
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "errors": self.errors,
+            "items": self.items,
+            "bytes": self.bytes,
+        }
+        # only the requests of the transfer scenario measure their bodies on the
+        # wire, and only they can be conditional
+        if self.wire_bytes is not None:
+            result["wire_bytes"] = self.wire_bytes
+            result["not_modified"] = self.not_modified
+            result["not_modified_rate"] = self.not_modified / self.count
+        if duration:
+            result["requests_per_second"] = self.count / duration
+            result["items_per_second"] = self.items / duration
+        result["latency"] = self.latency.summary()
+        result["ttfb"] = self.ttfb.summary()
+        # the count for each page index is the number of searches that paginated
+        # at least that deep
+        result["pages"] = {
+            str(index): {"count": histogram.count, "latency": histogram.summary()}
+            for index, histogram in sorted(self.pages.items())
+        }
+        return result
+
+
+@dataclass
+class ScenarioStats(RequestStats):
+    """Statistics for a scenario, in total, for each collection, and for each group.
+
+    Groups are arbitrary labels that a scenario gives its requests, e.g., the
+    simplification level of the query geometry. A request may be in several
+    groups, or in none.
+    """
+
+    duration: float = 0.0
+    collections: Dict[str, RequestStats] = field(default_factory=dict)
+    schedule_lag: Histogram = field(default_factory=Histogram)
+    behind_schedule: int = 0
+    groups: Dict[str, RequestStats] = field(default_factory=dict)
+    # the load on the client while the scenario ran, see monitor.ClientLoad
+    client: Dict[str, Any] = field(default_factory=dict)
+    # the requests that started during the warmup, which aren't measured
+    warmup: RequestStats = field(default_factory=RequestStats)
+    warmup_duration: float = 0.0
+
+    def record_for(
+        self,
+        collection: str,
+        result: "RunResult",
+        groups: Iterable[str] = (),
+        request_id: str = "",
+    ) -> None:
+        """Record the result of a request against a collection, in some groups.
+
+        If the classifier of the current context finds that the request was part
+        of the warmup, it's only recorded in the warmup statistics. Otherwise, it's
+        also passed to the recorder of the current context, if any.
+        """
+        classify = measuring.get()
+        if classify is not None and not classify(result):
+            self.warmup.record(result)
+            return
+        sink = recorder.get()
+        if sink is not None:
+            sink(request_id, collection, result)
+        self.record(result)
+        self.collections.setdefault(collection, RequestStats()).record(result)
+        for group in groups:
+            self.groups.setdefault(group, RequestStats()).record(result)
+
+    def merge(self, other: "RequestStats") -> None:
+        """Add the requests recorded by another instance."""
+        super().merge(other)
+        if isinstance(other, ScenarioStats):
+            for collection, stats in other.collections.items():
+                self.collections.setdefault(collection, RequestStats()).merge(stats)
+            for group, stats in other.groups.items():
+                self.groups.setdefault(group, RequestStats()).merge(stats)
+            self.schedule_lag.merge(other.schedule_lag)
+            self.behind_schedule += other.behind_schedule
+            self.warmup.merge(other.warmup)
+            self.warmup_duration = max(self.warmup_duration, other.warmup_duration)
+
+    def encode(self) -> Dict[str, Any]:
+        """The complete state of the statistics as JSON, to be merged elsewhere."""
+        return {
+            **super().encode(),
+            "duration": self.duration,
+            "collections": {c: stats.encode() for c, stats in self.collections.items()},
+            "schedule_lag": self.schedule_lag.encode(),
+            "behind_schedule": self.behind_schedule,
+            "groups": {g: stats.encode() for g, stats in self.groups.items()},
+            "client": self.client,
+            "warmup": self.warmup.encode(),
+            "warmup_duration": self.warmup_duration,
+        }
+
+    @classmethod
+    def decode(cls, d: Dict[str, Any]) -> "ScenarioStats":
+        """Statistics from the JSON produced by :meth:`encode`."""
+        return cls(
+            **cls._decode_fields(d),
+            duration=d["duration"],
+            collections={
+                c: RequestStats.decode(stats) for c, stats in d["collections"].items()
+            },
+            schedule_lag=Histogram.decode(d["schedule_lag"]),
+            behind_schedule=d["behind_schedule"],
+            groups={g: RequestStats.decode(stats) for g, stats in d["groups"].items()},
+            client=d.get("client", {}),
+            warmup=RequestStats.decode(d["warmup"])
+            if "warmup" in d
+            else RequestStats(),
+            warmup_duration=d.get("warmup_duration", 0.0),
+        )
+
+    def record_lag(self, lag: float) -> None:
+        """Record how late an open loop request started, unless in the warmup."""
+        classify = measuring.get()
+        if classify is not None and not classify.starts_measured(perf_counter()):
+            return
+        self.schedule_lag.record(lag)
+        if lag > BEHIND_SCHEDULE_TOLERANCE:
+            self.behind_schedule += 1
+
+    def to_dict(self, duration: Optional[float] = None) -> Dict[str, Any]:
+        """A JSON-serializable summary, with throughput if a duration is given."""
+        duration = self.duration if duration is None else duration
+        result = {
+            "duration": duration,
+            **super().to_dict(duration),
+            "collections": {
+                collection: stats.to_dict(duration)
+                for collection, stats in self.collections.items()
+            },
+        }
+        if self.schedule_lag.count:
+            result["schedule"] = {
+                "behind_schedule": self.behind_schedule,
+                "lag": self.schedule_lag.summary(),
+            }
+        if self.groups:
+            result["groups"] = {
+                group: stats.to_dict(duration)
+                for group, stats in sorted(
+                    self.groups.items(), key=lambda item: natural_key(item[0])
+                )
+            }
+        if self.warmup.count or self.warmup_duration:
+            result["warmup"] = {
+                "duration": self.warmup_duration,
+                **self.warmup.to_dict(self.warmup_duration),
+            }
+        if self.client:
+            result["client"] = self.client
+        return result
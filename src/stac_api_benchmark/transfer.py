@@ -0,0 +1,297 @@
+"""What conditional requests and compression save a client.
+
+Items and large search pages are requested with each ``Accept-Encoding``, and
+then requested again, unconditionally, with ``If-None-Match``, and with
+``If-Modified-Since``, using the validators of the first response. Bodies are
+read as sent, so that their size on the wire can be compared against their
+decoded size, and are decoded by the client as part of each request's latency.
+"""
+import asyncio
+import json
+import zlib
+from asyncio import Semaphore
+from asyncio import TimeoutError
+from asyncio import wait_for
+from dataclasses import dataclass
+from importlib.util import find_spec
+from time import perf_counter
+from typing import Any
+from typing import Awaitable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import aiohttp
+from returns.result import Failure
+from returns.result import Success
+
+from . import items
+from . import monitor
+from . import query
+from .api import ApiContext
+from .query import APIError
+from .stats import ScenarioStats
+
+ENCODINGS = ("identity", "gzip", "br")
+
+# the validator header sent for each condition, and the response header it echoes
+CONDITIONS: Dict[str, Optional[Tuple[str, str]]] = {
+    "none": None,
+    "etag": ("If-None-Match", "ETag"),
+    "modified": ("If-Modified-Since", "Last-Modified"),
+}
+
+
+@dataclass
+class Target:
+    """An item, or the first page of a search, to request repeatedly."""
+
+    kind: str
+    collection: str
+    method: str
+    href: str
+    body: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class Validators:
+    """The validators of a response, if it had any."""
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def header(self, condition: str) -> Optional[Dict[str, str]]:
+        """The header of a conditional request, if there's a validator for it."""
+        headers = CONDITIONS[condition]
+        if headers is None:
+            return {}
+        request_header, response_header = headers
+        value = self.etag if response_header == "ETag" else self.last_modified
+        return None if value is None else {request_header: value}
+
+
+def decode(content: bytes, encoding: str) -> bytes:
+    """Decode a response body by its ``Content-Encoding``.
+
+    Raises:
+        APIError: if the encoding isn't supported
+    """
+    if encoding in ("", "identity"):
+        return content
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompress(content)
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError as e:
+            raise APIError("decoding br requires brotli") from e
+        return bytes(brotli.decompress(content))
+    raise APIError(f"unsupported Content-Encoding {encoding!r}")
+
+
+async def fetch(
+    session: aiohttp.ClientSession,
+    target: Target,
+    headers: Dict[str, str],
+) -> Tuple[query.RunSuccess, Validators]:
+    """Request a target, reading the body as sent and then decoding it.
+
+    The session must not decompress bodies itself.
+
+    Raises:
+        APIError: if the response is neither a 200 nor a 304
+    """
+    if target.method == "POST":
+        request_args: Dict[str, Any] = {"json": target.body}
+    else:
+        request_args = {
+            "params": query.search_params(target.body) if target.body else None
+        }
+    t_start = perf_counter()
+    with monitor.in_flight(session).request():
+        async with session.request(
+            target.method, target.href, headers=headers, **request_args
+        ) as response:
+            ttfb = perf_counter() - t_start
+            content = await response.read()
+            if response.status not in (200, 304):
+                raise APIError(f"{response.status}: {target.href}", response.status)
+            encoding = response.headers.get("Content-Encoding", "identity").lower()
+            validators = Validators(
+                response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+    decoded = decode(content, encoding)
+    count = 0
+    if response.status == 200:
+        count = (
+            len(json.loads(decoded).get("features", []))
+            if target.kind == "search"
+            else 1
+        )
+    return (
+        query.RunSuccess(
+            duration=perf_counter() - t_start,
+            count=count,
+            ttfb=ttfb,
+            bytes=len(decoded),
+            wire_bytes=len(content),
+            not_modified=response.status == 304,
+            status=response.status,
+        ),
+        validators,
+    )
+
+
+async def measure(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    target: Target,
+    headers: Dict[str, str],
+) -> Tuple[query.RunResult, Optional[Validators]]:
+    """Request a target, and the validators of the response if it succeeded."""
+    t_start = perf_counter()
+    status: Optional[int] = None
+    try:
+        success, validators = await wait_for(
+            fetch(session, target, headers), timeout=config.timeout
+        )
+        return Success(success), validators
+    except APIError as e:
+        msg = f"{target.href}: APIError: {e}"
+        status = e.status
+    except TimeoutError as e:
+        msg = f"{target.href}: TimeoutError ({config.timeout}s): {e}"
+    except Exception as e:
+        msg = f"{target.href}: Exception: {e}"
+    config.logger.error(msg)
+    return Failure(query.RunFailure(perf_counter() - t_start, msg, status)), None
+
+
+async def targets(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    collection: str,
+    pool: int,
+    limit: int,
+) -> List[Target]:
+    """A pool of items of a collection, and the first page of a search of it."""
+    hrefs = await items.load_pool(config, session, context, collection, pool)
+    return [Target("item", collection, "GET", href) for href in hrefs] + [
+        Target(
+            "search",
+            collection,
+            context.search_method,
+            context.search_href,
+            query.search_body(collection=collection, limit=limit),
+        )
+    ]
+
+
+def decodable(
+    config: query.BenchmarkConfig, encodings: Tuple[str, ...]
+) -> Tuple[str, ...]:
+    """The encodings the client can decode, warning of any skipped.
+
+    Decoding ``br`` requires brotli, which is installed with aiohttp's
+    ``speedups`` extra.
+    """
+    if "br" in encodings and find_spec("brotli") is None:
+        config.logger.warning(
+            "Skipping the br encoding, which requires brotli, e.g., pip install"
+            " brotli"
+        )
+        return tuple(encoding for encoding in encodings if encoding != "br")
+    return encodings
+
+
+async def run_transfer(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    pool: int = 10,
+    limit: int = 500,
+    repeats: int = 10,
+    encodings: Tuple[str, ...] = ENCODINGS,
+) -> ScenarioStats:
+    """Request each target with each encoding, and then conditionally.
+
+    The targets are a ``pool`` of items of each collection, and a search of
+    each collection for a page of ``limit`` items. Each target is first
+    requested with each encoding to get its validators, and then ``repeats``
+    times with each condition, with at most ``config.concurrency`` requests in
+    flight. Results are grouped under
+    ``encoding:<encoding>``, ``condition:<condition>``, and
+    ``<kind>:<encoding>:<condition>``, where the kind is item or search.
+    Conditions the API has no validators for, and encodings the client can't
+    decode, are skipped, with a warning.
+
+    The targets are found with ``session``, and requested with a session of
+    their own that doesn't decompress bodies.
+    """
+    encodings = decodable(config, encodings)
+    stats = ScenarioStats()
+    sem = Semaphore(config.concurrency)
+    missing: Set[Tuple[str, str]] = set()
+
+    async def request(
+        session: aiohttp.ClientSession,
+        target: Target,
+        encoding: str,
+        condition: str,
+        headers: Dict[str, str],
+    ) -> Optional[Validators]:
+        groups = (
+            f"encoding:{encoding}",
+            f"condition:{condition}",
+            f"{target.kind}:{encoding}:{condition}",
+        )
+        async with sem:
+            result, validators = await measure(
+                config, session, target, {"Accept-Encoding": encoding, **headers}
+            )
+        stats.record_for(target.collection, result, groups, target.href)
+        return validators
+
+    async def run_target(
+        session: aiohttp.ClientSession, target: Target, encoding: str
+    ) -> None:
+        validators = await request(session, target, encoding, "first", {})
+        if validators is None:
+            return
+        cos: List[Awaitable[Optional[Validators]]] = []
+        for condition in CONDITIONS:
+            headers = validators.header(condition)
+            if headers is None:
+                missing.add((target.kind, condition))
+                continue
+            cos.extend(
+                request(session, target, encoding, condition, headers)
+                for _ in range(repeats)
+            )
+        await asyncio.gather(*cos)
+
+    requested = [
+        target
+        for collection in config.collections
+        for target in await targets(config, session, context, collection, pool, limit)
+    ]
+    t_start = perf_counter()
+    async with query.create_session(config, auto_decompress=False) as raw_session:
+        await asyncio.gather(
+            *(
+                run_target(raw_session, target, encoding)
+                for target in requested
+                for encoding in encodings
+            )
+        )
+    stats.duration = perf_counter() - t_start
+    for kind, condition in sorted(missing):
+        config.logger.warning(
+            f"Some {kind} responses had no validator for {condition} requests"
+        )
+    return stats
@@ -0,0 +1,208 @@
+"""A warmup for each scenario, optionally until it reaches a steady state.
+
+Cold caches, connection setup, and autoscaling make the first requests of a
+scenario slower than the rest, and so make short runs vary from run to run. The
+requests that start during the warmup are recorded separately, and only those
+that start after it are measured and stored.
+
+The warmup lasts for at least a number of requests and a duration. With a
+steady state window, it then lasts until the throughput and median latency of
+the last few windows are within a tolerance of each other, or until the
+maximum warmup has passed.
+"""
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+from statistics import median
+from time import perf_counter
+from typing import Awaitable
+from typing import Deque
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from returns.result import Failure
+from returns.result import Success
+
+from .query import BenchmarkConfig
+from .query import RunResult
+from .stats import measuring
+from .stats import ScenarioStats
+
+# the number of consecutive windows that must agree for a steady state
+STEADY_WINDOWS = 3
+
+
+@dataclass
+class Window:
+    """The requests that completed in a window of time."""
+
+    count: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+    def summary(self, seconds: float) -> Tuple[float, Optional[float]]:
+        """The throughput and median latency of the successful requests."""
+        return self.count / seconds, median(self.latencies) if self.latencies else None
+
+
+def spread(values: Sequence[float]) -> float:
+    """The range of some values, relative to their mean."""
+    mean = sum(values) / len(values)
+    return (max(values) - min(values)) / mean if mean else 0.0
+
+
+def enabled(config: BenchmarkConfig, requests: Optional[int] = None) -> bool:
+    """Whether a scenario of a config, of a number of requests if known, has a warmup.
+
+    A scenario of no more requests than the warmup requests plus its
+    concurrency has none, as all of its requests would start before the warmup
+    could end, e.g., one sorted search of each collection.
+    """
+    if requests is not None and requests <= config.warmup_requests + config.concurrency:
+        return False
+    return bool(
+        config.warmup_requests
+        or config.warmup_duration
+        or config.steady_state_window is not None
+    )
+
+
+class Warmup:
+    """Tells the requests of the warmup of a scenario from those measured after it.
+
+    Each request is classified when it completes, by when it started: those that
+    started before the warmup ended are part of it. The warmup is timed from the
+    start of the first request.
+    """
+
+    def __init__(self, config: BenchmarkConfig) -> None:
+        """Start a warmup that hasn't seen any requests."""
+        self.config = config
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+        self.completed = 0
+        self.reason = ""
+        self.window = Window()
+        self.window_index = 0
+        self.recent: Deque[Tuple[float, Optional[float]]] = deque(maxlen=STEADY_WINDOWS)
+
+    def __call__(self, result: RunResult) -> bool:
+        """Whether the request of a result is measured, ending the warmup if due."""
+        now = perf_counter()
+        duration: float
+        match result:
+            case Success(value):
+                duration = value.duration
+            case Failure(value):
+                duration = value.duration
+        started = now - duration
+        if self.end is not None:
+            return started >= self.end
+        if self.start is None:
+            self.start = started
+        self.completed += 1
+        self.observe(now, duration, isinstance(result, Success))
+        if self.due(now - self.start):
+            self.end = now
+        return False
+
+    def starts_measured(self, start: float) -> bool:
+        """Whether a request starting at ``start`` will be measured."""
+        return self.end is not None and start >= self.end
+
+    def observe(self, now: float, duration: float, ok: bool) -> None:
+        """Add a request to the steady state window it completed in."""
+        seconds = self.config.steady_state_window
+        if seconds is None or self.start is None:
+            return
+        index = int((now - self.start) / seconds)
+        while self.window_index < index:
+            self.recent.append(self.window.summary(seconds))
+            self.window = Window()
+            self.window_index += 1
+        self.window.count += 1
+        if ok:
+            self.window.latencies.append(duration)
+
+    def steady(self) -> bool:
+        """Whether the throughput and median latency of the last windows agree."""
+        if len(self.recent) < STEADY_WINDOWS:
+            return False
+        throughputs = [throughput for throughput, _ in self.recent]
+        p50s = [p50 for _, p50 in self.recent if p50 is not None]
+        tolerance = self.config.steady_state_tolerance
+        return (
+            len(p50s) == STEADY_WINDOWS
+            and spread(throughputs) <= tolerance
+            and spread(p50s) <= tolerance
+        )
+
+    def due(self, elapsed: float) -> bool:
+        """Whether the warmup should end, setting the reason it did."""
+        if (
+            self.completed < self.config.warmup_requests
+            or elapsed < self.config.warmup_duration
+        ):
+            return False
+        if self.config.steady_state_window is None:
+            self.reason = "warmed up"
+        elif self.steady():
+            self.reason = "reached a steady state"
+        elif elapsed >= self.config.max_warmup:
+            self.reason = "didn't reach a steady state before the maximum warmup"
+        else:
+            return False
+        return True
+
+    def finish(self, name: str, stats: ScenarioStats) -> None:
+        """Time the warmup and the measured requests of a scenario that's done.
+
+        The statistics are left as they are if no requests were recorded here,
+        e.g., because they ran in worker processes that had warmups of their own.
+        """
+        if self.start is None:
+            return
+        logger = self.config.logger
+        now = perf_counter()
+        if self.end is None:
+            logger.warning(
+                f"{name} ended during its warmup, after {self.completed} requests,"
+                " so none were measured"
+            )
+            stats.warmup_duration = now - self.start
+            stats.duration = 0.0
+            return
+        stats.warmup_duration = self.end - self.start
+        stats.duration = now - self.end
+        message = (
+            f"{name} {self.reason} after {self.completed} requests and"
+            f" {stats.warmup_duration:.1f}s"
+        )
+        if self.reason.startswith("didn't"):
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+
+async def warmed_up(
+    config: BenchmarkConfig,
+    name: str,
+    co: Awaitable[ScenarioStats],
+    requests: Optional[int] = None,
+) -> ScenarioStats:
+    """Await a scenario, measuring only the requests after its warmup, if any.
+
+    ``requests`` is the number of requests the scenario makes, if known, and
+    ``config`` has its concurrency.
+    """
+    if not enabled(config, requests):
+        return await co
+    warmup = Warmup(config)
+    token = measuring.set(warmup)
+    try:
+        stats = await co
+    finally:
+        measuring.reset(token)
+    warmup.finish(name, stats)
+    return stats
@@ -0,0 +1,138 @@
+"""Splitting the queries of a scenario across multiple worker processes."""
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from itertools import islice
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+
+import click_log
+
+from . import query
+from .api import ApiContext
+from .stats import ScenarioStats
+from .warmup import warmed_up
+
+QueryGenerator = Callable[[query.BenchmarkConfig], Iterable[query.SearchQuery]]
+
+GENERATORS: Dict[str, Callable[..., Iterable[query.SearchQuery]]] = {
+    "complexity": query.complexity_queries,
+    "fc": query.fc_queries,
+    "random": query.random_queries,
+    "sorted": query.sorted_queries,
+}
+
+
+@dataclass(frozen=True)
+class QuerySource:
+    """A query generator, by name, and its keyword arguments.
+
+    Unlike a function, this can be sent to a worker process or an agent as JSON.
+    """
+
+    generator: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def __call__(self, config: query.BenchmarkConfig) -> Iterable[query.SearchQuery]:
+        """Generate the queries for a config."""
+        return GENERATORS[self.generator](config, **self.params)
+
+
+def limited_queries(
+    config: query.BenchmarkConfig, source: Dict[str, Any], count: int
+) -> Iterator[query.SearchQuery]:
+    """The first ``count`` queries of another source, given as JSON."""
+    return islice(QuerySource(**source)(config), count)
+
+
+GENERATORS["limited"] = limited_queries
+
+
+def shard(
+    queries: Iterable[query.SearchQuery], index: int, count: int
+) -> Iterator[query.SearchQuery]:
+    """Every ``count``-th query, starting from ``index``."""
+    return islice(queries, index, None, count)
+
+
+def shard_config(config: query.BenchmarkConfig, index: int) -> query.BenchmarkConfig:
+    """The config for one of ``config.workers`` workers.
+
+    The concurrency, rate, and warmup requests are divided between the workers,
+    so that in total they are the same as for a single process.
+    """
+    concurrency, remainder = divmod(config.concurrency, config.workers)
+    return replace(
+        config,
+        concurrency=max(concurrency + (1 if index < remainder else 0), 1),
+        rate=config.rate / config.workers if config.rate else None,
+        worker_index=index,
+        warmup_requests=-(-config.warmup_requests // config.workers),
+    )
+
+
+def run_shard(
+    config: query.BenchmarkConfig,
+    context: ApiContext,
+    generator: QueryGenerator,
+    log_level: int,
+) -> ScenarioStats:
+    """Run one worker's shard of the queries, in a worker process."""
+    if not config.logger.handlers:
+        click_log.basic_config(config.logger)
+    config.logger.setLevel(log_level)
+    return asyncio.run(_run_shard(config, context, generator))
+
+
+async def _run_shard(
+    config: query.BenchmarkConfig,
+    context: ApiContext,
+    generator: QueryGenerator,
+) -> ScenarioStats:
+    queries = shard(generator(config), config.worker_index, config.workers)
+    async with query.create_session(config) as session:
+        return await warmed_up(
+            config,
+            f"shard {config.worker_index + 1}",
+            query.run_queries(config, session, context, queries),
+        )
+
+
+async def run_sharded(
+    config: query.BenchmarkConfig,
+    context: ApiContext,
+    generator: QueryGenerator,
+    executor: Executor,
+) -> ScenarioStats:
+    """Run the queries across ``config.workers`` processes and merge the results.
+
+    Every worker generates the same queries from the seed, and runs only its own
+    shard of them. The duration is that of the slowest worker, which excludes the
+    time taken to start the worker processes.
+    """
+    loop = asyncio.get_running_loop()
+    log_level = config.logger.getEffectiveLevel()
+    shards: List[ScenarioStats] = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                executor,
+                run_shard,
+                shard_config(config, index),
+                context,
+                generator,
+                log_level,
+            )
+            for index in range(config.workers)
+        )
+    )
+    stats = ScenarioStats()
+    for shard_stats in shards:
+        stats.merge(shard_stats)
+    stats.duration = max(shard_stats.duration for shard_stats in shards)
+    return stats
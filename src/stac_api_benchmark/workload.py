@@ -0,0 +1,420 @@
+"""Weighted mixes of query types, interleaved in a single stream of requests.
+
+A workload file gives each type of query a weight, e.g., many cheap item
+lookups to a few expensive sorted searches, and the rate or concurrency of the
+mix as a whole. Each request in the stream is drawn from the types by weight,
+so the types contend for the API at the same time, as they do in production.
+"""
+import sys
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from itertools import count
+from itertools import islice
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import aiohttp
+
+from . import query
+from .api import ApiContext
+from .stats import ScenarioStats
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:  # pragma: no cover
+    import tomli as tomllib
+
+YAML_SUFFIXES = (".yaml", ".yml")
+
+# the parameters that each type of query accepts, along with collections
+QUERY_TYPES: Dict[str, tuple[str, ...]] = {
+    "fc": ("fc_filename", "id_field", "datetime", "sortby"),
+    "random": (),
+    "item": ("pool",),
+    "sorted": ("sortby", "datetime", "intersects"),
+    "paged": ("max_items", "sortby", "datetime", "intersects"),
+}
+
+DEFAULT_ITEM_POOL = 100
+DEFAULT_PAGED_MAX_ITEMS = 1000
+
+
+class WorkloadError(Exception):
+    """A workload file is not valid."""
+
+
+@dataclass
+class WorkloadQuery:
+    """A type of query in a workload, and its weight in the mix.
+
+    The name labels the results of the type, and ``params`` are its
+    type-specific parameters, as given in the workload file.
+    """
+
+    name: str
+    type: str
+    weight: float
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Workload:
+    """A weighted mix of query types, and how to run it.
+
+    With a ``rate``, the mix is run open loop at that many requests per second,
+    with at most ``concurrency`` in flight if given. With only a
+    ``concurrency``, it's run closed loop. The mix runs for ``duration``
+    seconds or ``requests`` requests, whichever is first.
+    """
+
+    queries: List[WorkloadQuery]
+    rate: Optional[float] = None
+    concurrency: Optional[int] = None
+    duration: Optional[float] = None
+    requests: Optional[int] = None
+
+
+def read_workload(filename: str) -> Workload:
+    """Read a TOML or YAML workload file.
+
+    Raises:
+        WorkloadError: if the file isn't a valid workload
+        ImportError: if the file is YAML and pyyaml is not installed
+    """
+    try:
+        return parse_workload(load_document(filename))
+    except WorkloadError as e:
+        raise WorkloadError(f"{filename}: {e}") from e
+
+
+def load_document(filename: str) -> Any:
+    """Parse a TOML or YAML file, by its suffix."""
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".toml":
+        try:
+            with open(filename, "rb") as f:
+                document = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise WorkloadError(str(e)) from e
+    elif suffix in YAML_SUFFIXES:
+        try:
+            import yaml
+        except ImportError as e:  # pragma: no cover
+            raise ImportError(
+                "reading YAML workloads requires pyyaml, which is installed with"
+                " the yaml extra, e.g., pip install 'stac-api-benchmark[yaml]'"
+            ) from e
+        try:
+            with open(filename, encoding="utf-8") as f:
+                document = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise WorkloadError(str(e)) from e
+    else:
+        raise WorkloadError("a workload must be a .toml or .yaml file")
+    return document
+
+
+def parse_workload(document: Any) -> Workload:
+    """Parse and check a workload from its TOML or YAML document.
+
+    Raises:
+        WorkloadError: if the document isn't a valid workload
+    """
+    if not isinstance(document, dict):
+        raise WorkloadError("a workload must be a table of settings and queries")
+    unknown = set(document) - {"queries", "rate", "concurrency", "duration", "requests"}
+    if unknown:
+        raise WorkloadError(f"unknown settings {', '.join(sorted(unknown))}")
+
+    rate = document.get("rate")
+    try:
+        rate = None if rate is None else query.parse_rate(str(rate))
+    except ValueError as e:
+        raise WorkloadError(str(e)) from e
+    concurrency = positive(document, "concurrency", int)
+    duration = positive(document, "duration", float)
+    requests = positive(document, "requests", int)
+    if duration is None and requests is None:
+        raise WorkloadError("a workload needs a duration or a number of requests")
+
+    queries = document.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise WorkloadError("a workload needs a list of queries")
+    parsed = [parse_query(q) for q in queries]
+    names = [q.name for q in parsed]
+    if len(set(names)) < len(names):
+        raise WorkloadError("each query needs a different name")
+    return Workload(parsed, rate, concurrency, duration, requests)
+
+
+def parse_query(document: Any) -> WorkloadQuery:
+    """Parse and check one type of query in a workload."""
+    if not isinstance(document, dict):
+        raise WorkloadError("each query must be a table with a type")
+    params = dict(document)
+    query_type = params.pop("type", None)
+    if query_type not in QUERY_TYPES:
+        raise WorkloadError(
+            f"query type {query_type!r} is not one of {', '.join(QUERY_TYPES)}"
+        )
+    name = str(params.pop("name", query_type))
+    weight = positive(params, "weight", float)
+    params.pop("weight", None)
+    unknown = set(params) - {*QUERY_TYPES[query_type], "collections"}
+    if unknown:
+        raise WorkloadError(
+            f"unknown {query_type} query parameters {', '.join(sorted(unknown))}"
+        )
+    if query_type == "fc" and "fc_filename" not in params:
+        raise WorkloadError(f"the fc query {name} needs an fc_filename")
+    if query_type == "sorted" and not params.get("sortby"):
+        raise WorkloadError(f"the sorted query {name} needs a sortby")
+    if not isinstance(params.get("intersects", True), bool):
+        raise WorkloadError(f"intersects of the query {name} must be true or false")
+    if "sortby" in params:
+        params["sortby"] = [
+            query.parse_sort_key(key) if isinstance(key, str) else key
+            for key in params["sortby"]
+        ]
+    return WorkloadQuery(name, query_type, 1.0 if weight is None else weight, params)
+
+
+def positive(document: Dict[str, Any], key: str, kind: Callable[[Any], Any]) -> Any:
+    """The positive number under a key, if any."""
+    if document.get(key) is None:
+        return None
+    try:
+        value = kind(document[key])
+    except (TypeError, ValueError):
+        raise WorkloadError(f"{key} must be a number") from None
+    if value <= 0:
+        raise WorkloadError(f"{key} must be positive")
+    return value
+
+
+def required_conformance(
+    config: query.BenchmarkConfig, workload: Workload
+) -> List[str]:
+    """The conformance classes required by the queries of a workload."""
+    required = ["item-search"]
+    if any(q.params.get("sortby") for q in workload.queries):
+        required.append("sort")
+    if config.queryables and any(q.type == "random" for q in workload.queries):
+        required.append("filter")
+    return required
+
+
+def repeated(
+    name: str, generate: Callable[[int], Iterable[query.Request]]
+) -> Iterator[query.Request]:
+    """Generate requests forever, from a generator called with each round number.
+
+    Raises:
+        WorkloadError: if a round generates no requests
+    """
+    for round_number in count():
+        empty = True
+        for request in generate(round_number):
+            empty = False
+            yield request
+        if empty:
+            raise WorkloadError(f"the query {name} generates no requests")
+
+
+def query_requests(
+    config: query.BenchmarkConfig,
+    workload_query: WorkloadQuery,
+    hrefs: Dict[str, List[str]],
+) -> Iterator[query.Request]:
+    """Lazily generate the requests of one type of query, forever.
+
+    Feature collection, random, sorted, and paged queries are generated again,
+    from the next seed, each time they run out.
+
+    Raises:
+        WorkloadError: if an item query has no items to request
+    """
+    name, params = workload_query.name, workload_query.params
+    group = f"type:{name}"
+    config = replace(
+        config, collections=tuple(params.get("collections", config.collections))
+    )
+
+    def labelled(requests: Iterable[query.SearchQuery]) -> Iterator[query.Request]:
+        for request in requests:
+            yield replace(
+                request,
+                search_id=f"{name}:{request.search_id}",
+                groups=(*request.groups, group),
+            )
+
+    if workload_query.type == "fc":
+        return repeated(
+            name,
+            lambda n: labelled(
+                query.fc_queries(
+                    replace(config, seed=config.seed + n),
+                    params["fc_filename"],
+                    params.get("id_field", "id"),
+                    params.get("datetime"),
+                    params.get("sortby"),
+                )
+            ),
+        )
+    if workload_query.type == "random":
+        return repeated(
+            name,
+            lambda n: labelled(
+                query.random_queries(replace(config, seed=config.seed + n))
+            ),
+        )
+    if workload_query.type == "item":
+        return item_requests(config, name, hrefs)
+
+    return repeated(
+        name,
+        lambda n: labelled(
+            search_requests(replace(config, seed=config.seed + n), workload_query)
+        ),
+    )
+
+
+def search_requests(
+    config: query.BenchmarkConfig, workload_query: WorkloadQuery
+) -> Iterator[query.SearchQuery]:
+    """Sorted or paged searches, ``config.num_random`` for each collection.
+
+    Unless ``intersects`` is false, each search intersects a random polygon
+    from the same generator as the random queries, so that the searches don't
+    all hit the same cached response.
+    """
+    params = workload_query.params
+    max_items = (
+        params.get("max_items", DEFAULT_PAGED_MAX_ITEMS)
+        if workload_query.type == "paged"
+        else None
+    )
+    geometries = (
+        query.random_geometries(config) if params.get("intersects", True) else None
+    )
+    for i in range(config.num_random):
+        for collection in config.collections:
+            yield query.SearchQuery(
+                search_id=str(i),
+                collection=collection,
+                intersects=None if geometries is None else next(geometries),
+                sortby=params.get("sortby"),
+                datetime=params.get("datetime"),
+                max_items=max_items,
+            )
+
+
+def item_requests(
+    config: query.BenchmarkConfig, name: str, hrefs: Dict[str, List[str]]
+) -> Iterator[query.Request]:
+    """Requests for items chosen uniformly at random from a pool, forever.
+
+    Raises:
+        WorkloadError: if the pool is empty
+    """
+    pool = [
+        (collection, href)
+        for collection in config.collections
+        for href in hrefs.get(collection, [])
+    ]
+    if not pool:
+        raise WorkloadError(f"the query {name} has no items to request")
+
+    def draw() -> Iterator[query.Request]:
+        rng = Random(f"{config.seed}:{name}")
+        for i in count():
+            collection, href = rng.choice(pool)
+            yield query.ItemRequest(f"{name}:{i}", collection, href, (f"type:{name}",))
+
+    return draw()
+
+
+def mixed_requests(
+    config: query.BenchmarkConfig,
+    workload: Workload,
+    hrefs: Dict[str, Dict[str, List[str]]],
+) -> Iterator[query.Request]:
+    """Lazily interleave the requests of each type of query, drawn by weight.
+
+    The streams of each type are set up before the first request is drawn.
+
+    Raises:
+        WorkloadError: if an item query has no items to request
+    """
+    streams = [
+        query_requests(config, q, hrefs.get(q.name, {})) for q in workload.queries
+    ]
+    weights = [q.weight for q in workload.queries]
+
+    def draw() -> Iterator[query.Request]:
+        rng = Random(config.seed)
+        while True:
+            (stream,) = rng.choices(streams, weights)
+            yield next(stream)
+
+    return draw()
+
+
+async def run_workload(
+    config: query.BenchmarkConfig,
+    session: aiohttp.ClientSession,
+    context: ApiContext,
+    workload: Workload,
+) -> ScenarioStats:
+    """Run a workload, grouping its results by type of query (``type:<name>``).
+
+    The rate and concurrency of the workload take precedence over those of the
+    config. The pool of items for each item query is found before the run.
+
+    Raises:
+        WorkloadError: if an item query has no items to request
+    """
+    hrefs: Dict[str, Dict[str, List[str]]] = {}
+    for q in workload.queries:
+        if q.type == "item":
+            hrefs[q.name] = {
+                collection: await query.item_hrefs(
+                    session,
+                    context,
+                    collection,
+                    q.params.get("pool", DEFAULT_ITEM_POOL),
+                )
+                for collection in q.params.get("collections", config.collections)
+            }
+
+    config = replace(
+        config,
+        rate=workload.rate if workload.rate or workload.concurrency else config.rate,
+        concurrency=workload.concurrency or config.concurrency,
+    )
+    requests: Iterator[query.Request] = mixed_requests(config, workload, hrefs)
+    if workload.requests is not None:
+        requests = islice(requests, workload.requests)
+
+    stats = ScenarioStats()
+    t_start = perf_counter()
+    deadline = None if workload.duration is None else t_start + workload.duration
+    if config.rate:
+        await query.run_open_loop(
+            config, session, context, requests, stats, config.rate, deadline
+        )
+    else:
+        await query.run_closed_loop(
+            config, session, context, requests, stats, config.concurrency, deadline
+        )
+    stats.duration = perf_counter() - t_start
+    return stats
@@ -0,0 +1,47 @@
+"""Fixtures shared by the test cases."""
+import logging
+import socket
+from typing import Any
+from typing import Callable
+
+import pytest
+
+from stac_api_benchmark import query
+
+
+@pytest.fixture
+def make_config() -> Callable[..., query.BenchmarkConfig]:
+    """Make a benchmark config of small defaults, overridden by keyword."""
+
+    def make(**kwargs: Any) -> query.BenchmarkConfig:
+        return query.BenchmarkConfig(
+            **{
+                "url": "http://example.com",
+                "collections": ("c1",),
+                "concurrency": 10,
+                "seed": 0,
+                "queryables": (),
+                "num_features": None,
+                "num_random": 10,
+                "max_items": 10,
+                "limit": 10,
+                "logger": logging.getLogger(__name__),
+                "timeout": 10,
+                **kwargs,
+            }
+        )
+
+    return make
+
+
+@pytest.fixture
+def free_port() -> Callable[[], int]:
+    """Find a free port on localhost."""
+
+    def find() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port: int = s.getsockname()[1]
+            return port
+
+    return find
@@ -0,0 +1,51 @@
+"""Test cases for the api module."""
+import pytest
+
+from stac_api_benchmark import api
+
+
+def context(conformance: list[str]) -> api.ApiContext:
+    return api.ApiContext(
+        url="http://example.com",
+        landing_page={},
+        conformance=frozenset(conformance),
+        search_href="http://example.com/search",
+        search_method="POST",
+    )
+
+
+def test_require_matches_any_version() -> None:
+    """It accepts conformance classes from any version of the specification."""
+    ctx = context(
+        [
+            "https://api.stacspec.org/v1.0.0/item-search",
+            "https://api.stacspec.org/v1.0.0-rc.2/item-search#sort",
+            "http://www.opengis.net/spec/ogcapi-features-3/1.0/conf/filter",
+        ]
+    )
+    ctx.require(["item-search", "sort", "filter"])
+
+
+def test_require_fails_on_missing_class() -> None:
+    """It names the missing conformance classes."""
+    ctx = context(["https://api.stacspec.org/v1.0.0/item-search"])
+    with pytest.raises(api.ConformanceError, match="filter, sort"):
+        ctx.require(["item-search", "sort", "filter"])
+
+
+def test_search_link_prefers_post() -> None:
+    """It uses the POST search link when the API advertises one."""
+    landing_page = {
+        "links": [
+            {"rel": "search", "href": "http://example.com/s", "method": "GET"},
+            {"rel": "search", "href": "http://example.com/s", "method": "POST"},
+        ]
+    }
+    assert api.search_link(landing_page, "http://example.com") == (
+        "http://example.com/s",
+        "POST",
+    )
+    assert api.search_link({"links": []}, "http://example.com") == (
+        "http://example.com/search",
+        "POST",
+    )
@@ -0,0 +1,92 @@
+"""Test cases for the compare module."""
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from returns.result import Failure
+from returns.result import Success
+
+from stac_api_benchmark import __main__
+from stac_api_benchmark import compare
+from stac_api_benchmark import query
+from stac_api_benchmark import results
+from stac_api_benchmark.query import RunFailure
+from stac_api_benchmark.query import RunSuccess
+from stac_api_benchmark.stats import ScenarioStats
+
+
+def test_mann_whitney_p() -> None:
+    """It finds a shift in latencies significant, and identical ones not."""
+    rng = np.random.default_rng(0)
+    baseline = rng.exponential(0.1, 500)
+    assert compare.mann_whitney_p(baseline, baseline * 1.5) == pytest.approx(
+        0, abs=1e-6
+    )
+    assert compare.mann_whitney_p(baseline, baseline.copy()) == pytest.approx(
+        0.5, abs=0.01
+    )
+    assert compare.mann_whitney_p(baseline * 1.5, baseline) == pytest.approx(
+        1, abs=1e-6
+    )
+    assert compare.mann_whitney_p(baseline, np.array([])) is None
+
+
+def test_compare_scenario_without_requests_is_inconclusive() -> None:
+    """It doesn't call a slower percentile a regression without a p-value."""
+    baseline, current = ScenarioStats(), ScenarioStats()
+    baseline.record(Success(RunSuccess(0.1, 1)))
+    current.record(Success(RunSuccess(0.2, 1)))
+    comparison = compare.compare_scenario("s", baseline, current, None, ("max",))
+    assert comparison.regressions == []
+    assert comparison.inconclusive == ["max +100.0%"]
+    significant = compare.compare_scenario("s", baseline, current, 0.0, ("max",))
+    assert significant.regressions == ["max +100.0%"]
+
+
+def store_run(
+    store: results.ResultsStore,
+    config: query.BenchmarkConfig,
+    latencies: list[float],
+    errors: int = 0,
+) -> None:
+    store.start_run(config)
+    stats = ScenarioStats()
+    with store.recording("random_queries"):
+        for i, latency in enumerate(latencies):
+            stats.record_for("c1", Success(RunSuccess(latency, 1)), (), f"q-{i}")
+        for _ in range(errors):
+            stats.record_for("c1", Failure(RunFailure(1.0, "500")))
+    store.save("random_queries", stats)
+
+
+def test_compare_exits_on_regression(
+    tmp_path: Path, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It exits with 1 when a run is significantly slower, or fails more often."""
+    filename = str(tmp_path / "results.db")
+    store = results.ResultsStore(filename)
+    rng = np.random.default_rng(0)
+    latencies = (0.1 + rng.exponential(0.05, 200)).tolist()
+    config = make_config()
+    store_run(store, config, latencies)
+    store_run(store, config, [latency * 1.02 for latency in latencies])
+    store_run(store, config, [latency * 1.5 for latency in latencies])
+    store_run(store, config, latencies, errors=10)
+    store.close()
+
+    runner = CliRunner()
+    same = runner.invoke(__main__.main, ["compare", filename, "--run", "2"])
+    assert same.exit_code == 0, same.output
+    assert "random_queries: p50" in same.output and same.output.endswith(": ok\n")
+
+    slower = runner.invoke(
+        __main__.main, ["compare", filename, "--run", "3", "--baseline", "1"]
+    )
+    assert slower.exit_code == 1
+    assert "REGRESSED: p50 +49.9%; p99 +49.9%" in slower.output
+
+    failing = runner.invoke(__main__.main, ["compare", filename, "--baseline", "1"])
+    assert failing.exit_code == 1
+    assert "REGRESSED: error rate +4.8%" in failing.output
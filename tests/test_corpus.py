@@ -0,0 +1,82 @@
+"""Test cases for the corpus module."""
+import json
+from pathlib import Path
+from typing import Any
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from stac_api_benchmark import corpus
+
+GEOMETRIES: Dict[str, Dict[str, Any]] = {
+    "square": {
+        "type": "Polygon",
+        "coordinates": [
+            [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0], [0.0, 2.0], [0.0, 0.0]],
+            [[0.5, 0.5], [1.0, 0.5], [1.0, 1.0], [0.5, 1.0], [0.5, 0.5]],
+        ],
+    },
+    "islands": {
+        "type": "MultiPolygon",
+        "coordinates": [
+            [[[10.0, 10.0], [11.0, 10.0], [11.0, 11.0], [10.0, 10.0]]],
+            [[[-5.0, -5.0], [-4.0, -5.0], [-4.0, -3.0], [-5.0, -5.0]]],
+        ],
+    },
+}
+
+
+def test_compile_corpus() -> None:
+    """It keeps every geometry and precomputes its bbox, vertex count, and area."""
+    compiled = corpus.compile_corpus(GEOMETRIES.items())
+    assert len(compiled) == 2
+    assert dict(compiled.items()) == GEOMETRIES
+    assert compiled.bbox.tolist() == [[0.0, 0.0, 2.0, 2.0], [-5.0, -5.0, 11.0, 11.0]]
+    assert compiled.vertex_count.tolist() == [10, 8]
+    assert compiled.area.tolist() == [3.75, 1.5]
+    assert compiled.valid.tolist() == [True, True]
+
+
+def test_compile_corpus_rejects_other_geometries() -> None:
+    """It raises a ValueError for a geometry that isn't a polygon."""
+    with pytest.raises(ValueError, match="Point"):
+        corpus.compile_corpus([("p", {"type": "Point", "coordinates": [0.0, 0.0]})])
+
+
+def test_write_and_read_corpus(tmp_path: Path) -> None:
+    """It memory-maps a written corpus, unless the source has changed."""
+    path = tmp_path / "test.corpus"
+    corpus.write_corpus(corpus.compile_corpus(GEOMETRIES.items()), path, {"size": 1})
+
+    compiled = corpus.read_corpus(path, {"size": 1})
+    assert compiled is not None
+    assert isinstance(compiled.coordinates, np.memmap)
+    assert dict(compiled.items()) == GEOMETRIES
+    assert corpus.read_corpus(path, {"size": 2}) is None
+    assert corpus.read_corpus(tmp_path / "missing.corpus", {"size": 1}) is None
+
+
+def test_load_corpus(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It compiles a feature collection once, then loads it from the corpus dir."""
+    monkeypatch.setattr(corpus, "_corpora", {})
+    filename = tmp_path / "fc.geojson"
+    filename.write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "properties": {"id": 1}, "geometry": g}
+                    for g in GEOMETRIES.values()
+                ],
+            }
+        )
+    )
+    corpus_dir = tmp_path / "corpora"
+
+    loaded = corpus.load_corpus(str(filename), "id", str(corpus_dir))
+    assert corpus.load_corpus(str(filename), "id", str(corpus_dir)) is loaded
+    (path,) = corpus_dir.iterdir()
+    assert corpus.read_corpus(path, corpus.source_of(filename, "id")) is not None
+    # features with the same id are deduplicated, keeping the first
+    assert list(loaded.items()) == [("1", GEOMETRIES["square"])]
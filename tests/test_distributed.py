@@ -0,0 +1,151 @@
+"""Test cases for the distributed module."""
+import asyncio
+import logging
+from typing import Any
+from typing import Callable
+
+import pytest
+from aiohttp import web
+
+from stac_api_benchmark import distributed
+from stac_api_benchmark import query
+from stac_api_benchmark.workers import QuerySource
+
+
+async def stac_api(port: int) -> web.AppRunner:
+    """A STAC API that returns one page of two items for every search."""
+
+    async def landing_page(request: web.Request) -> web.Response:
+        return web.json_response({"conformsTo": [], "links": []})
+
+    async def search(request: web.Request) -> web.Response:
+        body: dict[str, Any] = await request.json()
+        assert body["limit"] == 2
+        return web.json_response({"features": [{}, {}], "links": []})
+
+    app = web.Application()
+    app.router.add_get("/", landing_page)
+    app.router.add_post("/search", search)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def test_run_distributed_merges_agent_results(
+    make_config: Callable[..., query.BenchmarkConfig], free_port: Callable[[], int]
+) -> None:
+    """It runs every query exactly once across the agents on localhost."""
+    logger = logging.getLogger(__name__)
+    api_port, agent_ports = free_port(), [free_port(), free_port()]
+    config = make_config(
+        url=f"http://127.0.0.1:{api_port}",
+        collections=("c1", "c2"),
+        concurrency=4,
+        num_random=5,
+        max_items=2,
+        limit=2,
+        logger=logger,
+    )
+
+    async def run() -> None:
+        runner = await stac_api(api_port)
+        agents = [
+            asyncio.create_task(distributed.serve_agent(logger, "127.0.0.1", port))
+            for port in agent_ports
+        ]
+        await asyncio.sleep(0.1)
+        try:
+            stats = await distributed.run_distributed(
+                config,
+                QuerySource("random"),
+                [f"127.0.0.1:{port}" for port in agent_ports],
+            )
+        finally:
+            for agent in agents:
+                agent.cancel()
+            await runner.cleanup()
+
+        assert stats.count == 10
+        assert stats.errors == 0
+        assert stats.items == 20
+        assert {c: s.count for c, s in stats.collections.items()} == {"c1": 5, "c2": 5}
+
+    asyncio.run(run())
+
+
+def test_run_distributed_rejects_unexpected_replies(
+    make_config: Callable[..., query.BenchmarkConfig], free_port: Callable[[], int]
+) -> None:
+    """It names an agent that doesn't reply ready to the handshake."""
+    port = free_port()
+    config = make_config(
+        url="http://127.0.0.1:1", concurrency=1, num_random=1, max_items=1, limit=1
+    )
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        await distributed.read_message(reader)
+        await distributed.write_message(writer, {"type": "result"})
+        writer.close()
+
+    async def run() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+        async with server:
+            with pytest.raises(
+                distributed.AgentError,
+                match=f"127.0.0.1:{port}: expected a ready message, got 'result'",
+            ):
+                await distributed.run_distributed(
+                    config, QuerySource("random"), [f"127.0.0.1:{port}"]
+                )
+
+    asyncio.run(run())
+
+
+def test_run_distributed_fails_on_unreachable_and_stalled_agents(
+    make_config: Callable[..., query.BenchmarkConfig], free_port: Callable[[], int]
+) -> None:
+    """It names an agent it can't reach or that doesn't reply in time."""
+    port, closed_port = free_port(), free_port()
+    config = make_config(
+        url="http://127.0.0.1:1",
+        concurrency=1,
+        num_random=1,
+        max_items=1,
+        limit=1,
+        agent_timeout=0.2,
+    )
+    disconnected = []
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        await reader.read()
+        disconnected.append(True)
+        writer.close()
+
+    async def run() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+        async with server:
+            with pytest.raises(
+                distributed.AgentError, match=f"127.0.0.1:{closed_port}: "
+            ):
+                await distributed.run_distributed(
+                    config,
+                    QuerySource("random"),
+                    [f"127.0.0.1:{port}", f"127.0.0.1:{closed_port}"],
+                )
+            await asyncio.sleep(0.1)
+            assert disconnected == [True]
+
+            with pytest.raises(
+                distributed.AgentError,
+                match=f"127.0.0.1:{port}: no ready message after 0.2s",
+            ):
+                await distributed.run_distributed(
+                    config, QuerySource("random"), [f"127.0.0.1:{port}"]
+                )
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""Test cases for the features module."""
+import io
+import json
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from zipfile import ZipFile
+
+import pytest
+
+from stac_api_benchmark import features
+
+FEATURES: List[Dict[str, Any]] = [
+    {
+        "type": "Feature",
+        "properties": {"name": f"f{i}", "note": '"features": ['},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[i, 0.0], [i + 1, 0.0], [i, 1.0], [i, 0.0]]],
+        },
+    }
+    for i in range(20)
+]
+EXPECTED = [(f"f{i}", f["geometry"]) for i, f in enumerate(FEATURES)]
+
+
+def test_iter_feature_collection(monkeypatch: pytest.MonkeyPatch) -> None:
+    """It parses each feature, even when features span many reads."""
+    monkeypatch.setattr(features, "READ_SIZE", 7)
+    fc = {"type": "FeatureCollection", "features": FEATURES, "bbox": [0, 0, 1, 1]}
+    stream = io.StringIO(json.dumps(fc, indent=2))
+    assert list(features.iter_feature_collection(stream)) == FEATURES
+
+    with pytest.raises(ValueError):
+        list(features.iter_feature_collection(io.StringIO('{"type": "Feature"}')))
+
+
+def test_read_features(tmp_path: Path) -> None:
+    """It reads FeatureCollection, zipped, and line-delimited files."""
+    fc = tmp_path / "fc.geojson"
+    fc.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES}))
+    lines = tmp_path / "fc.geojsonl"
+    lines.write_text(
+        "\n".join(json.dumps(f) for f in FEATURES)
+        + "\n"
+        + json.dumps({"type": "Feature", "properties": {"name": "x"}, "geometry": None})
+    )
+    zipped = tmp_path / "fc.zip"
+    with ZipFile(zipped, "w") as zf:
+        zf.write(lines, "fc.geojsonl")
+
+    for path in (fc, lines, zipped):
+        assert list(features.read_features(str(path), "name")) == EXPECTED
+
+
+def test_read_features_geoparquet(tmp_path: Path) -> None:
+    """It reads the WKB geometries of a GeoParquet file."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    shapely = pytest.importorskip("shapely")
+    from shapely.geometry import shape
+
+    table = pa.table(
+        {
+            "name": [name for name, _ in EXPECTED],
+            "geom": [shapely.to_wkb(shape(g)) for _, g in EXPECTED],
+        }
+    ).replace_schema_metadata({"geo": json.dumps({"primary_column": "geom"})})
+    path = tmp_path / "fc.parquet"
+    pq.write_table(table, path)
+
+    assert list(features.read_features(str(path), "name")) == EXPECTED
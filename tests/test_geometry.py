@@ -0,0 +1,54 @@
+"""Test cases for the geometry module."""
+import struct
+
+import numpy as np
+import pytest
+
+from stac_api_benchmark import geometry
+
+SQUARE = [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0], [0.0, 2.0], [0.0, 0.0]]
+BOWTIE = [[0.0, 0.0], [2.0, 2.0], [2.0, 0.0], [0.0, 2.0], [0.0, 0.0]]
+
+
+def test_ring_self_intersects() -> None:
+    """It finds crossing segments, but not segments that share an end."""
+    assert geometry.ring_self_intersects(np.array(BOWTIE))
+    assert not geometry.ring_self_intersects(np.array(SQUARE))
+    # a repeated point doesn't make adjacent segments look like they cross
+    assert not geometry.ring_self_intersects(np.array([SQUARE[0], *SQUARE]))
+
+
+def test_ring_self_intersects_across_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    """It finds a crossing between segments tested in different chunks."""
+    monkeypatch.setattr(geometry, "SEGMENT_CHUNK_SIZE", 2)
+    angles = np.linspace(0, 2 * np.pi, 50, endpoint=False)
+    circle = np.column_stack((np.cos(angles), np.sin(angles)))
+    assert not geometry.ring_self_intersects(np.vstack((circle, circle[:1])))
+    circle[[10, 30]] = circle[[30, 10]]
+    assert geometry.ring_self_intersects(np.vstack((circle, circle[:1])))
+
+
+def test_decode_wkb() -> None:
+    """It decodes big and little endian polygons, dropping z values."""
+    little = struct.pack("<BII", 1, 3, 1) + struct.pack("<I", 5)
+    little += b"".join(struct.pack("<dd", x, y) for x, y in SQUARE)
+    assert geometry.decode_wkb(little) == {"type": "Polygon", "coordinates": [SQUARE]}
+
+    polygon_z = struct.pack(">BII", 0, 1003, 1) + struct.pack(">I", 5)
+    polygon_z += b"".join(struct.pack(">ddd", x, y, 9.0) for x, y in SQUARE)
+    multi = struct.pack(">BII", 0, 6, 2) + polygon_z + polygon_z
+    assert geometry.decode_wkb(multi) == {
+        "type": "MultiPolygon",
+        "coordinates": [[SQUARE], [SQUARE]],
+    }
+
+    with pytest.raises(ValueError):
+        geometry.decode_wkb(struct.pack("<BIdd", 1, 1, 0.0, 0.0))
+
+
+def test_repair() -> None:
+    """It splits a bowtie into its two valid triangles."""
+    pytest.importorskip("shapely")
+    repaired = geometry.repair({"type": "Polygon", "coordinates": [BOWTIE]})
+    assert repaired["type"] == "MultiPolygon"
+    assert len(repaired["coordinates"]) == 2
@@ -0,0 +1,109 @@
+"""Test cases for the items module."""
+import asyncio
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from aiohttp import web
+
+from stac_api_benchmark import api
+from stac_api_benchmark import items
+from stac_api_benchmark import query
+
+
+def test_key_weights() -> None:
+    """It weights keys by rank, or by whether they're in the hot set."""
+    assert items.key_weights("uniform", 3) == [1.0, 1.0, 1.0]
+    assert items.key_weights("zipf", 3, skew=2.0) == [1.0, 0.25, 1 / 9]
+    assert (
+        items.key_weights("hotset", 10, hot_fraction=0.2, hot_weight=0.8)
+        == [0.4] * 2 + [pytest.approx(0.025)] * 8
+    )
+    with pytest.raises(ValueError, match="not one of"):
+        items.key_weights("pareto", 3)
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        items.key_weights("hotset", 3, hot_weight=2.0)
+
+
+def test_item_requests_hot_set_and_repeats(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It draws hot items by weight, and groups first and repeat accesses."""
+    pools = {
+        "c1": [f"http://x/c1/{i}" for i in range(50)],
+        "c2": [f"http://x/c2/{i}" for i in range(50)],
+    }
+    requests = list(
+        items.item_requests(
+            make_config(), pools, 5000, "hotset", hot_fraction=0.1, hot_weight=0.9
+        )
+    )
+
+    groups = Counter(group for request in requests for group in request.groups)
+    assert groups["set:hot"] / len(requests) == pytest.approx(0.9, abs=0.02)
+    assert groups["access:first"] == len({request.href for request in requests})
+    assert groups["access:first"] + groups["access:repeat"] == len(requests)
+    assert all(
+        request.href.startswith(f"http://x/{request.collection}/")
+        for request in requests
+    )
+    hot = {r.href for r in requests if "set:hot" in r.groups}
+    assert len(hot) == 10
+
+    same = items.item_requests(make_config(), pools, 5000, "hotset")
+    assert [r.href for r in same] == [r.href for r in requests]
+    with pytest.raises(ValueError, match="no items"):
+        items.item_requests(make_config(), {"c1": []}, 1)
+
+
+def test_load_pool_paginates_and_caches(
+    tmp_path: Path,
+    make_config: Callable[..., query.BenchmarkConfig],
+    free_port: Callable[[], int],
+) -> None:
+    """It harvests item links across pages once, then reads them from disk."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    config = make_config(url=url, corpus_dir=str(tmp_path))
+    context = api.ApiContext(
+        url=url,
+        landing_page={},
+        conformance=frozenset(),
+        search_href=f"{url}/search",
+        search_method="POST",
+    )
+    searches = []
+
+    async def search(request: web.Request) -> web.Response:
+        body = await request.json()
+        searches.append(body)
+        start = body.get("token", 0)
+        features = [
+            {"links": [{"rel": "self", "href": f"{url}/items/{i}"}]}
+            for i in range(start, min(start + body["limit"], 5))
+        ]
+        links = [
+            {"rel": "next", "href": f"{url}/search", "method": "POST"}
+            | {"body": {"token": start + body["limit"]}, "merge": True}
+        ]
+        return web.json_response({"features": features, "links": links})
+
+    async def run() -> None:
+        app = web.Application()
+        app.router.add_post("/search", search)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        try:
+            async with query.create_session(config) as session:
+                for _ in range(2):
+                    hrefs = await items.load_pool(config, session, context, "c1", 10)
+                    assert hrefs == [f"{url}/items/{i}" for i in range(5)]
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    # the second load reads the pool from disk
+    assert len(searches) == 2
+    assert items.pool_path(url, "c1", 10, str(tmp_path)).exists()
@@ -1,8 +1,17 @@
 """Test cases for the __main__ module."""
+import json
+from pathlib import Path
+from typing import Any
+from typing import Optional
+
+import click
 import pytest
 from click.testing import CliRunner
 
 from stac_api_benchmark import __main__
+from stac_api_benchmark import mock
+from stac_api_benchmark import query
+from stac_api_benchmark.workers import QuerySource
 
 
 @pytest.fixture
@@ -14,3 +23,142 @@ def runner() -> CliRunner:
 def test_main_succeeds(runner: CliRunner) -> None:
     """It exits with a status code of zero."""
     _ = runner.invoke(__main__.main)
+
+
+def test_version(runner: CliRunner) -> None:
+    """It prints the version, rather than running the benchmark."""
+    result = runner.invoke(__main__.main, ["--version"])
+    assert result.exit_code == 0, result.output
+    assert "version" in result.output
+
+
+@pytest.mark.parametrize(
+    "value,expected", [("50", 50.0), ("50/s", 50.0), ("600/m", 10.0), ("7200/h", 2.0)]
+)
+def test_parse_rate(value: str, expected: float) -> None:
+    """It converts rates to requests per second."""
+    assert __main__.parse_rate(None, None, value) == expected  # type: ignore
+
+
+@pytest.mark.parametrize("value", ["fast", "50/d", "0/s"])
+def test_parse_rate_rejects_invalid(value: str) -> None:
+    """It rejects rates that aren't a positive number per second, minute or hour."""
+    with pytest.raises(click.BadParameter):
+        __main__.parse_rate(None, None, value)  # type: ignore
+
+
+def test_run_against_mock(runner: CliRunner) -> None:
+    """It runs a scenario against a mock STAC API in another process."""
+    process, url = mock.start_process(mock.MockConfig(collections=("c1",)))
+    try:
+        result = runner.invoke(
+            __main__.main,
+            [
+                "run",
+                "--url",
+                url,
+                "--collection",
+                "c1",
+                "--num-random",
+                "5",
+                "--max-items",
+                "20",
+                "--limit",
+                "10",
+                "--scenario",
+                "random_queries",
+            ],
+        )
+    finally:
+        process.terminate()
+        process.join()
+    assert result.exit_code == 0, result.output
+    stats = json.loads(result.output.splitlines()[-1])["random_queries"]
+    assert (stats["count"], stats["errors"], stats["items"]) == (5, 0, 100)
+
+
+@pytest.mark.parametrize(
+    "complexity_queries, fc_filename",
+    [("countries", query.COUNTRIES), ("feature-collection", "fc.geojson")],
+)
+def test_complexity_queries_with_feature_collection(
+    runner: CliRunner,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    complexity_queries: str,
+    fc_filename: str,
+) -> None:
+    """It sweeps the named collection, using --feature-collection only if named."""
+    fc = tmp_path / "fc.geojson"
+    fc.write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "properties": {"id": "a"},
+                        "geometry": {
+                            "type": "Polygon",
+                            "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 0]]],
+                        },
+                    }
+                ],
+            }
+        )
+    )
+    sources: list[Optional[QuerySource]] = []
+
+    def select_scenarios(
+        seed: int, fc_source: Any, complexity: Optional[QuerySource], *args: Any
+    ) -> list[Any]:
+        sources.append(complexity)
+        return []
+
+    async def run(*args: Any, **kwargs: Any) -> dict[str, Any]:
+        return {}
+
+    monkeypatch.setattr(__main__, "select_scenarios", select_scenarios)
+    monkeypatch.setattr(__main__, "run", run)
+    result = runner.invoke(
+        __main__.main,
+        [
+            "run",
+            "--url",
+            "http://example.com",
+            "--collection",
+            "c1",
+            "--corpus-dir",
+            str(tmp_path / "corpus"),
+            "--feature-collection",
+            str(fc),
+            "--complexity-queries",
+            complexity_queries,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    (complexity,) = sources
+    assert complexity is not None
+    assert complexity.params["fc_filename"].endswith(fc_filename)
+
+
+def test_calibrate(runner: CliRunner) -> None:
+    """It ramps against a mock STAC API to find the knee of the client."""
+    result = runner.invoke(
+        __main__.main,
+        [
+            "calibrate",
+            "--in-process",
+            "--concurrency-steps",
+            "1,2",
+            "--step-duration",
+            "0.2",
+            "--latency",
+            "0.001",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    output = json.loads(result.output.splitlines()[-1])
+    assert output["mock"]["latency"] == "0.001"
+    assert [step["concurrency"] for step in output["ramp"]["steps"]] == [1, 2]
+    assert output["ramp"]["knee"] is not None
@@ -0,0 +1,83 @@
+"""Test cases for the mock module."""
+import asyncio
+from dataclasses import replace
+from random import Random
+from typing import Callable
+
+import pytest
+
+from stac_api_benchmark import api
+from stac_api_benchmark import mock
+from stac_api_benchmark import query
+
+
+@pytest.mark.parametrize(
+    "spec, low, high",
+    [
+        ("0.01", 0.01, 0.01),
+        ("constant:0.01", 0.01, 0.01),
+        ("uniform:0.01,0.02", 0.01, 0.02),
+        ("exponential:0", 0.0, 0.0),
+        ("lognormal:0.01,0", 0.01, 0.01),
+    ],
+)
+def test_parse_latency(spec: str, low: float, high: float) -> None:
+    """It draws latencies from the distribution."""
+    latency = mock.parse_latency(spec)
+    assert all(low <= latency(Random(seed)) <= high for seed in range(10))
+
+
+@pytest.mark.parametrize("spec", ["slow", "uniform:0.01", "gamma:1", "-1"])
+def test_parse_latency_rejects_invalid(spec: str) -> None:
+    """It rejects unknown distributions and wrong or negative parameters."""
+    with pytest.raises(ValueError):
+        mock.parse_latency(spec)
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_search_paginates(
+    method: str, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It pages through the items of a search, and serves the items it links."""
+    mock_config = mock.MockConfig(collections=("a", "b"), items=250, max_limit=100)
+
+    async def run() -> tuple[int, int, list[str]]:
+        runner, url = await mock.start(mock_config)
+        try:
+            async with query.create_session(make_config(url=url)) as session:
+                context = await api.load_context(session, url)
+                context = replace(context, search_method=method)
+                body = query.search_body(collection="b", limit=1000)
+                count, pages = await query.paginate(session, context, body, 1000)
+                hrefs = await query.item_hrefs(session, context, "a", 3)
+                for href in hrefs:
+                    async with session.get(href) as response:
+                        assert response.status == 200
+                return count, len(pages), hrefs
+        finally:
+            await runner.cleanup()
+
+    count, pages, hrefs = asyncio.run(run())
+    assert (count, pages) == (250, 3)
+    assert [href.rsplit("/", 1)[-1] for href in hrefs] == ["a-0", "a-1", "a-2"]
+
+
+def test_error_rate(make_config: Callable[..., query.BenchmarkConfig]) -> None:
+    """It fails about as many searches as the error rate."""
+    mock_config = mock.MockConfig(error_rate=0.2, seed=1)
+
+    async def run() -> list[int]:
+        runner, url = await mock.start(mock_config)
+        try:
+            async with query.create_session(make_config(url=url)) as session:
+                statuses = []
+                for _ in range(500):
+                    async with session.get(f"{url}/search") as response:
+                        statuses.append(response.status)
+                return statuses
+        finally:
+            await runner.cleanup()
+
+    statuses = asyncio.run(run())
+    assert 50 < statuses.count(500) < 150
+    assert set(statuses) == {200, 500}
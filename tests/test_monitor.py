@@ -0,0 +1,83 @@
+"""Test cases for the monitor module."""
+import asyncio
+import pstats
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from stac_api_benchmark import mock
+from stac_api_benchmark import monitor
+from stac_api_benchmark import query
+from stac_api_benchmark.stats import ScenarioStats
+
+
+def test_monitoring_warns_of_a_blocked_loop() -> None:
+    """It reports the lag of a loop blocked by the client, with a warning."""
+
+    async def run() -> monitor.ClientLoad:
+        async with monitor.monitoring(interval=0.01) as load:
+            await asyncio.sleep(0.05)
+            time.sleep(0.1)
+            await asyncio.sleep(0.05)
+        return load
+
+    client = asyncio.run(run()).to_dict()
+    assert client["loop_lag"]["max"] >= 0.09
+    assert any("event loop lag" in warning for warning in client["warnings"])
+
+
+def test_monitoring_counts_requests_and_queued_tasks(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It samples the requests in flight and the tasks waiting for the executor."""
+    executor = monitor.TrackedExecutor(ThreadPoolExecutor(max_workers=1), 1)
+
+    async def run() -> monitor.ClientLoad:
+        runner, url = await mock.start(mock.MockConfig(latency="0.2"))
+        try:
+            async with query.create_session(make_config(url=url)) as session:
+                loop = asyncio.get_running_loop()
+                monitoring = monitor.monitoring(session, executor, interval=0.05)
+                async with monitoring as load:
+                    blocked = [
+                        loop.run_in_executor(executor, time.sleep, 0.1)
+                        for _ in range(3)
+                    ]
+                    await asyncio.gather(
+                        *(
+                            query.fetch_page(session, "GET", f"{url}/search", None)
+                            for _ in range(5)
+                        ),
+                        *blocked,
+                    )
+                assert monitor.in_flight(session).count == 0
+                return load
+        finally:
+            await runner.cleanup()
+
+    with executor:
+        client = asyncio.run(run()).to_dict()
+    assert client["in_flight"]["max"] == 5
+    assert client["executor_queue"]["max"] >= 1
+    assert executor.queue_depth() == 0
+
+
+def test_monitored_reports_and_profiles(
+    tmp_path: Path, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It reports the load on the client with the statistics, and saves a profile."""
+
+    async def scenario() -> ScenarioStats:
+        await asyncio.sleep(0.2)
+        return ScenarioStats()
+
+    profile_config = monitor.ProfileConfig("cprofile", str(tmp_path))
+    stats = asyncio.run(
+        monitor.monitored(
+            make_config().logger, "idle", scenario(), profile_config=profile_config
+        )
+    )
+    assert stats.to_dict()["client"]["warnings"] == []
+    assert ScenarioStats.decode(stats.encode()).client == stats.client
+    assert pstats.Stats(profile_config.filename("idle")).stats  # type: ignore
@@ -0,0 +1,168 @@
+"""Test cases for the query module."""
+import asyncio
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from stac_api_benchmark import api
+from stac_api_benchmark import mock
+from stac_api_benchmark import query
+
+
+def test_search_body_omits_unset_parameters() -> None:
+    """It only includes the parameters that were given."""
+    assert query.search_body(collection="c1", limit=10) == {
+        "collections": ["c1"],
+        "limit": 10,
+    }
+
+
+def test_search_body_filter_lang_requires_filter() -> None:
+    """It only sends filter-lang along with a filter."""
+    body = query.search_body(collection="c1", limit=10, filter_lang="cql2-json")
+    assert "filter-lang" not in body
+
+    cql2_filter = {"op": "<=", "args": [{"property": "eo:cloud_cover"}, 10]}
+    body = query.search_body(
+        collection="c1", limit=10, filter_lang="cql2-json", cql2_filter=cql2_filter
+    )
+    assert body["filter"] == cql2_filter
+    assert body["filter-lang"] == "cql2-json"
+
+
+def test_next_request_merges_post_body() -> None:
+    """It merges the next link body into the previous body when requested."""
+    page = {
+        "links": [
+            {
+                "rel": "next",
+                "href": "http://example.com/search",
+                "method": "POST",
+                "body": {"token": "abc"},
+                "merge": True,
+            }
+        ]
+    }
+    previous = ("POST", "http://example.com/search", {"limit": 10})
+    assert query.next_request(page, previous) == (
+        "POST",
+        "http://example.com/search",
+        {"limit": 10, "token": "abc"},
+    )
+
+
+def test_next_request_get_and_last_page() -> None:
+    """It follows GET next links and stops when there is no next link."""
+    previous = ("POST", "http://example.com/search", {"limit": 10})
+    page = {"links": [{"rel": "next", "href": "http://example.com/search?token=a"}]}
+    assert query.next_request(page, previous) == (
+        "GET",
+        "http://example.com/search?token=a",
+        None,
+    )
+    assert query.next_request({"links": []}, previous) is None
+
+
+def test_windowed_shuffle() -> None:
+    """It yields every item once, in an order determined by the seed."""
+    items = [query.SearchQuery(search_id=str(i), collection="c1") for i in range(100)]
+    shuffled = list(query.windowed_shuffle(items, 10, seed=1))
+    assert sorted(shuffled, key=lambda q: int(q.search_id)) == items
+    assert shuffled != items
+    assert shuffled == list(query.windowed_shuffle(items, 10, seed=1))
+    assert list(query.windowed_shuffle(items[:5], 10, seed=1)) != items[:5]
+
+
+def test_random_geometries(
+    monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It yields a different polygon for every random query, across batches."""
+    monkeypatch.setattr(query, "RANDOM_POLYGON_BATCH_SIZE", 7)
+    config = make_config(collections=("c1", "c2"))
+    geometries = list(query.random_geometries(config))
+    assert len(geometries) == 20
+    assert len({str(g["coordinates"]) for g in geometries}) == 20
+    assert geometries == list(query.random_geometries(config))
+
+
+def test_complexity_queries(
+    tmp_path: Path, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It queries each feature at each level, grouped by level and complexity."""
+    config = make_config(num_features=3, corpus_dir=str(tmp_path))
+    queries = list(
+        query.complexity_queries(
+            config, "countries.geojson", "name", tolerances=[0.1], max_vertices=[8]
+        )
+    )
+
+    assert len(queries) == 12
+    by_level = {q.groups[0]: q for q in queries if q.search_id.startswith("Angola@")}
+    assert list(sorted(by_level)) == [
+        "level:bbox",
+        "level:max_vertices=8",
+        "level:original",
+        "level:tolerance=0.1",
+    ]
+    bbox = by_level["level:bbox"]
+    assert bbox.intersects is not None
+    assert len(bbox.intersects["coordinates"][0]) == 5
+    assert bbox.groups[1] == "vertices:<=8"
+
+
+def test_sorted_queries_paginate_deep(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It generates multi-key sorted queries with random filters, pages deep."""
+    config = make_config(collections=("c1", "c2"), num_random=3, limit=50)
+    queries = list(
+        query.sorted_queries(config, ["properties.datetime:desc", "id"], pages=4)
+    )
+    assert len(queries) == 6
+    assert all(q.max_items == 200 for q in queries)
+    assert all(
+        q.sortby
+        == [
+            {"field": "properties.datetime", "direction": "desc"},
+            {"field": "id", "direction": "asc"},
+        ]
+        for q in queries
+    )
+    assert all(q.intersects and q.datetime for q in queries)
+    assert len({q.datetime for q in queries}) == 6
+
+    unfiltered = next(
+        query.sorted_queries(config, ["id"], intersects=False, datetime=False)
+    )
+    assert unfiltered.intersects is None and unfiltered.datetime is None
+
+
+@pytest.mark.parametrize(
+    "mode, count, pages", [("parse", 250, 3), ("count", 250, 3), ("drain", 0, 1)]
+)
+def test_paginate_response_modes(
+    mode: str, count: int, pages: int, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It counts the same items and bytes however much of each page it parses."""
+    mock_config = mock.MockConfig(items=250, max_limit=100)
+
+    async def run() -> tuple[int, list[query.PageTiming]]:
+        runner, url = await mock.start(mock_config)
+        try:
+            async with query.create_session(make_config(url=url)) as session:
+                context = await api.load_context(session, url)
+                body = query.search_body(collection="mock", limit=100)
+                return await query.paginate(session, context, body, 1000, mode)
+        finally:
+            await runner.cleanup()
+
+    items, timings = asyncio.run(run())
+    assert (items, len(timings)) == (count, pages)
+    assert timings[0].bytes > 100 * 500
+
+
+def test_count_page_keeps_only_the_next_link() -> None:
+    """It drops the features and every link but next."""
+    content = b'{"features": [{}, {}], "links": [{"rel": "self"}, {"rel": "next"}]}'
+    assert query.count_page(content) == ({"links": [{"rel": "next"}]}, 2)
@@ -0,0 +1,36 @@
+"""Test cases for the ramp module."""
+from returns.result import Failure
+from returns.result import Success
+
+from stac_api_benchmark.query import RunFailure
+from stac_api_benchmark.query import RunSuccess
+from stac_api_benchmark.ramp import exceeded
+from stac_api_benchmark.ramp import RampConfig
+from stac_api_benchmark.stats import ScenarioStats
+
+RAMP_CONFIG = RampConfig(
+    steps=[1, 2], by_rate=False, step_duration=1, max_error_rate=0.1, max_p99=1.0
+)
+
+
+def test_exceeded_within_thresholds() -> None:
+    """It passes a step with a low error rate and p99."""
+    stats = ScenarioStats()
+    for _ in range(10):
+        stats.record_for("c1", Success(RunSuccess(0.5, 1)))
+    stats.record_for("c1", Failure(RunFailure(0.5, "error")))
+    assert exceeded(RAMP_CONFIG, stats) is None
+
+
+def test_exceeded_thresholds() -> None:
+    """It stops on a high error rate or p99, or when nothing completed."""
+    assert exceeded(RAMP_CONFIG, ScenarioStats()) == "no requests completed"
+
+    stats = ScenarioStats()
+    stats.record_for("c1", Success(RunSuccess(0.5, 1)))
+    stats.record_for("c1", Failure(RunFailure(0.5, "error")))
+    assert str(exceeded(RAMP_CONFIG, stats)).startswith("error rate")
+
+    stats = ScenarioStats()
+    stats.record_for("c1", Success(RunSuccess(2.0, 1)))
+    assert str(exceeded(RAMP_CONFIG, stats)).startswith("p99")
@@ -0,0 +1,25 @@
+"""Test cases for the random_geojson module."""
+import numpy as np
+
+from stac_api_benchmark.random_geojson import generate_random_polygons
+
+
+def test_generate_random_polygons() -> None:
+    """It generates closed polygons of 4 to 10 vertices, each one different."""
+    polygons = generate_random_polygons(100, np.random.default_rng(0))
+
+    assert len(polygons) == 100
+    for polygon in polygons:
+        assert polygon["type"] == "Polygon"
+        (ring,) = polygon["coordinates"]
+        assert 5 <= len(ring) <= 11
+        assert ring[0] == ring[-1]
+        assert all(-180 <= lon <= 180 and -90 <= lat <= 90 for lon, lat in ring)
+    assert len({str(polygon["coordinates"]) for polygon in polygons}) == 100
+
+
+def test_generate_random_polygons_is_reproducible() -> None:
+    """It generates the same polygons from the same seed."""
+    assert generate_random_polygons(
+        10, np.random.default_rng(1)
+    ) == generate_random_polygons(10, np.random.default_rng(1))
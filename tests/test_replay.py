@@ -0,0 +1,178 @@
+"""Test cases for the replay module."""
+import asyncio
+import gzip
+import json
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+
+import pytest
+from aiohttp import web
+
+from stac_api_benchmark import query
+from stac_api_benchmark import replay
+
+
+def test_read_log_parses_gzipped_entries(tmp_path: Path) -> None:
+    """It reads methods, bodies, and epoch or ISO 8601 timestamps."""
+    path = tmp_path / "requests.jsonl.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(json.dumps({"url": "/search?limit=1", "timestamp": 10.5}) + "\n\n")
+        f.write(
+            json.dumps(
+                {
+                    "method": "post",
+                    "url": "/search",
+                    "body": {"limit": 1},
+                    "timestamp": "1970-01-01T00:00:11Z",
+                }
+            )
+        )
+
+    assert list(replay.read_log(str(path))) == [
+        replay.LogEntry("GET", "/search?limit=1", None, 10.5),
+        replay.LogEntry("POST", "/search", {"limit": 1}, 11.0),
+    ]
+
+
+def test_read_log_reports_bad_lines(tmp_path: Path) -> None:
+    """It names the line that isn't a request log entry."""
+    path = tmp_path / "requests.jsonl"
+    path.write_text('{"url": "/search"}\n{"method": "GET"}\n')
+    with pytest.raises(replay.ReplayError, match="line 2"):
+        list(replay.read_log(str(path)))
+
+
+@pytest.mark.parametrize(
+    "entry, error",
+    [
+        ({"url": "/search", "body": [1]}, "body"),
+        ({"url": "/search?intersects=%7Bbad", "body": None}, "intersects"),
+        ({"url": "/search", "body": {"intersects": "1"}}, "intersects"),
+    ],
+)
+def test_read_log_reports_bad_bodies(
+    tmp_path: Path, entry: Dict[str, Any], error: str
+) -> None:
+    """It names the line of a body or intersects that isn't a JSON object."""
+    path = tmp_path / "requests.jsonl"
+    path.write_text(f'{{"url": "/search"}}\n{json.dumps(entry)}\n')
+    with pytest.raises(replay.ReplayError, match=f"line 2: its {error}"):
+        list(replay.read_log(str(path)))
+
+
+def test_rebase_replaces_recorded_root() -> None:
+    """It keeps the path and query of a recorded url, less the prefix."""
+    assert (
+        replay.rebase("https://prod.example.com/v1/search?limit=1", "http://t/", "/v1")
+        == "http://t/search?limit=1"
+    )
+    assert (
+        replay.rebase("/collections/c1", "http://t/api")
+        == "http://t/api/collections/c1"
+    )
+
+
+def test_describe_entry_endpoints_and_shapes() -> None:
+    """It classifies requests by endpoint, parameter names, and collection."""
+    search = replay.LogEntry(
+        "POST",
+        "/search",
+        {"collections": ["c1"], "intersects": {"type": "Polygon"}, "limit": 10},
+    )
+    assert replay.describe_entry(search) == (
+        "POST search",
+        "search[collections,intersects:Polygon,limit]",
+        "c1",
+    )
+    item = replay.LogEntry("GET", "https://x/v1/collections/c2/items/i1")
+    assert replay.describe_entry(item) == ("GET item", "item[]", "c2")
+    items = replay.LogEntry("GET", "/collections/c2/items?limit=5&bbox=0,0,1,1")
+    assert replay.describe_entry(items) == ("GET items", "items[bbox,limit]", "c2")
+
+
+@pytest.mark.parametrize("speed", [None, 100.0])
+def test_replay_groups_by_endpoint_and_shape(
+    speed: float,
+    make_config: Callable[..., query.BenchmarkConfig],
+    free_port: Callable[[], int],
+) -> None:
+    """It replays every request, as fast as possible or at the original timing."""
+    port = free_port()
+    config = make_config(
+        url=f"http://127.0.0.1:{port}",
+        collections=(),
+        concurrency=2,
+        num_random=0,
+        max_items=1,
+        limit=1,
+    )
+    entries = [
+        replay.LogEntry("POST", "/v1/search", {"collections": ["c1"]}, 0.0),
+        replay.LogEntry("GET", "/v1/search?collections=c1&limit=1", timestamp=1.0),
+        replay.LogEntry("GET", "/v1/collections/c1/items/missing", timestamp=2.0),
+    ]
+
+    async def search(request: web.Request) -> web.Response:
+        return web.json_response({"features": [{}], "links": []})
+
+    async def item(request: web.Request) -> web.Response:
+        raise web.HTTPNotFound()
+
+    async def run() -> None:
+        app = web.Application()
+        app.router.add_route("*", "/search", search)
+        app.router.add_get("/collections/{collection}/items/{item}", item)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        try:
+            async with query.create_session(config) as session:
+                stats = await replay.replay(
+                    config,
+                    session,
+                    replay.ReplayConfig("log", speed=speed, url_prefix="/v1"),
+                    entries,
+                )
+        finally:
+            await runner.cleanup()
+
+        assert (stats.count, stats.errors, stats.items) == (3, 1, 2)
+        assert stats.schedule_lag.count == (0 if speed is None else 3)
+        assert {group: s.count for group, s in stats.groups.items()} == {
+            "endpoint:POST search": 1,
+            "endpoint:GET search": 1,
+            "endpoint:GET item": 1,
+            "shape:search[collections]": 1,
+            "shape:search[collections,limit]": 1,
+            "shape:item[]": 1,
+        }
+
+    asyncio.run(run())
+
+
+def test_run_timed_cancels_started_entries() -> None:
+    """It cancels the entries already started when an entry has no timestamp."""
+    cancelled: List[str] = []
+
+    async def run_entry(entry: replay.LogEntry, scheduled: float) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(entry.url)
+            raise
+
+    async def run() -> None:
+        entries = [
+            replay.LogEntry("GET", "/a", timestamp=0.0),
+            replay.LogEntry("GET", "/b", timestamp=0.01),
+            replay.LogEntry("GET", "/c"),
+        ]
+        with pytest.raises(replay.ReplayError, match="/c has no timestamp"):
+            await replay.run_timed(entries, 1.0, perf_counter(), run_entry)
+
+    asyncio.run(run())
+    assert cancelled == ["/a"]
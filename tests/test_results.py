@@ -0,0 +1,68 @@
+"""Test cases for the results module."""
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from returns.result import Failure
+from returns.result import Success
+
+from stac_api_benchmark import query
+from stac_api_benchmark import results
+from stac_api_benchmark.query import RunFailure
+from stac_api_benchmark.query import RunSuccess
+from stac_api_benchmark.stats import ScenarioStats
+
+
+def test_recording_stores_requests_and_stats(
+    tmp_path: Path, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It stores the requests recorded in its context, and scenario statistics."""
+    store = results.ResultsStore(str(tmp_path / "results.db"))
+    run_id = store.start_run(make_config(), label="v1", git_sha="abc")
+    stats = ScenarioStats()
+    with store.recording("random_queries"):
+        stats.record_for("c1", Success(RunSuccess(0.5, 10, bytes=100)), (), "q-0")
+        stats.record_for("c1", Failure(RunFailure(1.0, "500: oops", 500)), (), "q-1")
+        stats.record_for("c1", Failure(RunFailure(2.0, "timeout")), (), "q-3")
+    # outside the context, requests are no longer stored
+    stats.record_for("c1", Success(RunSuccess(0.25, 10)), (), "q-2")
+    store.save("random_queries", stats)
+    store.close()
+
+    store = results.ResultsStore(str(tmp_path / "results.db"))
+    (run,) = store.runs()
+    assert (run.id, run.label, run.git_sha, run.url) == (
+        run_id,
+        "v1",
+        "abc",
+        "http://example.com",
+    )
+    assert store.latencies(run_id, "random_queries").tolist() == [0.5]
+    assert store.scenario_stats(run_id)["random_queries"].count == 4
+    rows = store.connection.execute(
+        "SELECT request_id, status, ok, items, error FROM requests"
+        " ORDER BY request_id"
+    ).fetchall()
+    assert rows == [
+        ("q-0", 200, 1, 10, None),
+        ("q-1", 500, 0, 0, "500: oops"),
+        ("q-3", None, 0, 0, "timeout"),
+    ]
+
+
+def test_find_run_by_id_label_or_latest(
+    tmp_path: Path, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It finds the latest run with a label, or before another run."""
+    store = results.ResultsStore(str(tmp_path / "results.db"))
+    with pytest.raises(results.ResultsError, match="no run is stored"):
+        store.find_run()
+    for label in ("baseline", "baseline", None):
+        store.start_run(make_config(), label)
+
+    assert store.find_run().id == 3
+    assert store.find_run("baseline").id == 2
+    assert store.find_run("1").id == 1
+    assert store.find_run(before=3).id == 2
+    with pytest.raises(results.ResultsError, match="'release'"):
+        store.find_run("release")
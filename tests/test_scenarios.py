@@ -0,0 +1,120 @@
+"""Test cases for the scenarios module."""
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from stac_api_benchmark import query
+from stac_api_benchmark import scenarios
+from stac_api_benchmark.workers import QuerySource
+
+
+def names(selected: list[scenarios.Scenario]) -> list[str]:
+    return [scenario.name for scenario in selected]
+
+
+def test_select_by_name_and_tag() -> None:
+    """It keeps the scenarios matching a pattern, less those excluded."""
+    builtin = scenarios.builtin_scenarios()
+    assert names(scenarios.select(builtin, ["quick"], ["sort_c*"])) == [
+        "countries_apr_2019",
+        "countries_cloud_cover_asc",
+        "sort_datetime_desc",
+        "sort_datetime_asc",
+    ]
+    assert names(scenarios.select(builtin, ["step", "repeated"])) == [
+        "step",
+        "repeated",
+    ]
+    with pytest.raises(scenarios.ScenarioError, match="no scenario matches"):
+        scenarios.select(builtin, ["bogus"])
+
+
+def test_builtin_scenarios_include_given_sources() -> None:
+    """It runs the feature collection and complexity scenarios after countries."""
+    builtin = scenarios.builtin_scenarios(
+        feature_collection=QuerySource("fc", {"fc_filename": "f.geojson"}),
+        complexity=QuerySource("complexity", {"fc_filename": "f.geojson"}),
+    )
+    assert names(builtin)[3:6] == [
+        "countries_cloud_cover_asc",
+        "feature_collection",
+        "complexity",
+    ]
+
+
+def test_registry_replaces_in_place(tmp_path: Path) -> None:
+    """A scenarios file replaces scenarios of the same name and adds the rest."""
+    path = tmp_path / "scenarios.toml"
+    path.write_text(
+        '[[scenarios]]\nname = "repeated"\nrunner = "repeated_item"\ncount = 100\n\n'
+        '[[scenarios]]\nname = "few"\nrunner = "queries"\n'
+        'params = {generator = "random"}\ncount = 5\ntags = ["quick"]\n'
+    )
+    registered = scenarios.registry(
+        scenarios.builtin_scenarios(), scenarios.read_scenarios(str(path))
+    )
+    assert names(registered)[4:7] == ["random_queries", "sort_paged", "repeated"]
+    assert names(registered)[-1] == "few"
+    assert registered[6].count == 100
+    assert registered[-1].tags == ("quick",)
+
+
+def test_read_scenarios_rejects_unknown_fields(tmp_path: Path) -> None:
+    """It names the fields that a scenario doesn't have."""
+    path = tmp_path / "scenarios.yaml"
+    path.write_text("scenarios:\n  - {name: x, runner: queries, times: 5}\n")
+    with pytest.raises(scenarios.ScenarioError, match="times"):
+        scenarios.read_scenarios(str(path))
+
+
+def test_configure_sets_fields() -> None:
+    """It sets the concurrency, count, duration, or params of a scenario by name."""
+    builtin = scenarios.builtin_scenarios()
+    configured = scenarios.configure(
+        builtin,
+        [
+            ("repeated", "count", "10"),
+            ("step", "duration", "2.5"),
+            ("sort_paged", "pages", "50"),
+            ("sort_paged", "sortby", '["properties.created:asc"]'),
+            ("step", "datetime", "2020-01-01T00:00:00Z/.."),
+        ],
+    )
+    by_name = {scenario.name: scenario for scenario in configured}
+    assert (by_name["repeated"].count, by_name["repeated"].concurrency) == (10, 50)
+    assert by_name["step"].duration == 2.5
+    assert by_name["step"].params["datetime"] == "2020-01-01T00:00:00Z/.."
+    assert by_name["sort_paged"].params == {
+        "generator": "sorted",
+        "sortby": ["properties.created:asc"],
+        "pages": 50,
+    }
+    with pytest.raises(scenarios.ScenarioError, match="positive"):
+        scenarios.configure(builtin, [("repeated", "count", "zero")])
+    with pytest.raises(scenarios.ScenarioError, match="no scenario"):
+        scenarios.configure(builtin, [("bogus", "count", "1")])
+
+
+def test_required_conformance(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It requires sort and filter only for the scenarios that use them."""
+    builtin = scenarios.builtin_scenarios()
+    config = make_config(queryables=("eo:cloud_cover",))
+    assert scenarios.required_conformance(config, builtin) == [
+        "item-search",
+        "sort",
+        "filter",
+    ]
+    assert scenarios.required_conformance(
+        config, scenarios.select(builtin, ["step", "repeated"])
+    ) == ["item-search"]
+
+
+def test_select_opt_in() -> None:
+    """It only includes opt-in scenarios when a pattern selects them."""
+    builtin = scenarios.builtin_scenarios()
+    assert "item_cache" not in names(scenarios.select(builtin))
+    assert "item_cache" not in names(scenarios.select(builtin, (), ["sort_*"]))
+    assert names(scenarios.select(builtin, ["item_cache"])) == ["item_cache"]
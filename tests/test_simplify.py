@@ -0,0 +1,57 @@
+"""Test cases for the simplify module."""
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from stac_api_benchmark import corpus
+from stac_api_benchmark import simplify
+
+# a ring with a small notch at the middle of its bottom edge
+NOTCHED = np.array(
+    [[0.0, 0.0], [1.0, 0.0], [1.5, 0.1], [2.0, 0.0], [4.0, 0.0], [4.0, 2.0]]
+    + [[0.0, 2.0], [0.0, 0.0]]
+)
+
+
+def test_ring_importance() -> None:
+    """It ranks vertices by the tolerance at which Douglas-Peucker drops them."""
+    importance = simplify.ring_importance(NOTCHED)
+    assert importance[2] == pytest.approx(0.1)
+    assert importance[1] < 0.1 and importance[3] < 0.1
+    # the ends and the two farthest vertices are always kept
+    assert np.isinf(importance[[0, 4, 5, 6, 7]]).sum() == 4
+
+    kept = NOTCHED[simplify.tolerance_mask(importance, 0.05)]
+    assert [1.5, 0.1] in kept.tolist()
+    assert len(NOTCHED[simplify.tolerance_mask(importance, 0.5)]) == 5
+
+
+def test_budget_mask() -> None:
+    """It keeps the most important vertices, up to the budget."""
+    importance = np.array([np.inf, 0.1, 0.3, 0.2, np.inf])
+    assert simplify.budget_mask(importance, 3).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert simplify.budget_mask(importance, 10).all()
+    assert simplify.budget_mask(importance, 1).sum() == 2
+
+
+def test_load_importance(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """It computes importances once, then loads them next to the corpus."""
+    monkeypatch.setattr(simplify, "_importances", {})
+    corpus_dir = str(tmp_path)
+    compiled = corpus.load_corpus("countries.geojson", "name", corpus_dir)
+
+    importance = simplify.load_importance("countries.geojson", "name", corpus_dir)
+    assert importance.shape == (len(compiled.coordinates),)
+    assert len(list(tmp_path.glob("*.importance"))) == 1
+
+    monkeypatch.setattr(simplify, "_importances", {})
+    loaded = simplify.load_importance("countries.geojson", "name", corpus_dir)
+    assert isinstance(loaded, np.memmap)
+    assert np.array_equal(loaded, importance)
@@ -0,0 +1,100 @@
+"""Test cases for the stats module."""
+import json
+import random
+
+import pytest
+from returns.result import Failure
+from returns.result import Success
+
+from stac_api_benchmark.query import PageTiming
+from stac_api_benchmark.query import RunFailure
+from stac_api_benchmark.query import RunSuccess
+from stac_api_benchmark.stats import Histogram
+from stac_api_benchmark.stats import ScenarioStats
+
+
+def test_histogram_percentiles_within_precision() -> None:
+    """It reports percentiles to within the bucket precision."""
+    rng = random.Random(0)
+    values = [rng.expovariate(10) for _ in range(10000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+
+    values.sort()
+    for p in (50, 90, 99, 99.9):
+        expected = values[int(p / 100 * len(values)) - 1]
+        assert histogram.percentile(p) == pytest.approx(expected, rel=0.01)
+    assert histogram.percentile(100) == values[-1]
+    assert histogram.min == values[0]
+
+
+def test_histogram_merge() -> None:
+    """It merges to the same result as recording every value in one histogram."""
+    a, b, both = Histogram(), Histogram(), Histogram()
+    for i in range(1, 1000):
+        (a if i % 2 else b).record(i / 100)
+        both.record(i / 100)
+    a.merge(b)
+    assert a.summary() == pytest.approx(both.summary())
+
+
+def test_scenario_stats_by_collection() -> None:
+    """It counts errors and items in total and by collection."""
+    stats = ScenarioStats(duration=2.0)
+    stats.record_for("c1", Success(RunSuccess(0.5, 10)))
+    stats.record_for("c2", Success(RunSuccess(1.0, 20)))
+    stats.record_for("c2", Failure(RunFailure(1.0, "error")))
+
+    result = stats.to_dict()
+    assert result["count"] == 3
+    assert result["errors"] == 1
+    assert result["items_per_second"] == 15
+    assert result["collections"]["c2"]["errors"] == 1
+    assert result["collections"]["c1"]["latency"]["max"] == 0.5
+
+
+def test_scenario_stats_by_group() -> None:
+    """It records each request in each of its groups, ordered by number."""
+    stats = ScenarioStats(duration=1.0)
+    stats.record_for("c1", Success(RunSuccess(0.5, 10)), ("level:1024", "a"))
+    stats.record_for("c1", Success(RunSuccess(1.0, 10)), ("level:256", "a"))
+    other = ScenarioStats()
+    other.record_for("c1", Failure(RunFailure(1.0, "error")), ("level:256",))
+    stats.merge(other)
+
+    result = stats.to_dict()
+    assert list(result["groups"]) == ["a", "level:256", "level:1024"]
+    assert result["groups"]["a"]["count"] == 2
+    assert result["groups"]["level:256"]["errors"] == 1
+    assert "groups" not in ScenarioStats().to_dict()
+
+
+def test_scenario_stats_by_page() -> None:
+    """It aggregates page latency by page index."""
+    stats = ScenarioStats(duration=1.0)
+    for depth in (1, 2, 3):
+        pages = [PageTiming(0.01, 0.1 * n, 100, 10) for n in range(1, depth + 1)]
+        stats.record_for(
+            "c1",
+            Success(RunSuccess(0.5, 10 * depth, ttfb=0.01, bytes=100, pages=pages)),
+        )
+
+    result = stats.to_dict()
+    assert result["bytes"] == 300
+    assert result["ttfb"]["max"] == 0.01
+    assert [result["pages"][i]["count"] for i in ("1", "2", "3")] == [3, 2, 1]
+    assert result["pages"]["3"]["latency"]["p99"] == pytest.approx(0.3, rel=0.001)
+
+
+def test_scenario_stats_encode_decode() -> None:
+    """It survives a round trip through JSON, so that it can be merged elsewhere."""
+    stats = ScenarioStats(duration=2.0)
+    pages = [PageTiming(0.01, 0.1, 100, 10), PageTiming(0.02, 0.2, 100, 10)]
+    stats.record_for("c1", Success(RunSuccess(0.3, 20, ttfb=0.01, pages=pages)))
+    stats.record_for("c2", Failure(RunFailure(1.0, "error")), ("level:bbox",))
+    stats.record_lag(0.5)
+
+    decoded = ScenarioStats.decode(json.loads(json.dumps(stats.encode())))
+    assert decoded == stats
+    assert ScenarioStats.decode(ScenarioStats().encode()) == ScenarioStats()
@@ -0,0 +1,111 @@
+"""Test cases for the transfer module."""
+import asyncio
+import gzip
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from aiohttp import web
+
+from stac_api_benchmark import api
+from stac_api_benchmark import query
+from stac_api_benchmark import transfer
+from stac_api_benchmark.stats import ScenarioStats
+
+
+@pytest.mark.parametrize(
+    "encoding, compress", [("identity", bytes), ("gzip", gzip.compress)]
+)
+def test_decode(encoding: str, compress: Callable[[bytes], bytes]) -> None:
+    """It decodes the body of each encoding."""
+    assert transfer.decode(compress(b"{}" * 100), encoding) == b"{}" * 100
+
+
+def test_decode_brotli() -> None:
+    """It decodes a brotli body, if brotli is installed."""
+    brotli = pytest.importorskip("brotli")
+    assert transfer.decode(brotli.compress(b"{}" * 100), "br") == b"{}" * 100
+
+
+def test_decodable_skips_brotli_without_it(
+    monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It skips the br encoding, with a warning, if brotli isn't installed."""
+    monkeypatch.setattr(transfer, "find_spec", lambda name: None)
+    config = make_config()
+    assert transfer.decodable(config, transfer.ENCODINGS) == ("identity", "gzip")
+
+
+def test_validators_header() -> None:
+    """It sends the validator of a condition, if the response had one."""
+    validators = transfer.Validators(etag='"v1"')
+    assert validators.header("none") == {}
+    assert validators.header("etag") == {"If-None-Match": '"v1"'}
+    assert validators.header("modified") is None
+
+
+def test_run_transfer_measures_encodings_and_conditions(
+    tmp_path: Path,
+    make_config: Callable[..., query.BenchmarkConfig],
+    free_port: Callable[[], int],
+) -> None:
+    """It reports wire and decoded bytes by encoding, and 304s by condition."""
+    brotli = pytest.importorskip("brotli")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    config = make_config(url=url, corpus_dir=str(tmp_path), concurrency=4)
+    context = api.ApiContext(
+        url=url,
+        landing_page={},
+        conformance=frozenset(),
+        search_href=f"{url}/search",
+        search_method="POST",
+    )
+    item = {"links": [{"rel": "self", "href": f"{url}/items/1"}], "pad": "x" * 1000}
+
+    def respond(request: web.Request, document: object) -> web.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        body = json.dumps(document).encode()
+        headers = {"ETag": '"v1"', "Content-Type": "application/json"}
+        encoding = request.headers.get("Accept-Encoding")
+        if encoding in ("gzip", "br"):
+            body = gzip.compress(body) if encoding == "gzip" else brotli.compress(body)
+            headers["Content-Encoding"] = encoding
+        return web.Response(body=body, headers=headers)
+
+    async def search(request: web.Request) -> web.Response:
+        return respond(request, {"features": [item] * 3, "links": []})
+
+    async def get_item(request: web.Request) -> web.Response:
+        return respond(request, item)
+
+    async def run() -> ScenarioStats:
+        app = web.Application()
+        app.router.add_post("/search", search)
+        app.router.add_get("/items/{item}", get_item)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        try:
+            async with query.create_session(config) as session:
+                return await transfer.run_transfer(
+                    config, session, context, pool=1, limit=3, repeats=2
+                )
+        finally:
+            await runner.cleanup()
+
+    stats = asyncio.run(run()).to_dict()
+    # 2 targets, with 3 encodings, each requested once and then twice per condition
+    assert (stats["count"], stats["errors"]) == (2 * 3 * (1 + 2 * 2), 0)
+    groups = stats["groups"]
+    assert groups["condition:etag"]["not_modified_rate"] == 1.0
+    assert groups["condition:none"]["not_modified"] == 0
+    assert "condition:modified" not in groups
+    identity, gz = groups["search:identity:none"], groups["search:gzip:none"]
+    assert identity["wire_bytes"] == identity["bytes"]
+    assert gz["bytes"] == identity["bytes"]
+    assert gz["wire_bytes"] < gz["bytes"] / 5
+    assert groups["item:br:first"]["items"] == 1
+    assert groups["search:br:first"]["items"] == 3
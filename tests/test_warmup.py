@@ -0,0 +1,145 @@
+"""Test cases for the warmup module."""
+import asyncio
+from typing import Any
+from typing import Callable
+from typing import List
+
+import pytest
+from returns.result import Success
+
+from stac_api_benchmark import query
+from stac_api_benchmark import stats
+from stac_api_benchmark import warmup
+from stac_api_benchmark.query import RunResult
+from stac_api_benchmark.query import RunSuccess
+from stac_api_benchmark.stats import ScenarioStats
+
+
+class Clock:
+    """A clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """The current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Fixture for controlling the time seen by warmups."""
+    clock = Clock()
+    monkeypatch.setattr(warmup, "perf_counter", clock)
+    return clock
+
+
+def success(duration: float) -> RunResult:
+    """The result of a successful request that took ``duration`` seconds."""
+    return Success(RunSuccess(duration=duration, count=1))
+
+
+def test_warmup_by_requests_and_duration(
+    clock: Clock, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It ends once enough requests completed and enough time passed."""
+    w = warmup.Warmup(make_config(warmup_requests=2, warmup_duration=1.0))
+    classified = []
+    for _ in range(4):
+        clock.now += 0.4
+        classified.append(w(success(0.1)))
+    # a request in flight when the warmup ended is part of it
+    clock.now += 0.4
+    classified.append(w(success(0.5)))
+    classified.append(w(success(0.1)))
+    assert classified == [False, False, False, False, False, True]
+    assert w.start == pytest.approx(0.3)
+    assert w.end == pytest.approx(1.6)
+
+
+@pytest.mark.parametrize(
+    "latencies, steady_after",
+    [
+        # the first window is slower, and then every window agrees
+        ([0.5] * 10 + [0.1] * 40, 4.0),
+        # every window is slower than the last, so only the maximum warmup ends it
+        ([0.1 * (1 + i // 10) for i in range(100)], 8.0),
+    ],
+)
+def test_warmup_until_steady_state(
+    clock: Clock,
+    latencies: List[float],
+    steady_after: float,
+    make_config: Callable[..., query.BenchmarkConfig],
+) -> None:
+    """It ends when the last windows agree, or at the maximum warmup."""
+    config = make_config(
+        steady_state_window=1.0, steady_state_tolerance=0.1, max_warmup=8.0
+    )
+    w = warmup.Warmup(config)
+    for latency in latencies:
+        clock.now += 0.1
+        w(success(latency))
+        if w.end is not None:
+            break
+    assert w.end is not None
+    assert w.end - (w.start or 0.0) >= steady_after
+    assert w.reason.startswith("reached" if steady_after < 8.0 else "didn't")
+
+
+def test_warmed_up_records_warmup_separately(
+    clock: Clock, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It keeps warmup requests out of the measured and stored statistics."""
+    config = make_config(warmup_requests=3)
+    stored: List[Any] = []
+
+    async def scenario() -> ScenarioStats:
+        scenario_stats = ScenarioStats()
+        for _ in range(10):
+            clock.now += 1.0
+            scenario_stats.record_for("c1", success(0.5))
+        return scenario_stats
+
+    token = stats.recorder.set(lambda *args: stored.append(args))
+    try:
+        result = asyncio.run(warmup.warmed_up(config, "s", scenario()))
+    finally:
+        stats.recorder.reset(token)
+    assert (result.warmup.count, result.count, len(stored)) == (3, 7, 7)
+    assert (result.warmup_duration, result.duration) == (2.5, 7.0)
+    summary = result.to_dict()
+    assert summary["warmup"]["count"] == 3
+    assert summary["requests_per_second"] == 1.0
+    assert ScenarioStats.decode(result.encode()).warmup.count == 3
+
+
+def test_small_scenarios_have_no_warmup(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It skips the warmup of a scenario whose requests would all start in it."""
+    config = make_config(warmup_requests=3, concurrency=2)
+    assert not warmup.enabled(config, requests=5)
+    assert warmup.enabled(config, requests=6)
+    assert warmup.enabled(config)
+
+
+def test_record_lag_skips_the_warmup(
+    clock: Clock,
+    monkeypatch: pytest.MonkeyPatch,
+    make_config: Callable[..., query.BenchmarkConfig],
+) -> None:
+    """It only records the schedule lag of requests that start after the warmup."""
+    monkeypatch.setattr(stats, "perf_counter", clock)
+    w = warmup.Warmup(make_config(warmup_requests=1))
+    scenario_stats = ScenarioStats()
+    token = stats.measuring.set(w)
+    try:
+        scenario_stats.record_lag(0.5)
+        clock.now += 1.0
+        w(success(0.5))
+        scenario_stats.record_lag(0.5)
+    finally:
+        stats.measuring.reset(token)
+    assert (scenario_stats.schedule_lag.count, scenario_stats.behind_schedule) == (1, 1)
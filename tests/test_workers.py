@@ -0,0 +1,37 @@
+"""Test cases for the workers module."""
+from typing import Callable
+
+from stac_api_benchmark import query
+from stac_api_benchmark import workers
+
+
+def test_shards_partition_queries() -> None:
+    """It assigns every query to exactly one shard."""
+    queries = [query.SearchQuery(search_id=str(i), collection="c1") for i in range(10)]
+    shards = [list(workers.shard(queries, index, 3)) for index in range(3)]
+    assert sorted(q.search_id for s in shards for q in s) == sorted(
+        q.search_id for q in queries
+    )
+    assert [q.search_id for q in shards[1]] == ["1", "4", "7"]
+
+
+def test_shard_config_divides_load(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It divides the concurrency and rate between the workers."""
+    shard_configs = [
+        workers.shard_config(make_config(workers=3, rate=30.0), index)
+        for index in range(3)
+    ]
+    assert [c.concurrency for c in shard_configs] == [4, 3, 3]
+    assert [c.rate for c in shard_configs] == [10.0, 10.0, 10.0]
+    assert [c.worker_index for c in shard_configs] == [0, 1, 2]
+
+
+def test_random_queries_are_deterministic(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It generates the same queries in every worker, so that shards are disjoint."""
+    assert list(query.random_queries(make_config())) == list(
+        query.random_queries(make_config())
+    )
@@ -0,0 +1,137 @@
+"""Test cases for the workload module."""
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Any
+from typing import Callable
+
+import pytest
+
+from stac_api_benchmark import query
+from stac_api_benchmark import workload
+
+
+def test_read_workload_toml_and_yaml(tmp_path: Path) -> None:
+    """It reads the same workload from TOML and YAML."""
+    toml = tmp_path / "mix.toml"
+    toml.write_text(
+        'duration = 60\nrate = "600/m"\n\n'
+        '[[queries]]\ntype = "item"\nweight = 9\npool = 10\n\n'
+        '[[queries]]\nname = "newest"\ntype = "sorted"\n'
+        'sortby = ["properties.datetime:desc"]\n'
+    )
+    yaml = tmp_path / "mix.yaml"
+    yaml.write_text(
+        "duration: 60\nrate: 600/m\nqueries:\n"
+        "  - {type: item, weight: 9, pool: 10}\n"
+        "  - {name: newest, type: sorted, sortby: [properties.datetime:desc]}\n"
+    )
+
+    expected = workload.Workload(
+        queries=[
+            workload.WorkloadQuery("item", "item", 9.0, {"pool": 10}),
+            workload.WorkloadQuery(
+                "newest",
+                "sorted",
+                1.0,
+                {"sortby": [{"field": "properties.datetime", "direction": "desc"}]},
+            ),
+        ],
+        rate=10.0,
+        duration=60.0,
+    )
+    assert workload.read_workload(str(toml)) == expected
+    assert workload.read_workload(str(yaml)) == expected
+
+
+@pytest.mark.parametrize(
+    "document, message",
+    [
+        ({"queries": [{"type": "item"}]}, "duration or a number of requests"),
+        ({"requests": 1, "queries": []}, "list of queries"),
+        ({"requests": 1, "queries": [{"type": "bogus"}]}, "not one of"),
+        ({"requests": 1, "queries": [{"type": "sorted"}]}, "needs a sortby"),
+        ({"requests": 1, "queries": [{"type": "fc"}]}, "needs an fc_filename"),
+        (
+            {"requests": 1, "queries": [{"type": "paged", "intersects": "no"}]},
+            "true or false",
+        ),
+        ({"requests": 1, "queries": [{"type": "item", "limit": 1}]}, "limit"),
+        ({"requests": 1, "queries": [{"type": "item", "weight": 0}]}, "positive"),
+        ({"requests": 1, "queries": [{"type": "item"}] * 2}, "different name"),
+        ({"requests": 1, "rate": "fast", "queries": [{"type": "item"}]}, "rate"),
+    ],
+)
+def test_parse_workload_rejects_invalid(document: dict[str, Any], message: str) -> None:
+    """It explains what is wrong with a workload."""
+    with pytest.raises(workload.WorkloadError, match=message):
+        workload.parse_workload(document)
+
+
+def test_mixed_requests_by_weight(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It interleaves the types of query in proportion to their weights."""
+    config = make_config(collections=("c1", "c2"))
+    mix = workload.parse_workload(
+        {
+            "requests": 1,
+            "queries": [
+                {"name": "lookup", "type": "item", "weight": 3},
+                {"type": "paged", "max_items": 500, "collections": ["c2"]},
+            ],
+        }
+    )
+    hrefs = {"lookup": {"c1": ["http://x/1"], "c2": ["http://x/2"]}}
+    requests = list(islice(workload.mixed_requests(config, mix, hrefs), 4000))
+
+    types = Counter(request.groups for request in requests)
+    assert types.keys() == {("type:lookup",), ("type:paged",)}
+    assert types[("type:lookup",)] / len(requests) == pytest.approx(0.75, abs=0.03)
+    assert all(
+        isinstance(r, query.ItemRequest)
+        if r.groups == ("type:lookup",)
+        else isinstance(r, query.SearchQuery)
+        and r.collection == "c2"
+        and r.max_items == 500
+        for r in requests
+    )
+
+
+@pytest.mark.parametrize("type", ["sorted", "paged"])
+def test_searches_intersect_random_polygons(
+    type: str, make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """Sorted and paged searches each intersect a different random polygon."""
+    config = make_config(collections=("c1",), num_random=5)
+    mix = workload.parse_workload(
+        {"requests": 1, "queries": [{"type": type, "sortby": ["-datetime"]}]}
+    )
+    requests = list(islice(workload.mixed_requests(config, mix, {}), 12))
+
+    assert all(isinstance(r, query.SearchQuery) for r in requests)
+    polygons = [r.intersects for r in requests if isinstance(r, query.SearchQuery)]
+    assert all(polygons)
+    assert len({str(p) for p in polygons}) == len(polygons)
+
+    mix = workload.parse_workload(
+        {
+            "requests": 1,
+            "queries": [{"type": type, "sortby": ["id"], "intersects": False}],
+        }
+    )
+    requests = list(islice(workload.mixed_requests(config, mix, {}), 3))
+    assert all(
+        isinstance(r, query.SearchQuery) and r.intersects is None for r in requests
+    )
+
+
+def test_mixed_requests_rejects_empty_pools(
+    make_config: Callable[..., query.BenchmarkConfig]
+) -> None:
+    """It rejects an item query with no items before any request is drawn."""
+    mix = workload.parse_workload(
+        {"requests": 1, "queries": [{"name": "lookup", "type": "item"}]}
+    )
+    with pytest.raises(workload.WorkloadError, match="lookup has no items"):
+        workload.mixed_requests(make_config(), mix, {"lookup": {"c1": []}})